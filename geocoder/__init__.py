@@ -31,22 +31,31 @@ __version__ = "1.38.1"
 __license__ = "MIT"
 __copyright__ = "Copyright (c) 2013-2016 Denis Carriere"
 
+import sys
+import types
+
 # EXTRAS
 # CORE
 from .api import gisgraphy  # noqa
 from .api import (
+    agather,
+    aget,
+    arace,
     arcgis,
     baidu,
     bing,
     canadapost,
     distance,  # noqa
     elevation,
+    fallback,
     freegeoip,
     gaode,
     geocodefarm,
     geolytica,
     geonames,
+    geonames_offline,
     get,
+    get_many,
     google,
     here,
     ip,
@@ -58,15 +67,18 @@ from .api import (
     mapquest,
     mapzen,
     maxmind,
+    maxmind_offline,
     nokia,
     opencage,
     osm,
     ottawa,
     places,
+    race,
     reverse,
     tamu,
     tgos,
     timezone,
+    timezone_offline,
     tomtom,
     uscensus,
     w3w,
@@ -74,5 +86,28 @@ from .api import (
     yandex,
 )
 
-# CLI
-from .cli import cli  # noqa
+
+# functions exported lazily, see __getattr__
+_LAZY_FUNCTIONS = ("cli",)
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name, value):
+        # providers are imported lazily, and importing geocoder.google binds the module as
+        # the google attribute of the package: keep the function of the API instead
+        if isinstance(value, types.ModuleType) and (isinstance(self.__dict__.get(name), types.FunctionType) or name in _LAZY_FUNCTIONS):
+            return
+        super(_Package, self).__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
+
+
+def __getattr__(name):
+    # CLI, only imported when used
+    if name == "cli":
+        from .cli import cli
+
+        globals()["cli"] = cli
+        return cli
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
@@ -0,0 +1,112 @@
+#!/usr/bin/python
+# coding: utf8
+
+import asyncio
+import weakref
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# aiohttp is only imported when an asynchronous query is sent, see _aiohttp
+aiohttp = False
+
+# one aiohttp session per event loop, aiohttp sessions cannot be shared between loops:
+# {loop: (session, async generator closing it when the loop shuts down)}
+_SESSIONS = weakref.WeakKeyDictionary()
+
+
+def _aiohttp():
+    """aiohttp module, None when not installed"""
+    global aiohttp
+    if aiohttp is False:
+        try:
+            import aiohttp
+        except ImportError:  # pragma: no cover
+            aiohttp = None
+    return aiohttp
+
+
+def get_async_session():
+    """Returns the aiohttp session of the running event loop, None if aiohttp is not installed
+
+    The session is closed when the loop shuts down its asynchronous generators, e.g at the
+    end of asyncio.run, or with close_async_session.
+    """
+    aiohttp = _aiohttp()
+    if aiohttp is None:
+        return None
+    loop = asyncio.get_running_loop()
+    session, _ = _SESSIONS.get(loop, (None, None))
+    if session is None or session.closed:
+        session = aiohttp.ClientSession()
+        closer = _closer(loop, session)
+        # runs until its yield: the generator is now closed by loop.shutdown_asyncgens
+        try:
+            closer.__anext__().send(None)
+        except StopIteration:
+            pass
+        _SESSIONS[loop] = (session, closer)
+    return session
+
+
+async def _closer(loop, session):
+    try:
+        yield
+    finally:
+        # the session references the loop, it would never leave _SESSIONS otherwise
+        if _SESSIONS.get(loop, (None, None))[0] is session:
+            del _SESSIONS[loop]
+        await session.close()
+
+
+async def close_async_session():
+    """Close the aiohttp session of the running event loop, if any"""
+    _, closer = _SESSIONS.get(asyncio.get_running_loop(), (None, None))
+    if closer is not None:
+        await closer.aclose()
+
+
+def _get_proxy(url, proxies):
+    # requests expects a dict {scheme: proxy}, aiohttp a single proxy url
+    if not proxies:
+        return None
+    if isinstance(proxies, dict):
+        return proxies.get(url.split(":", 1)[0])
+    return proxies
+
+
+async def request(session, method, url, params=None, headers=None, timeout=None, proxies=None, data=None):
+    """Send a request with an aiohttp session and returns a requests.Response, so that the
+    responses are handled the same way in the synchronous and asynchronous paths.
+
+    aiohttp errors are raised as requests exceptions.
+    """
+    aiohttp = _aiohttp()
+    import yarl
+
+    # let requests encode params, the url is then exactly the one of the synchronous path
+    url = requests.Request(method, url, params=params).prepare().url
+    client_timeout = aiohttp.ClientTimeout(total=float(timeout)) if timeout else None
+
+    try:
+        async with session.request(
+            method,
+            yarl.URL(url, encoded=True),
+            headers=headers,
+            data=data,
+            timeout=client_timeout,
+            proxy=_get_proxy(url, proxies),
+        ) as client_response:
+            response = requests.Response()
+            response._content = await client_response.read()
+            response._content_consumed = True
+            response.status_code = client_response.status
+            response.reason = client_response.reason
+            response.headers = CaseInsensitiveDict(client_response.headers)
+            response.encoding = client_response.charset
+            response.url = str(client_response.url)
+            return response
+    except asyncio.TimeoutError as err:
+        raise requests.exceptions.Timeout("Request to {} timed out".format(url)) from err
+    except aiohttp.ClientError as err:
+        raise requests.exceptions.ConnectionError(str(err)) from err
@@ -1,161 +1,188 @@
 #!/usr/bin/python
 # coding: utf8
 
-
-from .arcgis import ArcgisQuery
-from .arcgis_reverse import ArcgisReverse
-from .baidu import BaiduQuery
-from .baidu_reverse import BaiduReverse
-from .bing import BingQuery, BingQueryDetail
-from .bing_batch_forward import BingBatchForward
-from .bing_batch_reverse import BingBatchReverse
-from .bing_reverse import BingReverse
-from .canadapost import CanadapostQuery
+import asyncio
+import importlib
+import logging
+import time
+from collections import deque
+from collections.abc import MutableMapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from . import circuitbreaker
 from .distance import Distance
-from .freegeoip import FreeGeoIPQuery
-from .gaode import GaodeQuery
-from .gaode_reverse import GaodeReverse
-from .geocodefarm import GeocodeFarmQuery
-from .geocodefarm_reverse import GeocodeFarmReverse
-from .geolytica import GeolyticaQuery
-
-# Geonames Services
-from .geonames import GeonamesQuery
-from .geonames_children import GeonamesChildren
-from .geonames_details import GeonamesDetails
-from .geonames_hierarchy import GeonamesHierarchy
-from .gisgraphy import GisgraphyQuery
-from .gisgraphy_reverse import GisgraphyReverse
-
-# Google Services
-from .google import GoogleQuery
-from .google_elevation import ElevationQuery
-from .google_places import PlacesQuery
-from .google_reverse import GoogleReverse
-from .google_timezone import TimezoneQuery
-from .here import HereQuery
-from .here_reverse import HereReverse
-from .ipinfo import IpinfoQuery
-from .komoot import KomootQuery
-from .komoot_reverse import KomootReverse
 from .location import Location
-from .locationiq import LocationIQQuery
-from .locationiq_reverse import LocationIQReverse
-from .mapbox import MapboxQuery
-from .mapbox_reverse import MapboxReverse
-from .mapquest import MapquestQuery
-from .mapquest_batch import MapquestBatch
-from .mapquest_reverse import MapquestReverse
-from .mapzen import MapzenQuery
-from .mapzen_reverse import MapzenReverse
-from .maxmind import MaxmindQuery
-from .opencage import OpenCageQuery
-from .opencage_reverse import OpenCageReverse
-from .osm import OsmQuery, OsmQueryDetail
-from .osm_reverse import OsmReverse
-from .ottawa import OttawaQuery
-from .tamu import TamuQuery
-from .tgos import TgosQuery
-from .tomtom import TomtomQuery
-from .uscensus import USCensusQuery
-from .uscensus_batch import USCensusBatch
-from .uscensus_reverse import USCensusReverse
-from .w3w import W3WQuery
-from .w3w_reverse import W3WReverse
-from .yahoo import YahooQuery
-from .yandex import YandexQuery
-from .yandex_reverse import YandexReverse
-
-options = {
-    "osm": {
-        "geocode": OsmQuery,
-        "details": OsmQueryDetail,
-        "reverse": OsmReverse,
-    },
-    "tgos": {"geocode": TgosQuery},
-    "here": {
-        "geocode": HereQuery,
-        "reverse": HereReverse,
-    },
-    "baidu": {"geocode": BaiduQuery, "reverse": BaiduReverse},
-    "gaode": {"geocode": GaodeQuery, "reverse": GaodeReverse},
-    "yahoo": {"geocode": YahooQuery},
-    "tomtom": {"geocode": TomtomQuery},
-    "arcgis": {"geocode": ArcgisQuery, "reverse": ArcgisReverse},
-    "ottawa": {"geocode": OttawaQuery},
-    "mapbox": {
-        "geocode": MapboxQuery,
-        "reverse": MapboxReverse,
-    },
-    "maxmind": {"geocode": MaxmindQuery},
-    "ipinfo": {"geocode": IpinfoQuery},
-    "geonames": {
-        "geocode": GeonamesQuery,
-        "details": GeonamesDetails,
-        "timezone": GeonamesDetails,
-        "children": GeonamesChildren,
-        "hierarchy": GeonamesHierarchy,
-    },
-    "freegeoip": {"geocode": FreeGeoIPQuery},
-    "w3w": {
-        "geocode": W3WQuery,
-        "reverse": W3WReverse,
-    },
-    "yandex": {"geocode": YandexQuery, "reverse": YandexReverse},
-    "mapquest": {"geocode": MapquestQuery, "reverse": MapquestReverse, "batch": MapquestBatch},
-    "geolytica": {"geocode": GeolyticaQuery},
-    "canadapost": {"geocode": CanadapostQuery},
-    "opencage": {
-        "geocode": OpenCageQuery,
-        "reverse": OpenCageReverse,
-    },
-    "bing": {
-        "geocode": BingQuery,
-        "details": BingQueryDetail,
-        "reverse": BingReverse,
-        "batch": BingBatchForward,
-        "batch_reverse": BingBatchReverse,
-    },
-    "google": {
-        "geocode": GoogleQuery,
-        "reverse": GoogleReverse,
-        "timezone": TimezoneQuery,
-        "elevation": ElevationQuery,
-        "places": PlacesQuery,
-    },
-    "mapzen": {
-        "geocode": MapzenQuery,
-        "reverse": MapzenReverse,
-    },
-    "komoot": {
-        "geocode": KomootQuery,
-        "reverse": KomootReverse,
-    },
-    "tamu": {"geocode": TamuQuery},
-    "geocodefarm": {
-        "geocode": GeocodeFarmQuery,
-        "reverse": GeocodeFarmReverse,
-    },
-    "uscensus": {"geocode": USCensusQuery, "reverse": USCensusReverse, "batch": USCensusBatch},
-    "locationiq": {
-        "geocode": LocationIQQuery,
-        "reverse": LocationIQReverse,
-    },
-    "gisgraphy": {
-        "geocode": GisgraphyQuery,
-        "reverse": GisgraphyReverse,
-    },
-}
 
+LOGGER = logging.getLogger(__name__)
 
-def get(location, **kwargs):
-    """Get Geocode
 
-    :param ``location``: Your search location you want geocoded.
-    :param ``provider``: The geocoding engine you want to use.
+class _LazyMethods(MutableMapping):
+    """Methods of a provider, mapped to their query class.
 
-    :param ``method``: Define the method (geocode, method).
+    Classes can be given as "module:Class" strings, relative to the geocoder package, which
+    are only imported when the method is used: importing geocoder does not load every provider.
     """
+
+    def __init__(self, **methods):
+        self._methods = methods
+
+    def __getitem__(self, method):
+        query_class = self._methods[method]
+        if isinstance(query_class, str):
+            module_name, class_name = query_class.split(":")
+            module = importlib.import_module(module_name, __package__)
+            query_class = self._methods[method] = getattr(module, class_name)
+        return query_class
+
+    def __setitem__(self, method, query_class):
+        self._methods[method] = query_class
+
+    def __delitem__(self, method):
+        del self._methods[method]
+
+    def __iter__(self):
+        return iter(self._methods)
+
+    def __len__(self):
+        return len(self._methods)
+
+    def __repr__(self):
+        return "{0}({1})".format(self.__class__.__name__, self._methods)
+
+
+options = {
+    "osm": _LazyMethods(
+        geocode=".osm:OsmQuery",
+        details=".osm:OsmQueryDetail",
+        reverse=".osm_reverse:OsmReverse",
+    ),
+    "tgos": _LazyMethods(
+        geocode=".tgos:TgosQuery",
+    ),
+    "here": _LazyMethods(
+        geocode=".here:HereQuery",
+        reverse=".here_reverse:HereReverse",
+    ),
+    "baidu": _LazyMethods(
+        geocode=".baidu:BaiduQuery",
+        reverse=".baidu_reverse:BaiduReverse",
+    ),
+    "gaode": _LazyMethods(
+        geocode=".gaode:GaodeQuery",
+        reverse=".gaode_reverse:GaodeReverse",
+    ),
+    "yahoo": _LazyMethods(
+        geocode=".yahoo:YahooQuery",
+    ),
+    "tomtom": _LazyMethods(
+        geocode=".tomtom:TomtomQuery",
+    ),
+    "arcgis": _LazyMethods(
+        geocode=".arcgis:ArcgisQuery",
+        reverse=".arcgis_reverse:ArcgisReverse",
+    ),
+    "ottawa": _LazyMethods(
+        geocode=".ottawa:OttawaQuery",
+    ),
+    "mapbox": _LazyMethods(
+        geocode=".mapbox:MapboxQuery",
+        reverse=".mapbox_reverse:MapboxReverse",
+    ),
+    "maxmind": _LazyMethods(
+        geocode=".maxmind:MaxmindQuery",
+    ),
+    "maxmind_offline": _LazyMethods(
+        geocode=".maxmind_offline:MaxmindOfflineQuery",
+    ),
+    "ipinfo": _LazyMethods(
+        geocode=".ipinfo:IpinfoQuery",
+    ),
+    "geonames": _LazyMethods(
+        geocode=".geonames:GeonamesQuery",
+        details=".geonames_details:GeonamesDetails",
+        timezone=".geonames_details:GeonamesDetails",
+        children=".geonames_children:GeonamesChildren",
+        hierarchy=".geonames_hierarchy:GeonamesHierarchy",
+    ),
+    "geonames_offline": _LazyMethods(
+        reverse=".geonames_offline:GeonamesOfflineReverse",
+    ),
+    "timezone_offline": _LazyMethods(
+        timezone=".timezone_offline:TimezoneOfflineQuery",
+    ),
+    "freegeoip": _LazyMethods(
+        geocode=".freegeoip:FreeGeoIPQuery",
+    ),
+    "w3w": _LazyMethods(
+        geocode=".w3w:W3WQuery",
+        reverse=".w3w_reverse:W3WReverse",
+    ),
+    "yandex": _LazyMethods(
+        geocode=".yandex:YandexQuery",
+        reverse=".yandex_reverse:YandexReverse",
+    ),
+    "mapquest": _LazyMethods(
+        geocode=".mapquest:MapquestQuery",
+        reverse=".mapquest_reverse:MapquestReverse",
+        batch=".mapquest_batch:MapquestBatch",
+    ),
+    "geolytica": _LazyMethods(
+        geocode=".geolytica:GeolyticaQuery",
+    ),
+    "canadapost": _LazyMethods(
+        geocode=".canadapost:CanadapostQuery",
+    ),
+    "opencage": _LazyMethods(
+        geocode=".opencage:OpenCageQuery",
+        reverse=".opencage_reverse:OpenCageReverse",
+    ),
+    "bing": _LazyMethods(
+        geocode=".bing:BingQuery",
+        details=".bing:BingQueryDetail",
+        reverse=".bing_reverse:BingReverse",
+        batch=".bing_batch_forward:BingBatchForward",
+        batch_reverse=".bing_batch_reverse:BingBatchReverse",
+    ),
+    "google": _LazyMethods(
+        geocode=".google:GoogleQuery",
+        reverse=".google_reverse:GoogleReverse",
+        timezone=".google_timezone:TimezoneQuery",
+        elevation=".google_elevation:ElevationQuery",
+        elevation_batch=".google_elevation:ElevationBatchQuery",
+        places=".google_places:PlacesQuery",
+    ),
+    "mapzen": _LazyMethods(
+        geocode=".mapzen:MapzenQuery",
+        reverse=".mapzen_reverse:MapzenReverse",
+    ),
+    "komoot": _LazyMethods(
+        geocode=".komoot:KomootQuery",
+        reverse=".komoot_reverse:KomootReverse",
+    ),
+    "tamu": _LazyMethods(
+        geocode=".tamu:TamuQuery",
+    ),
+    "geocodefarm": _LazyMethods(
+        geocode=".geocodefarm:GeocodeFarmQuery",
+        reverse=".geocodefarm_reverse:GeocodeFarmReverse",
+    ),
+    "uscensus": _LazyMethods(
+        geocode=".uscensus:USCensusQuery",
+        reverse=".uscensus_reverse:USCensusReverse",
+        batch=".uscensus_batch:USCensusBatch",
+    ),
+    "locationiq": _LazyMethods(
+        geocode=".locationiq:LocationIQQuery",
+        reverse=".locationiq_reverse:LocationIQReverse",
+    ),
+    "gisgraphy": _LazyMethods(
+        geocode=".gisgraphy:GisgraphyQuery",
+        reverse=".gisgraphy_reverse:GisgraphyReverse",
+    ),
+}
+
+
+def _get_query_class(location, **kwargs):
     provider = kwargs.get("provider", "bing").lower().strip()
     method = kwargs.get("method", "geocode").lower().strip()
     if isinstance(location, (list, dict)) and method == "geocode":
@@ -167,7 +194,336 @@ def get(location, **kwargs):
     else:
         if method not in options[provider]:
             raise ValueError("Invalid method")
-    return options[provider][method](location, **kwargs)
+    return options[provider][method]
+
+
+def get(location, **kwargs):
+    """Get Geocode
+
+    :param ``location``: Your search location you want geocoded.
+    :param ``provider``: The geocoding engine you want to use.
+
+    :param ``method``: Define the method (geocode, method).
+    """
+    return _get_query_class(location, **kwargs)(location, **kwargs)
+
+
+async def aget(location, **kwargs):
+    """Get Geocode, with asyncio
+
+    Same parameters as get, the request is sent with aiohttp when installed.
+
+    :param ``async_session``: (optional) aiohttp session, the running event loop has its own by default.
+    """
+    return await _get_query_class(location, **kwargs).aquery(location, **kwargs)
+
+
+async def agather(locations, limit=None, **kwargs):
+    """Get Geocode of several locations concurrently, with asyncio
+
+    Results are returned in the order of the locations.
+
+    :param ``locations``: Your search locations you want geocoded.
+    :param ``limit``: (default=None) Max number of queries sent at the same time.
+    """
+    if not limit:
+        return await asyncio.gather(*[aget(location, **kwargs) for location in locations])
+
+    semaphore = asyncio.Semaphore(limit)
+
+    async def limited_aget(location):
+        async with semaphore:
+            return await aget(location, **kwargs)
+
+    return await asyncio.gather(*[limited_aget(location) for location in locations])
+
+
+def _hashable(location):
+    # lists and dicts are not hashable, e.g coordinates for reverse geocoding
+    if isinstance(location, (list, tuple)):
+        return tuple(_hashable(item) for item in location)
+    if isinstance(location, dict):
+        return tuple(sorted((key, _hashable(value)) for key, value in location.items()))
+    if hasattr(location, "tolist"):
+        # rows of NumPy arrays
+        return _hashable(location.tolist())
+    return location
+
+
+def _location_key(location):
+    """Hashable key of a location, None when it has none (no deduplication)"""
+    key = _hashable(location)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _geocode_many(items, workers, ordered=True, **kwargs):
+    """Yields (index, location, result) of the (index, location) items, with a pool of threads.
+
+    Results are yielded in the order of the items, or as soon as they are available when
+    ordered is False. Only a few items are read ahead of the results yielded, so that inputs
+    of any size can be streamed, and identical locations pending at the same time are only
+    queried once.
+    """
+    max_pending = workers * 4
+    # {key: [future, number of pending items]} of the locations pending
+    flights = {}
+    # ordered: (index, location, key, future), else {future: [(index, location, key)]}
+    pending = deque() if ordered else {}
+    count = 0
+
+    def submit(location, key):
+        flight = flights.get(key) if key is not None else None
+        if flight is None:
+            flight = [executor.submit(get, location, **kwargs), 0]
+            if key is not None:
+                flights[key] = flight
+        flight[1] += 1
+        return flight[0]
+
+    def release(key):
+        if key is not None:
+            flight = flights[key]
+            flight[1] -= 1
+            if not flight[1]:
+                del flights[key]
+
+    def completed():
+        if ordered:
+            index, location, key, future = pending.popleft()
+            done = [(index, location, key, future)]
+        else:
+            futures, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            done = [item + (future,) for future in futures for item in pending.pop(future)]
+        for index, location, key, future in done:
+            release(key)
+            yield index, location, future.result()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for index, location in items:
+            key = _location_key(location)
+            future = submit(location, key)
+            if ordered:
+                pending.append((index, location, key, future))
+            else:
+                pending.setdefault(future, []).append((index, location, key))
+            count += 1
+
+            while count > max_pending:
+                for result in completed():
+                    count -= 1
+                    yield result
+
+        while count:
+            for result in completed():
+                count -= 1
+                yield result
+
+
+def get_many(locations, workers=4, **kwargs):
+    """Get Geocode of several locations, with a pool of threads
+
+    Results are yielded in the order of the locations, as soon as they are available.
+    Identical locations waiting for their result at the same time are only queried once (the
+    same result is yielded for each of them), and the queries share the session of their
+    provider (see geocoder.sessions) unless a session is given.
+
+    Rate limits of the providers are applied by each query (see rate_limited_get).
+
+    :param ``locations``: Your search locations you want geocoded, can be any iterable.
+    :param ``workers``: (default=4) Number of threads sending queries.
+    :param ``provider``: The geocoding engine you want to use.
+    :param ``method``: Define the method (geocode, method).
+    """
+    # check provider/method before submitting any query
+    _get_query_class("", **kwargs)
+
+    for _, _, result in _geocode_many(enumerate(locations), workers, **kwargs):
+        yield result
+
+
+def _race_queries(providers, kwargs):
+    """(provider, kwargs) of the queries of a race, providers being names or (name, kwargs)"""
+    queries = []
+    for provider in providers:
+        provider_kwargs = dict(kwargs)
+        if not isinstance(provider, str):
+            provider, extra_kwargs = provider
+            provider_kwargs.update(extra_kwargs)
+        provider_kwargs["provider"] = provider
+        queries.append(provider_kwargs)
+    if not queries:
+        raise ValueError("Provide at least one provider")
+    return queries
+
+
+def _race_result(results, errors):
+    # no result is ok: the one of the first provider which answered, in the order of providers
+    if results:
+        return results[min(results)]
+    raise errors[min(errors)]
+
+
+def race(location, providers, hedge_after_ms=300, **kwargs):
+    """Get Geocode from the first provider answering, to bound the latency of slow providers
+
+    The query to the first provider is sent right away, and the query to the next one when
+    no result arrived after hedge_after_ms milliseconds (or as soon as a query fails). The
+    first ok result is returned: queries not sent yet are cancelled, the ones already sent
+    finish in the background and their results are dropped.
+
+    :param ``location``: Your search location you want geocoded.
+    :param ``providers``: Providers in order of preference, names or (name, kwargs) tuples.
+    :param ``hedge_after_ms``: (default=300) Delay before querying the next provider.
+    :param ``method``: Define the method (geocode, method).
+    """
+    queries = _race_queries(providers, kwargs)
+    for query_kwargs in queries:
+        _get_query_class(location, **query_kwargs)
+
+    hedge_after = hedge_after_ms / 1000.0
+    results, errors, pending = {}, {}, {}
+    next_index, launch_next = 0, True
+    executor = ThreadPoolExecutor(max_workers=len(queries))
+    try:
+        while True:
+            if launch_next and next_index < len(queries):
+                pending[executor.submit(get, location, **queries[next_index])] = next_index
+                next_index += 1
+                launched = time.monotonic()
+            if not pending:
+                return _race_result(results, errors)
+
+            timeout = None
+            if next_index < len(queries):
+                timeout = max(0.0, launched + hedge_after - time.monotonic())
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            # the next provider is queried once the delay elapsed, or right away when a query failed
+            launch_next = time.monotonic() >= launched + hedge_after
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    g = future.result()
+                except Exception as err:
+                    errors[index] = err
+                    launch_next = True
+                    continue
+                if g.ok:
+                    return g
+                results[index] = g
+                launch_next = True
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def arace(location, providers, hedge_after_ms=300, **kwargs):
+    """Same as race, with asyncio: the queries still running once a result is ok are cancelled
+
+    :param ``location``: Your search location you want geocoded.
+    :param ``providers``: Providers in order of preference, names or (name, kwargs) tuples.
+    :param ``hedge_after_ms``: (default=300) Delay before querying the next provider.
+    """
+    queries = _race_queries(providers, kwargs)
+    for query_kwargs in queries:
+        _get_query_class(location, **query_kwargs)
+
+    loop = asyncio.get_running_loop()
+    hedge_after = hedge_after_ms / 1000.0
+    results, errors, pending = {}, {}, {}
+    next_index, launch_next = 0, True
+    try:
+        while True:
+            if launch_next and next_index < len(queries):
+                pending[asyncio.ensure_future(aget(location, **queries[next_index]))] = next_index
+                next_index += 1
+                launched = loop.time()
+            if not pending:
+                return _race_result(results, errors)
+
+            timeout = None
+            if next_index < len(queries):
+                timeout = max(0.0, launched + hedge_after - loop.time())
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            launch_next = loop.time() >= launched + hedge_after
+            for task in done:
+                index = pending.pop(task)
+                try:
+                    g = task.result()
+                except Exception as err:
+                    errors[index] = err
+                    launch_next = True
+                    continue
+                if g.ok:
+                    return g
+                results[index] = g
+                launch_next = True
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def fallback(location, providers, failure_threshold=5, reset_timeout=30, **kwargs):
+    """Get Geocode from the first provider with a result, trying providers in order
+
+    Each provider has a circuit breaker shared by the process (see geocoder.circuitbreaker):
+    after failure_threshold consecutive failures (connection errors, timeouts, server errors),
+    it is skipped for reset_timeout seconds instead of costing a timeout per query.
+
+    The first ok result is returned, the result of the first provider queried when none is ok.
+    A provider raising an exception (e.g a connection error) is a failure too, and the next
+    providers are queried: the exception of the first one is raised when none has a result.
+
+    :param ``location``: Your search location(s) you want geocoded.
+    :param ``providers``: Providers in order of preference, names or (name, kwargs) tuples.
+    :param ``failure_threshold``: (default=5) Consecutive failures opening a circuit.
+    :param ``reset_timeout``: (default=30) Seconds before querying a provider with an open circuit again.
+    :param ``method``: Define the method (geocode, reverse, batch...).
+    """
+    queries = _race_queries(providers, kwargs)
+    for query_kwargs in queries:
+        _get_query_class(location, **query_kwargs)
+
+    results = []
+    errors = []
+    for query_kwargs in queries:
+        # providers with a custom url (e.g self-hosted) have their own circuit
+        name = query_kwargs["provider"]
+        if query_kwargs.get("url"):
+            name += " " + query_kwargs["url"]
+        breaker = circuitbreaker.get_breaker(name, failure_threshold, reset_timeout)
+        if not breaker.allow():
+            continue
+
+        try:
+            g = get(location, **query_kwargs)
+        except Exception as err:
+            breaker.failure()
+            LOGGER.warning("Provider %s failed: %r", name, err)
+            errors.append(err)
+            continue
+        except BaseException:
+            # interrupted, neither a success nor a failure
+            breaker.release()
+            raise
+        if circuitbreaker.is_failure(g):
+            breaker.failure()
+        else:
+            breaker.success()
+
+        if g.ok:
+            return g
+        results.append(g)
+
+    if results:
+        return results[0]
+    if errors:
+        raise errors[0]
+    raise circuitbreaker.CircuitOpenError("Circuits open for every provider")
 
 
 def distance(*args, **kwargs):
@@ -199,6 +555,7 @@ def google(location, **kwargs):
         > batch
         > timezone
         > elevation
+        > elevation_batch
     """
     return get(location, provider="google", **kwargs)
 
@@ -439,6 +796,15 @@ def maxmind(location="me", **kwargs):
     return get(location, provider="maxmind", **kwargs)
 
 
+def maxmind_offline(location, **kwargs):
+    """MaxMind DB Provider, IP geolocation with a local GeoLite2 / GeoIP2 database
+
+    :param ``location``: Your search IP Address you want geocoded.
+    :param ``path``: MaxMind DB file (.mmdb), defaults to GEOCODER_MAXMIND_DB.
+    """
+    return get(location, provider="maxmind_offline", **kwargs)
+
+
 def ipinfo(location="", **kwargs):
     """IP Info.io Provider
 
@@ -509,6 +875,31 @@ def geonames(location, **kwargs):
     return get(location, provider="geonames", **kwargs)
 
 
+def geonames_offline(location, **kwargs):
+    """GeoNames offline Provider, reverse geocoding with a local GeoNames dump
+
+    :param ``location``: Your search location you want reverse geocoded.
+    :param ``path``: GeoNames dump (cities1000.txt...) or its index, defaults to GEOCODER_GEONAMES_DUMP.
+    :param ``admin1_codes``: (optional) admin1CodesASCII.txt, for the names of the states.
+    :param ``country_info``: (optional) countryInfo.txt, for the names of the countries.
+    :param ``maxRows``: (default=1) Max number of results to fetch
+    """
+    kwargs.setdefault("method", "reverse")
+    return get(location, provider="geonames_offline", **kwargs)
+
+
+def timezone_offline(location, **kwargs):
+    """Offline timezones Provider, timezone lookups in local timezone boundaries
+
+    :param ``location``: Your search location you want to retrieve timezone data.
+    :param ``path``: GeoJSON timezone boundaries or their index, defaults to GEOCODER_TIMEZONE_BOUNDARIES.
+    :param ``timestamp``: Define your own specified time to calculate the offsets.
+    :param ``cell_size``: (default=1.0) Size in degrees of the cells of the index built from GeoJSON.
+    """
+    kwargs.setdefault("method", "timezone")
+    return get(location, provider="timezone_offline", **kwargs)
+
+
 def mapzen(location, **kwargs):
     """Mapzen Provider
 
@@ -1,10 +1,14 @@
 #!/usr/bin/python
 # coding: utf8
 
+import asyncio
+import copy
 import functools
+import hashlib
 import json
 import logging
 import sys
+import time
 from builtins import str
 from collections import OrderedDict
 from collections.abc import MutableSequence
@@ -13,14 +17,16 @@ from urllib.parse import urlparse
 
 import requests
 
+from . import aio, instrumentation, normalize, ratelimit, retry, sessions, singleflight
+from .cache import SECRET_PARAMS, get_cache, make_key
 from .distance import Distance  # noqa
 
 LOGGER = logging.getLogger(__name__)
 
 
-@functools.lru_cache(maxsize=None)
-def get_session():
-    return requests.Session()
+def get_session(provider=None):
+    """requests session shared by the queries to provider, see geocoder.sessions"""
+    return sessions.get_session(provider)
 
 
 class OneResult(object):
@@ -78,6 +84,21 @@ class OneResult(object):
         "session",
     ]
 
+    # public attributes/properties exported in JSON format, computed once per class
+    _FIELDNAMES = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super(OneResult, cls).__init_subclass__(**kwargs)
+        cls._FIELDNAMES = cls._class_fieldnames()
+
+    @classmethod
+    def _class_fieldnames(cls):
+        """List the attributes/methods defined in the class, except for the ones defined
+        starting with '_' or flagged in cls._TO_EXCLUDE
+        """
+        to_exclude = frozenset(cls._TO_EXCLUDE)
+        return tuple(key for key in dir(cls) if not key.startswith("_") and key not in to_exclude)
+
     def __init__(self, json_content):
 
         self.raw = json_content
@@ -88,11 +109,6 @@ class OneResult(object):
         self.southeast = []
         self.southwest = []
 
-        # attributes returned in JSON format
-        self.fieldnames = []
-        self.json = {}
-        self._parse_json_with_fieldnames()
-
     # Essential attributes for Quality Control
     @property  # noqa
     def lat(self):
@@ -151,20 +167,50 @@ class OneResult(object):
         else:
             return "[{0},{1}]".format(self.lat, self.lng)
 
+    def __getattr__(self, name):
+        """Some attributes (e.g south, west, north, east) are only set as a side effect of
+        evaluating the properties exported in JSON. Build the JSON once, then look again.
+        """
+        if name.startswith("__") or "_json" in self.__dict__:
+            raise AttributeError("'{0}' object has no attribute '{1}'".format(self.__class__.__name__, name))
+        self._parse_json_with_fieldnames()
+        return object.__getattribute__(self, name)
+
+    @property
+    def fieldnames(self):
+        if "_fieldnames" not in self.__dict__:
+            self._parse_json_with_fieldnames()
+        return self._fieldnames
+
+    @property
+    def json(self):
+        if "_json" not in self.__dict__:
+            self._parse_json_with_fieldnames()
+        return self._json
+
     def _parse_json_with_fieldnames(self):
         """Parse the raw JSON with all attributes/methods defined in the class, except for the
         ones defined starting with '_' or flagged in cls._TO_EXCLUDE.
 
-        The final result is stored in self.json
+        Fieldnames of the class are computed once in cls._FIELDNAMES, only the public instance
+        attributes (e.g raw) are looked up per result.
+
+        The final result is stored in self.json, on first access
         """
-        for key in dir(self):
-            if not key.startswith("_") and key not in self._TO_EXCLUDE:
-                self.fieldnames.append(key)
-                value = getattr(self, key)
-                if value:
-                    self.json[key] = value
+        fieldnames = self._FIELDNAMES
+        extra = [key for key in self.__dict__ if not key.startswith("_") and key not in self._TO_EXCLUDE and key not in fieldnames]
+        if extra:
+            fieldnames = sorted(set(fieldnames).union(extra))
+
+        # set first, so that any lookup from the properties below does not recurse
+        self._json = json_content = {}
+        self._fieldnames = list(fieldnames)
+        for key in fieldnames:
+            value = getattr(self, key)
+            if value:
+                json_content[key] = value
         # Add OK attribute even if value is "False"
-        self.json["ok"] = self.ok
+        json_content["ok"] = self.ok
 
     @property
     def ok(self):
@@ -342,6 +388,18 @@ class OneResult(object):
         return self.street
 
 
+OneResult._FIELDNAMES = OneResult._class_fieldnames()
+
+
+class _PendingResult(object):
+    """Arguments of a result which has not been requested yet, see MultipleResultsQuery.__getitem__"""
+
+    __slots__ = ("args",)
+
+    def __init__(self, args):
+        self.args = args
+
+
 class MultipleResultsQuery(MutableSequence):
     """Will replace the Base class to support multiple results, with the following differences :
 
@@ -353,6 +411,8 @@ class MultipleResultsQuery(MutableSequence):
     - remaining class variables are names with convention: _CAPITALS
     - self.url derived from class var cls.URL, which must be a valid URL
     - self.timeout has default value from class var cls.TIMEOUT
+    - results are only instanciated when accessed, unless eager=True is given
+    - with initialize=False, the query is only sent by ainitialize (asyncio)
     """
 
     _URL = None
@@ -360,6 +420,8 @@ class MultipleResultsQuery(MutableSequence):
     _KEY = None
     _KEY_MANDATORY = True
     _TIMEOUT = 5.0
+    # list of (max_calls, seconds), see geocoder.ratelimit
+    _RATE_LIMITS = None
 
     @staticmethod
     def _is_valid_url(url):
@@ -391,6 +453,9 @@ class MultipleResultsQuery(MutableSequence):
     def __init__(self, location, **kwargs):
         super(MultipleResultsQuery, self).__init__()
         self._list = []
+        # seconds spent in the steps of the query, see geocoder.instrumentation
+        self._started = time.monotonic()
+        self.timings = {}
 
         # check validity of _URL
         if not self._is_valid_url(self._URL):
@@ -416,7 +481,22 @@ class MultipleResultsQuery(MutableSequence):
         self.encoding = kwargs.get("encoding", "utf-8")
         self.timeout = kwargs.get("timeout", self._TIMEOUT)
         self.proxies = kwargs.get("proxies", "")
-        self.session = kwargs.get("session", get_session())
+        self.session = kwargs.get("session") or get_session(self.provider)
+        # aiohttp session used by aconnect, defaults to the one of the running event loop
+        self.async_session = kwargs.get("async_session")
+        # build every result and its json when parsing (previous behaviour)
+        self.eager = kwargs.get("eager", False)
+        # responses are looked up in cache first, see geocoder.cache
+        self.cache = get_cache(kwargs.get("cache"))
+        self.cache_key = None
+        self.from_cache = False
+        # locations are normalized in the keys of the cache and single flight, see geocoder.normalize
+        self.normalizer = normalize.get_normalizer(kwargs.get("normalizer"))
+        # concurrent identical requests are sent once, see geocoder.singleflight
+        self.single_flight = singleflight.get_group(kwargs.get("single_flight"))
+        self.coalesced = False
+        # failed requests are sent again, see geocoder.retry
+        self.retry = retry.get_policy(kwargs.get("retry"))
         # headers can be overriden in _build_headers
         self.headers = self._build_headers(provider_key, **kwargs).copy()
         self.headers.update(kwargs.get("headers", {}))
@@ -424,6 +504,8 @@ class MultipleResultsQuery(MutableSequence):
         # it is an OrderedDict in order to preserve the order of the url query parameters
         self.params = OrderedDict(self._build_params(location, provider_key, **kwargs))
         self.params.update(kwargs.get("params", {}))
+        # shared by the queries to the same provider with the same key
+        self.rate_limiter = self._get_rate_limiter(provider_key, **kwargs)
 
         # results of query (set by _connect)
         self.status_code = None
@@ -435,12 +517,26 @@ class MultipleResultsQuery(MutableSequence):
 
         # hook for children class to finalize their setup before the query
         self._before_initialize(location, **kwargs)
+        self.timings["build"] = time.monotonic() - self._started
 
         # query and parse results
-        self._initialize()
+        if kwargs.get("initialize", True):
+            self._initialize()
+
+    @classmethod
+    async def aquery(cls, location, **kwargs):
+        """Asynchronous counterpart of cls(location, **kwargs)"""
+        query = cls(location, initialize=False, **kwargs)
+        await query.ainitialize()
+        return query
 
     def __getitem__(self, key):
-        return self._list[key]
+        if isinstance(key, slice):
+            return [self[index] for index in range(*key.indices(len(self)))]
+        result = self._list[key]
+        if isinstance(result, _PendingResult):
+            result = self._list[key] = self.one_result(*result.args)
+        return result
 
     def __setitem__(self, key, value):
         self._list[key] = value
@@ -457,6 +553,15 @@ class MultipleResultsQuery(MutableSequence):
     def add(self, value):
         self._list.append(value)
 
+    def _add_result(self, *args):
+        """Add a result built from args with self.one_result, either right away in eager mode
+        or when first accessed otherwise
+        """
+        if self.eager:
+            self.add(self.one_result(*args))
+        else:
+            self.add(_PendingResult(args))
+
     def __repr__(self):
         base_repr = "<[{0}] {1} - {2} {{0}}>".format(self.status, self.provider.title(), self.method.title())
         if len(self) == 0:
@@ -478,17 +583,105 @@ class MultipleResultsQuery(MutableSequence):
         """Can be overridden to finalize setup before the query"""
         pass
 
+    def _default_rate_limits(self):
+        """Can be overridden when the limits depend on the query, e.g on the plan of the key"""
+        return self._RATE_LIMITS
+
+    def _get_rate_limiter(self, provider_key, **kwargs):
+        """Limits are taken from kwargs['rate_limits'], GEOCODER_RATE_LIMITS_<PROVIDER>
+        or the default ones of the class. Disabled with rate_limit=False
+        """
+        if not kwargs.get("rate_limit", True):
+            return None
+        provider = getattr(self.__class__, "provider", "")
+        limits = kwargs.get("rate_limits") or ratelimit.get_limits(provider, self._default_rate_limits())
+        if not limits:
+            return None
+        return ratelimit.get_limiter(provider, limits, key=provider_key)
+
     def _initialize(self):
         # query URL and get valid JSON (also stored in self.json)
         json_response = self._connect()
+        self._handle_response(json_response)
 
+    async def ainitialize(self):
+        """Same as _initialize, the query being sent with aconnect"""
+        json_response = await self.aconnect()
+        self._handle_response(json_response)
+
+    def _handle_response(self, json_response):
         # catch errors
         has_error = self._catch_errors(json_response) if json_response else True
 
         # creates instances for results
         if not has_error:
+            # only valid responses are cached
+            if self.cache_key is not None and not self.from_cache:
+                self.cache.set(self.cache_key, json_response)
+
+            started = time.monotonic()
             self._parse_results(json_response)
 
+            # previous behaviour: all the results and their json are computed right away
+            if self.eager:
+                for result in self:
+                    result.json
+            self.timings["parse"] = time.monotonic() - started
+            self.timings["total"] = time.monotonic() - self._started
+            self._emit(
+                "on_parsed",
+                decode=self.timings.get("decode"),
+                parse=self.timings["parse"],
+                results=len(self),
+                from_cache=self.from_cache,
+                coalesced=self.coalesced,
+                total=self.timings["total"],
+            )
+        elif json_response:
+            # errors of the provider (e.g invalid key), request errors are emitted by _handle_request_error
+            self._emit_error()
+
+    def _emit(self, name, **event):
+        # events are only built when listened to
+        if instrumentation.listeners:
+            instrumentation.emit(name, self, event)
+
+    def _emit_error(self):
+        self.timings["total"] = time.monotonic() - self._started
+        self._emit("on_error", status_code=self.status_code, error=self.error, total=self.timings["total"])
+
+    def _send(self, send, idempotent=True):
+        """Returns the response of send(), sent again by self.retry when failing, and emits
+        its events. Requests which are not idempotent are only sent again when not processed.
+        """
+        self._emit("on_request_start", build=self.timings.get("build", 0.0))
+        started = time.monotonic()
+        response = self.retry.call(send, idempotent)
+        self._emit_response(response, started)
+        return response
+
+    async def _asend(self, send, idempotent=True):
+        """Same as _send, send being a coroutine function"""
+        self._emit("on_request_start", build=self.timings.get("build", 0.0))
+        started = time.monotonic()
+        response = await self.retry.acall(send, idempotent)
+        self._emit_response(response, started)
+        return response
+
+    def _emit_response(self, response, started):
+        self.timings["request"] = time.monotonic() - started
+        self.timings["server"] = response.elapsed.total_seconds()
+        if instrumentation.listeners:
+            # streamed responses are not read here
+            size = len(response.content) if response._content_consumed else int(response.headers.get("Content-Length") or 0)
+            self._emit(
+                "on_response",
+                status_code=response.status_code,
+                bytes=size,
+                request=self.timings["request"],
+                server=self.timings["server"],
+            )
+
     def _connect(self):
         """- Query self.url (validated cls._URL)
         - Analyse reponse and set status, errors accordingly
@@ -499,36 +692,181 @@ class MultipleResultsQuery(MutableSequence):
         """
         self.status_code = "Unknown"
 
+        json_response = self._get_cached_response()
+        if json_response is not None:
+            return json_response
+
+        return self._coalesce(self._request)
+
+    def _request(self):
         try:
             # make request and get response
-            self.response = response = self.rate_limited_get(
-                self.url, params=self.params, headers=self.headers, timeout=self.timeout, proxies=self.proxies
+            self.response = response = self._send(
+                functools.partial(self.rate_limited_get, self.url, params=self.params, headers=self.headers, timeout=self.timeout, proxies=self.proxies)
             )
+            return self._read_response(response)
+
+        except requests.exceptions.RequestException as err:
+            return self._handle_request_error(err)
+
+    async def aconnect(self):
+        """Asynchronous counterpart of _connect, sending the request with aiohttp when installed.
+
+        Children classes overriding _connect or rate_limited_get (e.g batches, rate limits)
+        keep their behaviour: they are run in the default executor of the event loop.
+        """
+        cls = self.__class__
+        if cls._connect is not MultipleResultsQuery._connect:
+            return await asyncio.get_running_loop().run_in_executor(None, self._connect)
+
+        self.status_code = "Unknown"
+
+        json_response = self._get_cached_response()
+        if json_response is not None:
+            return json_response
+
+        if self.single_flight is None:
+            return await self._arequest()
+        outcome, shared = await self.single_flight.ado(self._flight_key(), self._aoutcome, share=self._share_outcome)
+        return self._from_outcome(outcome, shared)
+
+    async def _arequest(self):
+        try:
+            self.response = response = await self._asend(
+                functools.partial(self.arate_limited_get, self.url, params=self.params, headers=self.headers, timeout=self.timeout, proxies=self.proxies)
+            )
+            return self._read_response(response)
+
+        except requests.exceptions.RequestException as err:
+            return self._handle_request_error(err)
+
+    def _coalesce(self, request):
+        """Returns request(), or the response of the identical request in flight when there is
+        one: concurrent queries with the same key (see _flight_key) share a single request.
+        """
+        if self.single_flight is None:
+            return request()
+        outcome, shared = self.single_flight.do(self._flight_key(), lambda: self._outcome(request()), share=self._share_outcome)
+        return self._from_outcome(outcome, shared)
+
+    def _flight_key(self):
+        """Cache key of the request, with what makes the responses of the same request differ:
+        credentials (secret params and headers), proxies and sessions
+        """
+        secrets = sorted((str(name), str(value)) for name, value in self.params.items() if str(name).lower() in SECRET_PARAMS)
+        headers = sorted((str(name), str(value)) for name, value in self.headers.items())
+        proxies = sorted(self.proxies.items()) if isinstance(self.proxies, dict) else self.proxies
+        private = json.dumps([secrets, headers, proxies, id(self.session), id(self.async_session)], default=str)
+        return self.cache_key or self._cache_key(), hashlib.sha256(private.encode("utf-8")).hexdigest()
+
+    def _outcome(self, json_response):
+        # what the queries sharing a request get from it
+        return {
+            "json": json_response,
+            "status_code": self.status_code,
+            "error": self.error,
+            "url": self.url,
+            "response": self.response,
+            "timings": dict((step, self.timings[step]) for step in ("request", "server", "decode") if step in self.timings),
+        }
+
+    async def _aoutcome(self):
+        return self._outcome(await self._arequest())
+
+    @staticmethod
+    def _share_outcome(outcome):
+        # copied before the results of the query are parsed from it
+        return dict(outcome, json=copy.deepcopy(outcome["json"]))
+
+    def _from_outcome(self, outcome, shared):
+        if not shared:
+            return outcome["json"]
+        self.coalesced = True
+        self.status_code, self.error, self.url, self.response = outcome["status_code"], outcome["error"], outcome["url"], outcome["response"]
+        self.timings.update(outcome["timings"])
+        LOGGER.info("Shared %s", self.url)
+        if self.error:
+            self._emit_error()
+        return copy.deepcopy(outcome["json"])
+
+    def _get_cached_response(self):
+        if self.cache is None:
+            return None
 
+        # computed before self.url is replaced by the url of the response
+        self.cache_key = self._cache_key()
+        json_response = self.cache.get(self.cache_key)
+        if json_response is not None:
+            self.from_cache = True
+            self.status_code = 200
+            self.url = requests.Request("GET", self.url, params=self.params).prepare().url
+            LOGGER.info("Cached %s", self.url)
+        return json_response
+
+    def _read_response(self, response):
+        """- Analyse reponse and set status, errors accordingly
+        - returns the content of the response as a JSON object
+        """
+        try:
             # check that response is ok
             self.status_code = response.status_code
             response.raise_for_status()
 
             # rely on json method to get non-empty well formatted JSON
+            started = time.monotonic()
             json_response = response.json()
+            self.timings["decode"] = time.monotonic() - started
             self.url = response.url
             LOGGER.info("Requested %s", self.url)
 
         except requests.exceptions.RequestException as err:
-            # store real status code and error
-            self.error = "ERROR - {}".format(str(err))
-            LOGGER.error("Status code %s from %s: %s", self.status_code, self.url, self.error)
-
-            # return False
-            return False
+            return self._handle_request_error(err)
 
         # return response within its JSON format
         return json_response
 
+    def _handle_request_error(self, err):
+        # store real status code and error
+        self.error = "ERROR - {}".format(str(err))
+        LOGGER.error("Status code %s from %s: %s", self.status_code, self.url, self.error)
+        self._emit_error()
+
+        # return False
+        return False
+
+    def _cache_key(self):
+        """Key of the request in cache: provider, method, url and params without secrets.
+
+        With a normalizer, the params holding the location are normalized, the request
+        being sent as given.
+        """
+        cls = self.__class__
+        params = self.params
+        if self.normalizer is not None and isinstance(self.location, str):
+            params = OrderedDict((name, self.normalizer(value) if value == self.location else value) for name, value in params.items())
+        return make_key(getattr(cls, "provider", ""), getattr(cls, "method", ""), self.url, params)
+
     def rate_limited_get(self, url, **kwargs):
-        """By default, simply wraps a session.get request"""
+        """By default, simply wraps a session.get request, once allowed by self.rate_limiter"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
         return self.session.get(url, **kwargs)
 
+    async def arate_limited_get(self, url, **kwargs):
+        """By default, wraps an aiohttp get request of self.async_session
+
+        Falls back on rate_limited_get, run in the default executor, when aiohttp is not
+        installed or when children classes override rate_limited_get
+        """
+        cls = self.__class__
+        async_session = self.async_session or aio.get_async_session()
+        if async_session is None or cls.rate_limited_get is not MultipleResultsQuery.rate_limited_get:
+            get = functools.partial(self.rate_limited_get, url, **kwargs)
+            return await asyncio.get_running_loop().run_in_executor(None, get)
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aacquire()
+        return await aio.request(async_session, "GET", url, **kwargs)
+
     def _adapt_results(self, json_response):
         """Allow children classes to format json_response into an array of objects
         OVERRIDE TO FETCH the correct array of objects when necessary
@@ -542,7 +880,7 @@ class MultipleResultsQuery(MutableSequence):
         params: array of objects (dictionnaries)
         """
         for json_dict in self._adapt_results(json_response):
-            self.add(self.one_result(json_dict))
+            self._add_result(json_dict)
 
         # set default result to use for delegation
         self.current_result = len(self) > 0 and self[0]
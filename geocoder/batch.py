@@ -0,0 +1,184 @@
+#!/usr/bin/python
+# coding: utf8
+
+import array
+import codecs
+import csv
+import io
+import sys
+import tempfile
+from collections import OrderedDict
+from collections.abc import Sequence
+from math import isnan
+
+from .base import OneResult
+from .distance import _numpy
+
+NAN = float("nan")
+
+# responses larger than SPOOL_MAX_SIZE bytes are written to disk
+SPOOL_MAX_SIZE = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+def spool(response):
+    """Copies the body of a response (requested with stream=True) in a temporary file,
+    kept in memory while small, and returns the file rewound
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    for chunk in response.iter_content(CHUNK_SIZE):
+        output.write(chunk)
+    output.seek(0)
+    return output
+
+
+def text_lines(content, encoding="utf-8"):
+    """Iterates over the decoded lines of content, bytes or a binary file"""
+    if isinstance(content, bytes):
+        content = io.BytesIO(content)
+    return codecs.getreader(encoding)(content)
+
+
+def ordered(rows, start, end):
+    """Yields the rows of the indexes start to end - 1, in order.
+
+    rows are (index, row) pairs in any order: rows are yielded as soon as all the rows of
+    the previous indexes are, the others being buffered meanwhile. Indexes without row
+    yield None once every row is read.
+    """
+    buffered = {}
+    next_index = start
+    for index, row in rows:
+        if index == next_index:
+            yield row
+            next_index += 1
+            while next_index in buffered:
+                yield buffered.pop(next_index)
+                next_index += 1
+        elif next_index < index < end:
+            buffered[index] = row
+
+    for index in range(next_index, end):
+        yield buffered.pop(index, None)
+
+
+class BatchResult(OneResult):
+    """Result of a batch, read from a row of BatchResults"""
+
+    def __init__(self, results, index):
+        self._matched = results.matched[index]
+        super(BatchResult, self).__init__(results.row(index))
+
+    @property
+    def lat(self):
+        return self.raw.get("lat")
+
+    @property
+    def lng(self):
+        return self.raw.get("lng")
+
+    @property
+    def address(self):
+        return self.raw.get("address")
+
+    @property
+    def city(self):
+        return self.raw.get("city")
+
+    @property
+    def postal(self):
+        return self.raw.get("postal")
+
+    @property
+    def state(self):
+        return self.raw.get("state")
+
+    @property
+    def country(self):
+        return self.raw.get("country")
+
+    @property
+    def ok(self):
+        return bool(self._matched)
+
+
+class BatchResults(Sequence):
+    """Results of a batch, stored in columns instead of one object per result: coordinates
+    in arrays of floats (NaN when missing), matches in bytes, and texts (address, city...)
+    in lists of interned strings (None when missing).
+
+    Items are BatchResult built on access.
+    """
+
+    def __init__(self):
+        self.lat = array.array("d")
+        self.lng = array.array("d")
+        self.matched = bytearray()
+        self.texts = OrderedDict()
+
+    def __len__(self):
+        return len(self.matched)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("batch result index out of range")
+        return BatchResult(self, index)
+
+    def append(self, matched=True, lat=None, lng=None, **texts):
+        """Adds the result of the next location, texts being address, city..."""
+        self.lat.append(NAN if lat is None else lat)
+        self.lng.append(NAN if lng is None else lng)
+        for field, text in texts.items():
+            if field not in self.texts:
+                self.texts[field] = [None] * len(self.matched)
+            self.texts[field].append(sys.intern(text) if text else None)
+        self.matched.append(1 if matched else 0)
+        for column in self.texts.values():
+            if len(column) < len(self.matched):
+                column.append(None)
+
+    def row(self, index):
+        """Dictionary of the values of a result"""
+        row = {}
+        if not isnan(self.lat[index]):
+            row["lat"] = self.lat[index]
+        if not isnan(self.lng[index]):
+            row["lng"] = self.lng[index]
+        for field, column in self.texts.items():
+            if column[index] is not None:
+                row[field] = column[index]
+        return row
+
+    def to_numpy(self):
+        """Returns the coordinates as a NumPy array of shape (len(self), 2): [[lat, lng], ...]"""
+        numpy = _numpy()
+        if numpy is None:
+            raise ImportError("BatchResults.to_numpy requires NumPy")
+        return numpy.column_stack((numpy.frombuffer(self.lat), numpy.frombuffer(self.lng)))
+
+    def to_csv(self, output):
+        """Writes the results as CSV in output (a text file): index, ok, lat, lng and texts"""
+        writer = csv.writer(output)
+        writer.writerow(["index", "ok", "lat", "lng"] + list(self.texts))
+        columns = list(self.texts.values())
+        for index, matched in enumerate(self.matched):
+            lat, lng = self.lat[index], self.lng[index]
+            row = [index, bool(matched), "" if isnan(lat) else lat, "" if isnan(lng) else lng]
+            writer.writerow(row + [column[index] or "" for column in columns])
+
+    @property
+    def geojson(self):
+        """FeatureCollection of the results with coordinates"""
+        features = []
+        for index, matched in enumerate(self.matched):
+            lat, lng = self.lat[index], self.lng[index]
+            if not matched or isnan(lat) or isnan(lng):
+                continue
+            properties = self.row(index)
+            properties["index"] = index
+            features.append({"type": "Feature", "properties": properties, "geometry": {"type": "Point", "coordinates": [lng, lat]}})
+        return {"type": "FeatureCollection", "features": features}
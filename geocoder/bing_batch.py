@@ -2,6 +2,8 @@
 # coding: utf8
 
 
+import asyncio
+import functools
 import io
 import logging
 import sys
@@ -9,6 +11,7 @@ import time
 
 import requests
 
+from . import batch
 from .base import MultipleResultsQuery, OneResult
 from .keys import bing_key
 
@@ -47,6 +50,145 @@ class BingBatchResult(OneResult):
             return [None, None]
 
 
+class BingBatchJob(object):
+    """Dataflow job submitted by BingBatch.submit.
+
+    Jobs run on Bing servers: any number of them can be submitted before waiting for their
+    results. Waiting polls the status of the job with an exponential backoff, either blocking
+    (wait, result) or with asyncio (await_, aresult, or simply await job).
+    """
+
+    def __init__(self, query, url, job_id):
+        self.query = query
+        self.url = url
+        self.job_id = job_id
+        self.status = "Pending"
+        self._handled = False
+
+    def __repr__(self):
+        return "<BingBatchJob {0} [{1}]>".format(self.job_id, self.status)
+
+    def __await__(self):
+        return self.aresult().__await__()
+
+    @property
+    def done(self):
+        return self.status == "Completed"
+
+    def _request_kwargs(self):
+        query = self.query
+        return {"params": {"key": query.provider_key}, "timeout": query.timeout, "proxies": query.proxies}
+
+    def _update(self, response):
+        response.raise_for_status()
+        for rs in response.json()["resourceSets"]:
+            for resource in rs["resources"]:
+                if resource["id"] == self.job_id:
+                    self.status = resource["status"]
+                    if self.status == "Aborted":
+                        raise LookupError("Bing job aborted")
+                    return self.done
+
+        raise LookupError("Job ID not found in Bing answer - something is wrong")
+
+    def _delays(self, timeout):
+        """Yields the delays between two polls, until timeout seconds have elapsed"""
+        query = self.query
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = query._BATCH_WAIT
+        while True:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                delay = min(delay, remaining)
+            yield delay
+            delay = min(delay * query._BATCH_WAIT_FACTOR, query._BATCH_WAIT_MAX)
+
+    def poll(self):
+        """Updates the status of the job, returns True when completed"""
+        query = self.query
+        return self._update(query._send(functools.partial(query.rate_limited_get, self.url, **self._request_kwargs())))
+
+    async def apoll(self):
+        """Same as poll, with asyncio"""
+        query = self.query
+        return self._update(await query._asend(functools.partial(query.arate_limited_get, self.url, **self._request_kwargs())))
+
+    def wait(self, timeout=None):
+        """Polls the job until completed, returns False if not completed within timeout seconds"""
+        if self.done or self.poll():
+            return True
+        for delay in self._delays(timeout):
+            time.sleep(delay)
+            if self.poll():
+                return True
+        return False
+
+    async def await_(self, timeout=None):
+        """Same as wait, with asyncio"""
+        if self.done or await self.apoll():
+            return True
+        for delay in self._delays(timeout):
+            await asyncio.sleep(delay)
+            if await self.apoll():
+                return True
+        return False
+
+    def _read_output(self, response):
+        response.raise_for_status()
+        # streamed to a temporary file, outputs can be larger than the memory
+        return batch.spool(response)
+
+    def output(self, timeout=None):
+        """Waits for the job and returns its output (CSV), as a binary file"""
+        if not self.wait(timeout):
+            raise LookupError("Job was not finished in time")
+        query = self.query
+        get = functools.partial(query.rate_limited_get, self.url + "/output/succeeded", stream=True, **self._request_kwargs())
+        return self._read_output(query._send(get))
+
+    async def aoutput(self, timeout=None):
+        """Same as output, with asyncio"""
+        if not await self.await_(timeout):
+            raise LookupError("Job was not finished in time")
+        query = self.query
+        get = functools.partial(query.arate_limited_get, self.url + "/output/succeeded", **self._request_kwargs())
+        return self._read_output(await query._asend(get))
+
+    def iter_results(self, timeout=None):
+        """Waits for the job and yields its results in the order of the locations, without
+        keeping them: for batches too large to fit in memory, e.g written to a file as read
+        """
+        query = self.query
+        for row in query._iter_rows(self.output(timeout)):
+            yield query.one_result(row)
+
+    def _handle_content(self, content):
+        self.query._handle_response(content)
+        self._handled = True
+
+    def result(self, timeout=None):
+        """Waits for the job and returns its query, with the results parsed"""
+        if not self._handled:
+            try:
+                content = self.output(timeout)
+            except (requests.exceptions.RequestException, LookupError) as err:
+                content = self.query._handle_request_error(err)
+            self._handle_content(content)
+        return self.query
+
+    async def aresult(self, timeout=None):
+        """Same as result, with asyncio"""
+        if not self._handled:
+            try:
+                content = await self.aoutput(timeout)
+            except (requests.exceptions.RequestException, LookupError) as err:
+                content = self.query._handle_request_error(err)
+            self._handle_content(content)
+        return self.query
+
+
 class BingBatch(MultipleResultsQuery):
     """
     Bing Maps REST Services
@@ -56,6 +198,12 @@ class BingBatch(MultipleResultsQuery):
     perform tasks such as creating a static map with pushpins, geocoding
     an address, retrieving imagery metadata, or creating a route.
 
+    Jobs can be submitted without waiting for them, from a query created with
+    initialize=False: see submit and BingBatchJob.
+
+    Results are stored in columns, batch_results (see geocoder.batch.BatchResults),
+    exported with to_numpy, to_csv and geojson.
+
     API Reference
     -------------
     http://msdn.microsoft.com/en-us/library/ff701714.aspx
@@ -70,11 +218,17 @@ class BingBatch(MultipleResultsQuery):
 
     _URL = "http://spatial.virtualearth.net/REST/v1/Dataflows/Geocode"
     _BATCH_TIMEOUT = 60
-    _BATCH_WAIT = 5
+    # seconds between two polls of a job, multiplied by _BATCH_WAIT_FACTOR after each one
+    _BATCH_WAIT = 1
+    _BATCH_WAIT_FACTOR = 2
+    _BATCH_WAIT_MAX = 30
 
     _RESULT_CLASS = BingBatchResult
     _KEY = bing_key
 
+    # BatchResults of the batch, once parsed
+    batch_results = None
+
     def extract_resource_id(self, response):
         for rs in response["resourceSets"]:
             for resource in rs["resources"]:
@@ -84,78 +238,90 @@ class BingBatch(MultipleResultsQuery):
         raise LookupError("No job ID returned from Bing batch call")
 
     def is_job_done(self, job_id):
-        url = "http://spatial.virtualearth.net/REST/v1/Dataflows/Geocode/{}".format(job_id)
-        response = self.session.get(url, params={"key": self.provider_key}, timeout=self.timeout, proxies=self.proxies)
-
-        for rs in response.json()["resourceSets"]:
-            for resource in rs["resources"]:
-                if resource["id"] == job_id:
-                    if resource["status"] == "Aborted":
-                        raise LookupError("Bing job aborted")
-                    return resource["status"] == "Completed"
-
-        raise LookupError("Job ID not found in Bing answer - something is wrong")
+        return BingBatchJob(self, "{0}/{1}".format(self._URL, job_id), job_id).poll()
 
     def get_job_result(self, job_id):
-        url = "http://spatial.virtualearth.net/REST/v1/Dataflows/Geocode/{}/output/succeeded".format(job_id)
-        response = self.session.get(url, params={"key": self.provider_key}, timeout=self.timeout, proxies=self.proxies)
-
-        return response.content
+        job = BingBatchJob(self, "{0}/{1}".format(self._URL, job_id), job_id)
+        return job._read_output(self.rate_limited_get(job.url + "/output/succeeded", stream=True, **job._request_kwargs())).read()
 
     def _build_params(self, locations, provider_key, **kwargs):
         self.batch = self.generate_batch(locations)
         self.locations_length = len(locations)
         self.provider_key = provider_key
-        self._BATCH_TIMEOUT = kwargs.get("timeout", 60)
+        # seconds to wait for the job, the timeout of the requests by default
+        self.batch_timeout = kwargs.get("batch_timeout", kwargs.get("timeout", self._BATCH_TIMEOUT))
 
         return {"input": "csv", "key": provider_key}
 
     def _build_headers(self, provider_key, **kwargs):
         return {"Content-Type": "text/plain"}
 
-    def _connect(self):
+    def submit(self):
+        """Submits the batch, and returns the BingBatchJob processing it"""
         self.status_code = "Unknown"
+        url = self.url
+        self.response = response = self._send(
+            functools.partial(self.session.post, url, data=self.batch, params=self.params, headers=self.headers, timeout=self.timeout, proxies=self.proxies),
+            # a job may be created by a request timing out: never submitted twice
+            idempotent=False,
+        )
+
+        # check that response is ok
+        self.status_code = response.status_code
+        response.raise_for_status()
+
+        # rely on json method to get non-empty well formatted JSON
+        json_response = response.json()
+        self.url = response.url
+        LOGGER.info("Requested %s", self.url)
+
+        # get the resource/job id
+        job_id = self.extract_resource_id(json_response)
+        return BingBatchJob(self, "{0}/{1}".format(url, job_id), job_id)
+
+    async def asubmit(self):
+        """Same as submit, with asyncio"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.submit)
 
+    def _connect(self):
         try:
-            self.response = response = self.session.post(
-                self.url, data=self.batch, params=self.params, headers=self.headers, timeout=self.timeout, proxies=self.proxies
-            )
-
-            # check that response is ok
-            self.status_code = response.status_code
-            response.raise_for_status()
-
-            # rely on json method to get non-empty well formatted JSON
-            json_response = response.json()
-            self.url = response.url
-            LOGGER.info("Requested %s", self.url)
-
-            # get the resource/job id
-            resource_id = self.extract_resource_id(json_response)
-            elapsed = 0
-
-            # try for _BATCH_TIMEOUT seconds to retrieve the results of that job
-            while elapsed < self._BATCH_TIMEOUT:
-                if self.is_job_done(resource_id):
-                    return self.get_job_result(resource_id)
-
-                elapsed = elapsed + self._BATCH_WAIT
-                time.sleep(self._BATCH_WAIT)
-
-            LOGGER.error("Job was not finished in time.")
+            return self.submit().output(self.batch_timeout)
+        except (requests.exceptions.RequestException, LookupError) as err:
+            return self._handle_request_error(err)
 
+    async def aconnect(self):
+        try:
+            job = await self.asubmit()
+            return await job.aoutput(self.batch_timeout)
         except (requests.exceptions.RequestException, LookupError) as err:
-            # store real status code and error
-            self.error = "ERROR - {}".format(str(err))
-            LOGGER.error("Status code %s from %s: %s", self.status_code, self.url, self.error)
+            return self._handle_request_error(err)
 
-        return False
+    def _iter_rows(self, response):
+        """Yields the rows of the output (file or bytes) in the order of the locations, None when not geocoded"""
+        for row in batch.ordered(self._adapt_results(response), 0, self.locations_length):
+            yield row
+        if not isinstance(response, bytes):
+            response.close()
 
-    def _parse_results(self, response):
-        rows = self._adapt_results(response)
+    def _columns(self, row):
+        """Values of a row as stored in BatchResults: lat, lng and texts"""
+        return {}
 
-        # re looping through the results to give them back in their original order
-        for idx in range(0, self.locations_length):
-            self.add(self.one_result(rows.get(str(idx), None)))
+    def _parse_results(self, response):
+        # results are stored in columns, given back in the order of the locations
+        self.batch_results = self._list = batch.BatchResults()
+        for row in self._iter_rows(response):
+            if row is None:
+                self.batch_results.append(False)
+            else:
+                self.batch_results.append(**self._columns(row))
 
         self.current_result = len(self) > 0 and self[0]
+
+    def iter_results(self):
+        """Submits the batch and yields its results in the order of the locations, without
+        keeping them: for batches too large to fit in memory, e.g written to a file as read.
+
+        To be used with a query created with initialize=False.
+        """
+        return self.submit().iter_results(self.batch_timeout)
@@ -6,12 +6,12 @@ import csv
 import io
 import sys
 
+from . import batch
 from .bing_batch import BingBatch, BingBatchResult
 
 PY2 = sys.version_info < (3, 0)
 csv_io = io.BytesIO if PY2 else io.StringIO
 csv_encode = (lambda input: input) if PY2 else (lambda input: input.encode("utf-8"))
-csv_decode = (lambda input: input) if PY2 else (lambda input: input.decode("utf-8"))
 
 
 class BingBatchForwardResult(BingBatchResult):
@@ -58,16 +58,18 @@ class BingBatchForward(BingBatch):
 
         return csv_encode("Bing Spatial Data Services, 2.0\n{}".format(out.getvalue()))
 
+    def _columns(self, row):
+        lat, lng = row
+        return {"lat": float(lat) if lat else None, "lng": float(lng) if lng else None}
+
     def _adapt_results(self, response):
-        result = csv_io(csv_decode(response))
+        """Yields (index, [lat, lng]) of the geocoded locations, as read from the output (file or bytes)"""
+        lines = batch.text_lines(response)
         # Skipping first line with Bing header
-        next(result)
-
-        rows = {}
-        for row in csv.DictReader(result):
-            rows[row["Id"]] = [row["GeocodeResponse/Point/Latitude"], row["GeocodeResponse/Point/Longitude"]]
+        next(lines)
 
-        return rows
+        for row in csv.DictReader(lines):
+            yield int(row["Id"]), [row["GeocodeResponse/Point/Latitude"], row["GeocodeResponse/Point/Longitude"]]
 
 
 if __name__ == "__main__":
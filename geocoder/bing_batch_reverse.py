@@ -6,12 +6,12 @@ import csv
 import io
 import sys
 
+from . import batch
 from .bing_batch import BingBatch, BingBatchResult
 
 PY2 = sys.version_info < (3, 0)
 csv_io = io.BytesIO if PY2 else io.StringIO
 csv_encode = (lambda input: input) if PY2 else (lambda input: input.encode("utf-8"))
-csv_decode = (lambda input: input) if PY2 else (lambda input: input.decode("utf-8"))
 
 
 class BingBatchReverseResult(BingBatchResult):
@@ -88,15 +88,19 @@ class BingBatchReverse(BingBatch):
 
         return csv_encode("Bing Spatial Data Services, 2.0\n{}".format(out.getvalue()))
 
+    def _columns(self, row):
+        return dict(zip(("address", "city", "postal", "state", "country"), row))
+
     def _adapt_results(self, response):
-        # print(type(response))
-        result = csv_io(csv_decode(response))
+        """Yields (index, [address, city, postal, state, country]) of the reverse geocoded
+        locations, as read from the output (file or bytes)
+        """
+        lines = batch.text_lines(response)
         # Skipping first line with Bing header
-        next(result)
+        next(lines)
 
-        rows = {}
-        for row in csv.DictReader(result):
-            rows[row["Id"]] = [
+        for row in csv.DictReader(lines):
+            yield int(row["Id"]), [
                 row["GeocodeResponse/Address/FormattedAddress"],
                 row["GeocodeResponse/Address/Locality"],
                 row["GeocodeResponse/Address/PostalCode"],
@@ -104,8 +108,6 @@ class BingBatchReverse(BingBatch):
                 row["GeocodeResponse/Address/CountryRegion"],
             ]
 
-        return rows
-
 
 if __name__ == "__main__":
     g = BingBatchReverse([(40.7943, -73.970859), (48.845580, 2.321807)], key=None)
@@ -0,0 +1,281 @@
+#!/usr/bin/python
+# coding: utf8
+
+import hashlib
+import json
+import logging
+import shelve
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+LOGGER = logging.getLogger(__name__)
+
+# query parameters holding credentials or signatures, never part of a cache key
+SECRET_PARAMS = frozenset(
+    [
+        "access_key",
+        "access_token",
+        "ak",
+        "api_key",
+        "apikey",
+        "app_code",
+        "app_id",
+        "client",
+        "client_secret",
+        "key",
+        "keystr",
+        "signature",
+        "sn",
+        "username",
+    ]
+)
+
+
+def make_key(provider, method, url, params):
+    """Build a cache key from a request, excluding the secret parameters (see SECRET_PARAMS)
+
+    Parameters are sorted, so that the same request always gives the same key, whatever
+    the order used by the provider to build them.
+    """
+    public_params = sorted((str(name), str(value)) for name, value in params.items() if str(name).lower() not in SECRET_PARAMS)
+    request = json.dumps([provider, method, url, public_params], ensure_ascii=False)
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+
+class BaseCache(object):
+    """Interface of the cache backends used by MultipleResultsQuery
+
+    :param ``maxsize``: (default=None) Max number of entries, least recently used ones are evicted first
+    :param ``ttl``: (default=None) Time to live of an entry, in seconds
+    """
+
+    def __init__(self, maxsize=None, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.RLock()
+
+    def _expires(self):
+        if self.ttl is None:
+            return None
+        return time.time() + self.ttl
+
+    @staticmethod
+    def _is_expired(expires):
+        return expires is not None and expires <= time.time()
+
+    def _eviction_target(self):
+        # on-disk caches evict a tenth of their entries at once, not one per insert
+        return self.maxsize - self.maxsize // 10
+
+    def get(self, key):
+        """Returns the value stored for key, None if missing or expired"""
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+
+class LRUCache(BaseCache):
+    """In-process cache, shared by the threads of the process
+
+    Values are stored serialized in JSON, so that results parsed from a cached response
+    never alter it.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        super(LRUCache, self).__init__(maxsize=maxsize, ttl=ttl)
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if self._is_expired(expires):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return json.loads(value)
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self._expires(), json.dumps(value))
+            self._entries.move_to_end(key)
+            while self.maxsize is not None and len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache(BaseCache):
+    """On-disk cache stored in a SQLite database, values must be serializable in JSON"""
+
+    def __init__(self, path=":memory:", maxsize=None, ttl=None):
+        super(SQLiteCache, self).__init__(maxsize=maxsize, ttl=ttl)
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS geocoder_cache (key TEXT PRIMARY KEY, value TEXT, expires REAL, accessed REAL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS geocoder_cache_accessed ON geocoder_cache (accessed)")
+        # number of entries, so that eviction is only run once maxsize is passed
+        self._count = self._select_count()
+
+    def _select_count(self):
+        return self._connection.execute("SELECT COUNT(*) FROM geocoder_cache").fetchone()[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute("SELECT value, expires FROM geocoder_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires = row
+            if self._is_expired(expires):
+                self.delete(key)
+                return None
+            self._connection.execute("UPDATE geocoder_cache SET accessed = ? WHERE key = ?", (time.time(), key))
+            return json.loads(value)
+
+    def set(self, key, value):
+        with self._lock:
+            row = (json.dumps(value), self._expires(), time.time(), key)
+            updated = self._connection.execute("UPDATE geocoder_cache SET value = ?, expires = ?, accessed = ? WHERE key = ?", row)
+            if updated.rowcount == 0:
+                self._connection.execute("INSERT OR REPLACE INTO geocoder_cache (value, expires, accessed, key) VALUES (?, ?, ?, ?)", row)
+                self._count += 1
+            if self.maxsize is not None and self._count > self.maxsize:
+                # the database may be shared with other processes
+                self._count = self._select_count()
+                if self._count > self.maxsize:
+                    self._connection.execute(
+                        "DELETE FROM geocoder_cache WHERE key IN (SELECT key FROM geocoder_cache ORDER BY accessed LIMIT ?)",
+                        (self._count - self._eviction_target(),),
+                    )
+                    self._count = self._select_count()
+
+    def delete(self, key):
+        with self._lock:
+            deleted = self._connection.execute("DELETE FROM geocoder_cache WHERE key = ?", (key,))
+            self._count -= deleted.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM geocoder_cache")
+            self._count = 0
+
+    def __len__(self):
+        with self._lock:
+            return self._select_count()
+
+    def close(self):
+        self._connection.close()
+
+
+class ShelveCache(BaseCache):
+    """On-disk cache stored in a shelve (dbm) file, values must be picklable"""
+
+    def __init__(self, path, maxsize=None, ttl=None):
+        super(ShelveCache, self).__init__(maxsize=maxsize, ttl=ttl)
+        self.path = path
+        self._shelf = shelve.open(path)
+        # keys from the least to the most recently used, read once: dbm files are not ordered
+        self._accessed = OrderedDict()
+        if maxsize is not None:
+            for _, stored_key in sorted((entry[1], stored_key) for stored_key, entry in self._shelf.items()):
+                self._accessed[stored_key] = None
+
+    def get(self, key):
+        with self._lock:
+            entry = self._shelf.get(key)
+            if entry is None:
+                return None
+            expires, accessed, value = entry
+            if self._is_expired(expires):
+                self.delete(key)
+                return None
+            if self.maxsize is not None:
+                # stored too, for the order of the index when the file is opened again
+                self._shelf[key] = (expires, time.time(), value)
+                self._accessed[key] = None
+                self._accessed.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._shelf[key] = (self._expires(), time.time(), value)
+            if self.maxsize is not None:
+                self._accessed[key] = None
+                self._accessed.move_to_end(key)
+                if len(self._accessed) > self.maxsize:
+                    target = self._eviction_target()
+                    while len(self._accessed) > target:
+                        stored_key, _ = self._accessed.popitem(last=False)
+                        if stored_key in self._shelf:
+                            del self._shelf[stored_key]
+
+    def delete(self, key):
+        with self._lock:
+            self._accessed.pop(key, None)
+            if key in self._shelf:
+                del self._shelf[key]
+
+    def clear(self):
+        with self._lock:
+            self._shelf.clear()
+            self._accessed.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._shelf)
+
+    def close(self):
+        with self._lock:
+            self._shelf.close()
+
+
+def get_cache(cache):
+    """Cache backend from the ``cache`` parameter of a query: either a cache instance,
+    or the path of a SQLite database
+    """
+    if cache is None or isinstance(cache, BaseCache):
+        return cache
+    if isinstance(cache, str):
+        return _get_sqlite_cache(cache)
+    raise ValueError("cache should be a path or a cache instance. Got %s" % cache)
+
+
+_SQLITE_CACHES = {}
+_SQLITE_CACHES_LOCK = threading.Lock()
+
+
+def _get_sqlite_cache(path):
+    # reuse the connection opened for a given database
+    with _SQLITE_CACHES_LOCK:
+        if path not in _SQLITE_CACHES:
+            LOGGER.debug("Opening cache %s", path)
+            _SQLITE_CACHES[path] = SQLiteCache(path)
+        return _SQLITE_CACHES[path]
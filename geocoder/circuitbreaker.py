@@ -0,0 +1,147 @@
+#!/usr/bin/python
+# coding: utf8
+
+import logging
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker(object):
+    """Stops sending queries to a provider after failure_threshold consecutive failures.
+
+    The circuit is then open: queries are not sent for reset_timeout seconds. After that a
+    single query is let through (half open), closing the circuit when it succeeds and opening
+    it again otherwise. Shared by the threads of the process.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self._lock = threading.Lock()
+        self.configure(failure_threshold, reset_timeout)
+        self.failures = 0
+        self.opened_at = None
+        self.calls = 0
+        self.rejected = 0
+        self._trial = False
+
+    def configure(self, failure_threshold, reset_timeout):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        with self._lock:
+            self.failure_threshold = failure_threshold
+            self.reset_timeout = reset_timeout
+
+    def __repr__(self):
+        return "<CircuitBreaker {0} [{1}]>".format(self.name, self.state)
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return OPEN
+        return HALF_OPEN
+
+    def allow(self):
+        """Returns True when a query can be sent, then followed by success or failure"""
+        with self._lock:
+            state = self.state
+            if state == CLOSED or (state == HALF_OPEN and not self._trial):
+                self._trial = state == HALF_OPEN
+                self.calls += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                LOGGER.info("Circuit of %s closed", self.name)
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def release(self):
+        """Ends a call let through by allow without outcome (e.g interrupted), so that the
+        next call can be the trial of a half open circuit
+        """
+        with self._lock:
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._trial:
+                    LOGGER.warning("Circuit of %s open after %s failures", self.name, self.failures)
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+    def stats(self):
+        """State and counters, e.g for metrics"""
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "calls": self.calls,
+                "rejected": self.rejected,
+            }
+
+
+class CircuitBreakerRegistry(object):
+    """Circuit breakers of the providers, created on first use. The failure_threshold and
+    reset_timeout of the last call apply to the breaker of a name.
+    """
+
+    def __init__(self):
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, failure_threshold=5, reset_timeout=30.0):
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, failure_threshold, reset_timeout)
+            else:
+                breaker.configure(failure_threshold, reset_timeout)
+            return breaker
+
+    def stats(self):
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return dict((breaker.name, breaker.stats()) for breaker in breakers)
+
+    def clear(self):
+        with self._lock:
+            self._breakers.clear()
+
+
+registry = CircuitBreakerRegistry()
+
+
+def get_breaker(name, failure_threshold=5, reset_timeout=30.0):
+    """Circuit breaker shared by the queries to name"""
+    return registry.get(name, failure_threshold, reset_timeout)
+
+
+def breaker_stats():
+    """{name: stats} of the circuit breakers of the process"""
+    return registry.stats()
+
+
+def is_failure(g):
+    """True when a query failed because of its provider: connection errors, timeouts, server
+    errors, rate limits and rejected keys. Locations without result are not failures.
+    """
+    status_code = g.status_code
+    if not isinstance(status_code, int):
+        return bool(g.error)
+    return status_code >= 500 or status_code in (401, 403, 429)
@@ -1,73 +1,260 @@
 #!/usr/bin/python
 # coding: utf8
 import argparse
-import fileinput
+import csv
 import json
 import os
+import sys
+import time
 
-from .api import options
+from .api import _geocode_many, distance, options
 
 providers = sorted(options)
 methods = ["geocode", "reverse", "elevation", "timezone", "places"]
 outputs = ["json", "osm", "geojson", "wkt"]
 units = ["kilometers", "miles", "feet", "meters"]
+formats = ["ndjson", "csv"]
+input_formats = ["text", "ndjson", "csv"]
 
+# arguments of the command line which are not passed to the providers
+CLI_ARGS = [
+    "location",
+    "output",
+    "units",
+    "distance",
+    "format",
+    "input_format",
+    "column",
+    "fields",
+    "workers",
+    "unordered",
+    "checkpoint",
+    "progress",
+]
 
-def get_args():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("location")
+
+def get_args(args=None):
+    parser = argparse.ArgumentParser(description="Geocode locations given as arguments, in files or from standard input.")
+    parser.add_argument("location", nargs="*", help="locations or files of locations, standard input when omitted or -")
     parser.add_argument("--provider", "-p", default="osm", choices=providers)
     parser.add_argument("--method", "-m", default="geocode", choices=methods)
     parser.add_argument("--output", "-o", default="json", choices=outputs)
     parser.add_argument("--units", "-u", default="kilometers", choices=units)
-    parser.add_argument("--timeout", "-t", default=5.0)
-    parser.add_argument("--distance", is_flag=True)
+    parser.add_argument("--timeout", "-t", default=5.0, type=float)
+    parser.add_argument("--distance", action="store_true")
     parser.add_argument("--language", default="")
     parser.add_argument("--url", default="")
     parser.add_argument("--proxies")
     parser.add_argument("--key")
+    parser.add_argument("--cache", help="path of a SQLite file caching the responses")
     # following are for Tamu provider
     parser.add_argument("--city", "-c", default="")
     parser.add_argument("--state", "-s", default="")
     parser.add_argument("--zipcode", "-z", default="")
-    return vars(parser.parse_args())
+    # streaming
+    parser.add_argument("--format", "-f", default="ndjson", choices=formats, help="format of the results")
+    parser.add_argument("--input-format", default="text", choices=input_formats, help="format of the files and standard input")
+    parser.add_argument("--column", default="location", help="field of the location in csv and ndjson inputs")
+    parser.add_argument("--fields", default="address,lat,lng,status", help="fields of the results in csv format")
+    parser.add_argument("--workers", "-w", default=1, type=int, help="number of locations geocoded concurrently")
+    parser.add_argument("--unordered", action="store_true", help="write results as they complete, with the index of their location")
+    parser.add_argument("--checkpoint", help="file recording the geocoded locations, to resume an interrupted run")
+    parser.add_argument("--progress", action="store_true", help="report the throughput on standard error")
+    return vars(parser.parse_args(args))
 
 
-def cli():
-    """Geocode an arbitrary number of strings from Command Line."""
+def _read_lines(item):
+    """Yields the lines of standard input (-) or of a file"""
+    if item == "-":
+        for line in sys.stdin:
+            yield line
+    else:
+        with open(item, "r", encoding="utf-8") as lines:
+            for line in lines:
+                yield line
 
-    locations = []
 
-    # Read Standard Input
-    # $ cat foo.txt | geocode
-    try:
-        for line in fileinput.input():
-            locations.append(line.strip())
-    except:
-        pass
-
-    # Read multiple files & user input location
-    for item in location:
-        if os.path.exists(item):
-            with open(item, "rb") as f:
-                locations += f.read().splitlines()
+def _read_locations(lines, input_format, column):
+    if input_format == "csv":
+        for row in csv.DictReader(lines):
+            yield row[column]
+    elif input_format == "ndjson":
+        for line in lines:
+            if line.strip():
+                location = json.loads(line)
+                yield location[column] if isinstance(location, dict) else location
+    else:
+        for line in lines:
+            if line.strip():
+                yield line.strip()
+
+
+def read_locations(items, input_format="text", column="location"):
+    """Yields the locations lazily: items are locations, files of locations, or - for
+    standard input (the default when there are no items)
+    """
+    for item in items or ["-"]:
+        if item == "-" or os.path.isfile(item):
+            for location in _read_locations(_read_lines(item), input_format, column):
+                yield location
         else:
-            locations.append(item)
+            yield item
+
+
+def geocode_locations(locations, workers=1, ordered=True, skip=None, **kwargs):
+    """Yields (index, location, result) with a pool of threads.
+
+    Results are yielded in the order of locations, or as soon as they are available when
+    ordered is False. Indexes in skip are not geocoded. See geocoder.get_many.
+    """
+    items = ((index, location) for index, location in enumerate(locations) if not (skip and index in skip))
+    return _geocode_many(items, workers, ordered, **kwargs)
+
+
+class Checkpoint(object):
+    """Indexes of the locations already written, saved in a JSON file.
+
+    Stored as the number of locations written in a row from the start, and the indexes
+    written after them (results written unordered).
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.done = 0
+        self.completed = set()
+        if path and os.path.exists(path):
+            with open(path, "r") as checkpoint_file:
+                state = json.load(checkpoint_file)
+            self.done = state["done"]
+            self.completed = set(state["completed"])
+
+    def __contains__(self, index):
+        return index < self.done or index in self.completed
+
+    def __len__(self):
+        return self.done + len(self.completed)
+
+    def add(self, index):
+        self.completed.add(index)
+        while self.done in self.completed:
+            self.completed.remove(self.done)
+            self.done += 1
+
+    def save(self):
+        if not self.path:
+            return
+        # write then rename, the checkpoint is never left half written
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as checkpoint_file:
+            json.dump({"done": self.done, "completed": sorted(self.completed)}, checkpoint_file)
+        os.replace(tmp_path, self.path)
+
+
+class Progress(object):
+    """Reports the number of locations geocoded per second on a stream"""
+
+    def __init__(self, stream=None, interval=5.0):
+        self.stream = stream
+        self.interval = interval
+        self.count = 0
+        self.errors = 0
+        self.started = self.reported = time.monotonic()
+
+    def update(self, ok):
+        self.count += 1
+        self.errors += not ok
+        if self.stream and time.monotonic() - self.reported >= self.interval:
+            self.report()
+
+    def report(self):
+        self.reported = time.monotonic()
+        elapsed = self.reported - self.started
+        rate = self.count / elapsed if elapsed else 0.0
+        self.stream.write("{0} locations geocoded in {1:.1f}s ({2:.1f}/s), {3} errors\n".format(self.count, elapsed, rate, self.errors))
+        self.stream.flush()
+
+
+class NdjsonWriter(object):
+    def __init__(self, stream, output="json", with_index=False):
+        self.stream = stream
+        self.output = output
+        self.with_index = with_index
+
+    def write(self, index, location, g):
+        result = getattr(g, self.output)
+        if self.with_index:
+            result = {"index": index, "location": location, "result": result}
+        self.stream.write(json.dumps(result) + "\n")
+
+
+class CsvWriter(object):
+    def __init__(self, stream, fields, with_index=False, header=True):
+        self.fields = fields
+        self.with_index = with_index
+        self.writer = csv.writer(stream)
+        if header:
+            self.writer.writerow((["index"] if with_index else []) + ["location"] + fields)
+
+    def write(self, index, location, g):
+        json_result = g.json
+        row = [json_result.get(field, "") for field in self.fields]
+        if not isinstance(location, str):
+            location = json.dumps(location)
+        self.writer.writerow(([index] if self.with_index else []) + [location] + row)
+
+
+def _save(checkpoint):
+    # results are flushed before being recorded as written
+    sys.stdout.flush()
+    checkpoint.save()
+
+
+def cli(args=None):
+    """Geocode an arbitrary number of strings from Command Line."""
+    kwargs = get_args(args)
+    locations = read_locations(kwargs["location"], kwargs["input_format"], kwargs["column"])
+    query_kwargs = dict((key, value) for key, value in kwargs.items() if key not in CLI_ARGS and value not in ("", None))
 
     # Distance calculation
     if kwargs["distance"]:
-        d = geocoder.distance(locations, **kwargs)
-        print(d)
+        print(distance(list(locations), units=kwargs["units"]))
         return
 
-    # Geocode results from user input
-    for location in locations:
-        g = geocoder.get(location.strip(), **kwargs)
+    checkpoint = Checkpoint(kwargs["checkpoint"])
+    progress = Progress(sys.stderr if kwargs["progress"] else None)
+    with_index = kwargs["unordered"]
+    if kwargs["format"] == "csv":
+        # when resuming, the header was written by the first run
+        writer = CsvWriter(sys.stdout, kwargs["fields"].split(","), with_index, header=not len(checkpoint))
+    else:
+        writer = NdjsonWriter(sys.stdout, kwargs["output"], with_index)
+
+    results = geocode_locations(
+        locations,
+        workers=kwargs["workers"],
+        ordered=not kwargs["unordered"],
+        skip=checkpoint,
+        **query_kwargs
+    )
+    saved = time.monotonic()
+    try:
+        for index, location, g in results:
+            writer.write(index, location, g)
+            checkpoint.add(index)
+            progress.update(g.ok)
+            if checkpoint.path and time.monotonic() - saved >= 1.0:
+                _save(checkpoint)
+                saved = time.monotonic()
+    except BrokenPipeError:
+        # output closed, e.g piped to head
+        return
+    finally:
         try:
-            print(json.dumps(getattr(g, kwargs["output"])))
-        except IOError:
-            # When invalid command is entered a broken pipe error occurs
-            return
+            _save(checkpoint)
+        except BrokenPipeError:
+            pass
+        if progress.stream:
+            progress.report()
 
 
 if __name__ == "__main__":
@@ -3,11 +3,95 @@
 
 
 from math import asin, cos, radians, sin, sqrt
+from numbers import Real
 
-from .location import Location
+from .location import COORDINATES_PATTERN, Location
+
+# NumPy is only imported when the array functions are used, see _numpy
+numpy = False
 
 AVG_EARTH_RADIUS = 6371  # in km
 
+LOOKUP_UNITS = {
+    "miles": "miles",
+    "mile": "miles",
+    "mi": "miles",
+    "ml": "miles",
+    "kilometers": "kilometers",
+    "kilometres": "kilometers",
+    "kilometer": "kilometers",
+    "kilometre": "kilometers",
+    "km": "kilometers",
+    "meters": "meters",
+    "metres": "meters",
+    "meter": "meters",
+    "metre": "meters",
+    "m": "meters",
+    "feet": "feet",
+    "f": "feet",
+    "ft": "feet",
+}
+
+# from kilometers
+UNITS_FACTORS = {
+    "miles": 0.621371,
+    "feet": 0.621371 * 5280,
+    "meters": 1000,
+    "kilometers": 1,
+}
+
+
+def _numpy():
+    """NumPy module, None when not installed"""
+    global numpy
+    if numpy is False:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover
+            numpy = None
+    return numpy
+
+
+def _units_factor(units):
+    units = units.lower()
+    if units in LOOKUP_UNITS:
+        return UNITS_FACTORS[LOOKUP_UNITS[units]]
+    else:
+        raise ValueError("Unknown units of measurement")
+
+
+class _Point(object):
+    """Same interface as Location for valid numeric coordinates, without parsing them again"""
+
+    __slots__ = ("location", "latlng")
+    ok = True
+
+    def __init__(self, location, lat, lng):
+        self.location = location
+        self.latlng = [lat, lng]
+
+
+def _point(location):
+    if isinstance(location, (list, tuple)) and len(location) == 2:
+        lat, lng = location
+        is_number = isinstance(lat, Real) and isinstance(lng, Real) and not isinstance(lat, bool) and not isinstance(lng, bool)
+        if is_number and -90 <= lat <= 90 and -180 <= lng <= 180:
+            return _Point(location, float(lat), float(lng))
+    return Location(location)
+
+
+def _coordinates(location):
+    """Point of a location given as coordinates (list, "lat, lng" string, dict...), None
+    otherwise: addresses are not geocoded, e.g by the offline providers
+    """
+    if isinstance(location, str) and len(COORDINATES_PATTERN.findall(location)) != 2:
+        return None
+    try:
+        point = _point(location)
+    except ValueError:
+        return None
+    return point if point.ok else None
+
 
 def Distance(*args, **kwargs):
     total = 0.0
@@ -20,15 +104,28 @@ def Distance(*args, **kwargs):
         raise ValueError("Distance needs at least two locations")
 
     for location in args:
+        point = _point(location)
         if last:
-            distance = haversine(Location(last), Location(location), **kwargs)
+            distance = haversine(last, point, **kwargs)
             if distance:
                 total += distance
-        last = location
+        last = point
 
     return total
 
 
+def _haversine(lat1, lng1, lat2, lng2):
+    """Great-circle distance in kilometers, coordinates in decimal degrees"""
+    # convert all latitudes/longitudes from decimal degrees to radians
+    lat1, lng1, lat2, lng2 = radians(lat1), radians(lng1), radians(lat2), radians(lng2)
+
+    # calculate haversine
+    lat = lat2 - lat1
+    lng = lng2 - lng1
+    d = sin(lat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(lng / 2) ** 2
+    return 2 * AVG_EARTH_RADIUS * asin(sqrt(d))
+
+
 def haversine(point1, point2, **kwargs):
     """Calculate the great-circle distance bewteen two points on the Earth surface.
 
@@ -43,49 +140,11 @@ def haversine(point1, point2, **kwargs):
 
     """
 
-    lookup_units = {
-        "miles": "miles",
-        "mile": "miles",
-        "mi": "miles",
-        "ml": "miles",
-        "kilometers": "kilometers",
-        "kilometres": "kilometers",
-        "kilometer": "kilometers",
-        "kilometre": "kilometers",
-        "km": "kilometers",
-        "meters": "meters",
-        "metres": "meters",
-        "meter": "meters",
-        "metre": "meters",
-        "m": "meters",
-        "feet": "feet",
-        "f": "feet",
-        "ft": "feet",
-    }
-
     if point1.ok and point2.ok:
-        # convert all latitudes/longitudes from decimal degrees to radians
-        lat1, lng1, lat2, lng2 = list(map(radians, point1.latlng + point2.latlng))
-
-        # calculate haversine
-        lat = lat2 - lat1
-        lng = lng2 - lng1
-        d = sin(lat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(lng / 2) ** 2
-        h = 2 * AVG_EARTH_RADIUS * asin(sqrt(d))
+        h = _haversine(*(point1.latlng + point2.latlng))
 
         # Measurements
-        units = kwargs.get("units", "kilometers").lower()
-        units_calculation = {
-            "miles": h * 0.621371,
-            "feet": h * 0.621371 * 5280,
-            "meters": h * 1000,
-            "kilometers": h,
-        }
-
-        if units in lookup_units:
-            return units_calculation[lookup_units[units]]
-        else:
-            raise ValueError("Unknown units of measurement")
+        return h * _units_factor(kwargs.get("units", "kilometers"))
 
     else:
         print(
@@ -94,6 +153,63 @@ def haversine(point1, point2, **kwargs):
         )
 
 
+def haversine_many(lats1, lngs1, lats2, lngs2, units="kilometers"):
+    """Great-circle distances between the points (lats1[i], lngs1[i]) and (lats2[i], lngs2[i]).
+
+    Uses NumPy when available and returns an array, a list otherwise.
+
+    Example: haversine_many([45.7597, 45.4215], [4.8422, -75.6972], [48.8567, 43.6532], [2.3508, -79.3832])
+    """
+    if not len(lats1) == len(lngs1) == len(lats2) == len(lngs2):
+        raise ValueError("Coordinates must have the same length")
+    factor = _units_factor(units)
+
+    numpy = _numpy()
+    if numpy is not None:
+        return _haversine_arrays(numpy, lats1, lngs1, lats2, lngs2) * factor
+
+    return [_haversine(lat1, lng1, lat2, lng2) * factor for lat1, lng1, lat2, lng2 in zip(lats1, lngs1, lats2, lngs2)]
+
+
+def _haversine_arrays(numpy, lats1, lngs1, lats2, lngs2):
+    # kilometers, broadcast as NumPy arrays
+    lat1, lng1, lat2, lng2 = (numpy.radians(numpy.asarray(values, dtype=float)) for values in (lats1, lngs1, lats2, lngs2))
+    d = numpy.sin((lat2 - lat1) / 2) ** 2 + numpy.cos(lat1) * numpy.cos(lat2) * numpy.sin((lng2 - lng1) / 2) ** 2
+    return (2 * AVG_EARTH_RADIUS) * numpy.arcsin(numpy.sqrt(d))
+
+
+def haversine_matrix(lats1, lngs1, lats2, lngs2, units="kilometers"):
+    """Great-circle distances between every point of (lats1, lngs1) and every point of
+    (lats2, lngs2): matrix[i][j] is the distance from (lats1[i], lngs1[i]) to (lats2[j], lngs2[j]).
+
+    Uses NumPy when available and returns a 2D array, a list of lists otherwise.
+    """
+    if len(lats1) != len(lngs1) or len(lats2) != len(lngs2):
+        raise ValueError("Coordinates must have the same length")
+    factor = _units_factor(units)
+
+    numpy = _numpy()
+    if numpy is not None:
+        lats1, lngs1 = numpy.asarray(lats1, dtype=float)[:, None], numpy.asarray(lngs1, dtype=float)[:, None]
+        lats2, lngs2 = numpy.asarray(lats2, dtype=float)[None, :], numpy.asarray(lngs2, dtype=float)[None, :]
+        return _haversine_arrays(numpy, lats1, lngs1, lats2, lngs2) * factor
+
+    return [[_haversine(lat1, lng1, lat2, lng2) * factor for lat2, lng2 in zip(lats2, lngs2)] for lat1, lng1 in zip(lats1, lngs1)]
+
+
+def path_length(lats, lngs, units="kilometers"):
+    """Length of the path going through the points (lats[i], lngs[i]), in order"""
+    if len(lats) < 2:
+        return 0.0
+
+    numpy = _numpy()
+    if numpy is not None:
+        lats, lngs = numpy.asarray(lats, dtype=float), numpy.asarray(lngs, dtype=float)
+        return float(haversine_many(lats[:-1], lngs[:-1], lats[1:], lngs[1:], units=units).sum())
+
+    return sum(haversine_many(lats[:-1], lngs[:-1], lats[1:], lngs[1:], units=units))
+
+
 if __name__ == "__main__":
     d = Distance("Ottawa, ON", "Toronto, ON", "Montreal, QC")
     print(d)
@@ -4,9 +4,6 @@
 
 import logging
 
-import ratelim
-import requests
-
 from .base import MultipleResultsQuery, OneResult
 from .keys import freegeoip_key
 
@@ -118,15 +115,11 @@ class FreeGeoIPQuery(MultipleResultsQuery):
     _RESULT_CLASS = FreeGeoIPResult
     _KEY_MANDATORY = True
     _KEY = freegeoip_key
+    _RATE_LIMITS = [(10000, 60 * 60)]
 
     def _before_initialize(self, location, **kwargs):
         self.url += location
 
-    @staticmethod
-    @ratelim.greedy(10000, 60 * 60)
-    def rate_limited_get(*args, **kwargs):
-        return requests.get(*args, **kwargs)
-
     def _adapt_results(self, json_response):
         return [json_response]
 
@@ -1,4 +1,5 @@
 from .geonames import GeonamesQuery, GeonamesResult
+from .timezone_cache import get_timezone_cache
 
 
 class GeonamesFullResult(GeonamesResult):
@@ -93,6 +94,9 @@ class GeonamesFullResult(GeonamesResult):
 class GeonamesDetails(GeonamesQuery):
     """Details:
     http://api.geonames.org/getJSON?geonameId=6094817&style=full
+
+    With timezone_cache=True (or a TimezoneCellCache), the timezones of the places are
+    recorded in the cells of their coordinates, see geocoder.timezone_cache
     """
 
     provider = "geonames"
@@ -105,11 +109,21 @@ class GeonamesDetails(GeonamesQuery):
         """Will be overridden according to the targetted web service"""
         return {"geonameId": location, "username": provider_key, "style": "full"}
 
+    def _before_initialize(self, location, **kwargs):
+        self.timezone_cache = get_timezone_cache(kwargs.get("timezone_cache"))
+
     def _adapt_results(self, json_response):
         # the returned JSON contains the object.
         # Need to wrap it into an array
         return [json_response]
 
+    def _parse_results(self, json_response):
+        super(GeonamesDetails, self)._parse_results(json_response)
+        if self.timezone_cache is not None:
+            for result in self:
+                if result.timeZoneId and result.lat is not None and result.lng is not None:
+                    self.timezone_cache.observe(result.lat, result.lng, result.timeZoneId)
+
 
 if __name__ == "__main__":
     c = GeonamesDetails(6094817)
@@ -0,0 +1,294 @@
+#!/usr/bin/python
+# coding: utf8
+
+import array
+import heapq
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from math import asin, cos, radians, sin, sqrt
+from operator import itemgetter
+
+from .base import MultipleResultsQuery
+from .distance import AVG_EARTH_RADIUS, _coordinates
+from .geonames import GeonamesResult
+
+LOGGER = logging.getLogger(__name__)
+
+# magic, number of places
+_HEADER = struct.Struct("<8sQ")
+_MAGIC = b"GNKDTRE1"
+
+# columns of the GeoNames dumps (cities1000.txt, allCountries.txt, ...), see
+# http://download.geonames.org/export/dump/readme.txt
+_GEONAMEID, _NAME, _LAT, _LNG, _FCL, _FCODE, _COUNTRY_CODE, _ADMIN1_CODE, _POPULATION, _TIMEZONE = 0, 1, 4, 5, 6, 7, 8, 10, 14, 17
+
+
+def _to_xyz(lat, lng):
+    # on the unit sphere, the nearest point is the one with the smallest chord
+    lat, lng = radians(lat), radians(lng)
+    return cos(lat) * cos(lng), cos(lat) * sin(lng), sin(lat)
+
+
+def _chord_to_km(chord2):
+    return 2 * AVG_EARTH_RADIUS * asin(min(1.0, sqrt(chord2) / 2))
+
+
+def _read_names(path, key_column, name_column):
+    """Names of the admin1 codes (admin1CodesASCII.txt) or countries (countryInfo.txt)"""
+    names = {}
+    if path:
+        with open(path, "r", encoding="utf-8") as lines:
+            for line in lines:
+                if line.startswith("#"):
+                    continue
+                columns = line.rstrip("\n").split("\t")
+                if len(columns) > name_column:
+                    names[columns[key_column]] = columns[name_column]
+    return names
+
+
+def read_dump(path, admin1_codes=None, country_info=None, feature_classes=("P",)):
+    """Yields the places of a GeoNames dump as GeoNames JSON objects (same keys as the web services).
+
+    Admin and country names are only given when the admin1CodesASCII.txt and countryInfo.txt files are.
+    Only populated places are kept by default, feature_classes=None keeps every place.
+    """
+    admin1_names = _read_names(admin1_codes, 0, 1)
+    country_names = _read_names(country_info, 0, 4)
+
+    with open(path, "r", encoding="utf-8") as lines:
+        for line in lines:
+            columns = line.rstrip("\n").split("\t")
+            if len(columns) <= _TIMEZONE:
+                continue
+            if feature_classes and columns[_FCL] not in feature_classes:
+                continue
+            country_code, admin1_code = columns[_COUNTRY_CODE], columns[_ADMIN1_CODE]
+            place = {
+                "geonameId": int(columns[_GEONAMEID]),
+                "name": columns[_NAME],
+                "lat": columns[_LAT],
+                "lng": columns[_LNG],
+                "fcl": columns[_FCL],
+                "fcode": columns[_FCODE],
+                "countryCode": country_code,
+                "adminCode1": admin1_code,
+                "population": int(columns[_POPULATION] or 0),
+                "timezone": columns[_TIMEZONE],
+            }
+            if country_code in country_names:
+                place["countryName"] = country_names[country_code]
+            admin1_name = admin1_names.get("{0}.{1}".format(country_code, admin1_code))
+            if admin1_name:
+                place["adminName1"] = admin1_name
+            yield place
+
+
+def build_index(places, path):
+    """Writes places (GeoNames JSON objects) in the binary index file read by PlaceIndex.
+
+    The file contains the unit-sphere coordinates of the places, ordered as an implicit
+    KD-tree (the median of each range splits it along the axis depth % 3), followed by the
+    offsets and JSON encoded places. Floats are stored in the native byte order.
+    """
+    points = [_to_xyz(float(place["lat"]), float(place["lng"])) + (place,) for place in places]
+
+    # sort ranges on their axis, the median of each range being the node splitting it
+    ranges = [(0, len(points), 0)]
+    while ranges:
+        lo, hi, depth = ranges.pop()
+        if hi - lo <= 1:
+            continue
+        points[lo:hi] = sorted(points[lo:hi], key=itemgetter(depth % 3))
+        mid = (lo + hi) // 2
+        ranges.append((lo, mid, depth + 1))
+        ranges.append((mid + 1, hi, depth + 1))
+
+    coordinates = array.array("d")
+    offsets = array.array("Q", [0])
+    data = []
+    for x, y, z, place in points:
+        coordinates.extend((x, y, z))
+        data.append(json.dumps(place, separators=(",", ":")).encode("utf-8"))
+        offsets.append(offsets[-1] + len(data[-1]))
+
+    # write then rename, readers never see a partial index
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as output:
+        output.write(_HEADER.pack(_MAGIC, len(points)))
+        coordinates.tofile(output)
+        offsets.tofile(output)
+        output.writelines(data)
+    os.replace(tmp_path, path)
+    LOGGER.info("Indexed %s places in %s", len(points), path)
+
+
+class PlaceIndex(object):
+    """Nearest places lookups in a binary index file (see build_index), memory-mapped:
+    opening it is immediate, and only the pages visited by the lookups are read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as index_file:
+            self._mmap = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC:
+            self._mmap.close()
+            raise ValueError("Not a place index: {0}".format(path))
+
+        start = _HEADER.size
+        end = start + self.count * 3 * 8
+        self._view = memoryview(self._mmap)
+        self._coordinates = self._view[start:end].cast("d")
+        self._offsets = self._view[end:end + (self.count + 1) * 8].cast("Q")
+        self._data_start = end + (self.count + 1) * 8
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        for view in (self._coordinates, self._offsets, self._view):
+            view.release()
+        self._mmap.close()
+
+    def place(self, node):
+        start, end = self._offsets[node], self._offsets[node + 1]
+        return json.loads(self._mmap[self._data_start + start:self._data_start + end].decode("utf-8"))
+
+    def nearest_nodes(self, lat, lng, k=1):
+        """Returns [(squared chord, node)] of the k nearest places, the nearest first"""
+        target = _to_xyz(lat, lng)
+        x, y, z = target
+        coordinates = self._coordinates
+        # max-heap of the k nearest places found, as (-squared chord, node)
+        nearest = []
+        # ranges to visit, with a lower bound of their squared chord
+        ranges = [(0, self.count, 0, 0.0)]
+        while ranges:
+            lo, hi, depth, bound = ranges.pop()
+            if lo >= hi or (len(nearest) == k and bound >= -nearest[0][0]):
+                continue
+            mid = (lo + hi) // 2
+            i = 3 * mid
+            dx, dy, dz = x - coordinates[i], y - coordinates[i + 1], z - coordinates[i + 2]
+            chord2 = dx * dx + dy * dy + dz * dz
+            if len(nearest) < k:
+                heapq.heappush(nearest, (-chord2, mid))
+            elif chord2 < -nearest[0][0]:
+                heapq.heapreplace(nearest, (-chord2, mid))
+
+            axis = depth % 3
+            diff = target[axis] - coordinates[i + axis]
+            if diff < 0:
+                ranges.append((mid + 1, hi, depth + 1, diff * diff))
+                ranges.append((lo, mid, depth + 1, 0.0))
+            else:
+                ranges.append((lo, mid, depth + 1, diff * diff))
+                ranges.append((mid + 1, hi, depth + 1, 0.0))
+
+        return sorted((-chord2, node) for chord2, node in nearest)
+
+    def nearest(self, lat, lng, k=1):
+        """Returns the k nearest places (GeoNames JSON objects), with their distance in km"""
+        places = []
+        for chord2, node in self.nearest_nodes(lat, lng, k):
+            place = self.place(node)
+            place["distance"] = _chord_to_km(chord2)
+            places.append(place)
+        return places
+
+    def nearest_many(self, latlngs, k=1):
+        """Returns the k nearest places of each (lat, lng) of latlngs"""
+        return [self.nearest(lat, lng, k) for lat, lng in latlngs]
+
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def load_index(path, admin1_codes=None, country_info=None):
+    """PlaceIndex of a binary index file or of a GeoNames dump, shared process-wide.
+
+    The index of a dump is built in the file path + ".index" when missing or older than the dump.
+    """
+    path = os.path.realpath(path)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(path)
+        if index is None:
+            with open(path, "rb") as index_file:
+                is_index = index_file.read(len(_MAGIC)) == _MAGIC
+            index_path = path
+            if not is_index:
+                index_path = path + ".index"
+                if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(path):
+                    build_index(read_dump(path, admin1_codes, country_info), index_path)
+            index = _INDEXES[path] = PlaceIndex(index_path)
+        return index
+
+
+class GeonamesOfflineResult(GeonamesResult):
+    @property
+    def distance(self):
+        return self.raw.get("distance")
+
+    @property
+    def timezone(self):
+        return self.raw.get("timezone")
+
+
+class GeonamesOfflineReverse(MultipleResultsQuery):
+    """
+    GeoNames offline reverse geocoding
+    ==================================
+    Nearest places of a GeoNames dump (cities1000.txt, cities500.txt, allCountries.txt...),
+    looked up in a local KD-tree instead of a web service: no network, no rate limit.
+
+    The dump is given with path (or GEOCODER_GEONAMES_DUMP), its index being built once
+    next to it. Admin and country names are given by the admin1_codes and country_info files.
+
+    Data
+    ----
+    http://download.geonames.org/export/dump/
+    """
+
+    provider = "geonames_offline"
+    method = "reverse"
+
+    # where the dumps come from, no request is sent
+    _URL = "http://download.geonames.org/export/dump/"
+    _RESULT_CLASS = GeonamesOfflineResult
+    _KEY_MANDATORY = False
+
+    def _before_initialize(self, location, **kwargs):
+        path = kwargs.get("path") or os.environ.get("GEOCODER_GEONAMES_DUMP")
+        if not path:
+            raise ValueError("Provide the path of a GeoNames dump")
+        self.index = load_index(path, kwargs.get("admin1_codes"), kwargs.get("country_info"))
+        self.max_rows = int(kwargs.get("maxRows", 1))
+
+    def _connect(self):
+        self.status_code = "Unknown"
+        # addresses are not geocoded: no request is sent
+        point = _coordinates(self.location)
+        if point is None:
+            self.error = "Invalid coordinates: {0}".format(self.location)
+            LOGGER.error(self.error)
+            return False
+
+        lat, lng = point.latlng
+        self.status_code = 200
+        return {"geonames": self.index.nearest(lat, lng, self.max_rows)}
+
+    def _adapt_results(self, json_response):
+        return json_response["geonames"]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    g = GeonamesOfflineReverse([45.4215, -75.6972], path="cities1000.txt")
+    g.debug()
@@ -4,8 +4,6 @@
 
 from collections import OrderedDict
 
-import ratelim
-
 from .base import MultipleResultsQuery, OneResult
 from .keys import google_client, google_client_secret, google_key
 
@@ -172,6 +170,8 @@ class GoogleQuery(MultipleResultsQuery):
     _RESULT_CLASS = GoogleResult
     _KEY = google_key
     _KEY_MANDATORY = False
+    _RATE_LIMITS = [(10, 1), (2500, 60 * 60 * 24)]
+    _RATE_LIMITS_FOR_WORK = [(50, 1), (100000, 60 * 60 * 24)]  # Google for Work limits
 
     def _build_params(self, location, provider_key, **kwargs):
         params = self._location_init(location, **kwargs)
@@ -256,23 +256,10 @@ class GoogleQuery(MultipleResultsQuery):
         # Return signature (to be appended as a 'signature' in params)
         return encoded_signature
 
-    def rate_limited_get(self, *args, **kwargs):
-        if not self.rate_limit:
-            return super(GoogleQuery, self).rate_limited_get(*args, **kwargs)
-        elif self.client and self.client_secret:
-            return self.rate_limited_get_for_work(*args, **kwargs)
-        else:
-            return self.rate_limited_get_for_dev(*args, **kwargs)
-
-    @ratelim.greedy(2500, 60 * 60 * 24)
-    @ratelim.greedy(10, 1)
-    def rate_limited_get_for_dev(self, *args, **kwargs):
-        return super(GoogleQuery, self).rate_limited_get(*args, **kwargs)
-
-    @ratelim.greedy(100000, 60 * 60 * 24)  # Google for Work daily limit
-    @ratelim.greedy(50, 1)  # Google for Work limit per second
-    def rate_limited_get_for_work(self, *args, **kwargs):
-        return super(GoogleQuery, self).rate_limited_get(*args, **kwargs)
+    def _default_rate_limits(self):
+        if self.client and self.client_secret:
+            return self._RATE_LIMITS_FOR_WORK
+        return self._RATE_LIMITS
 
     def _catch_errors(self, json_response):
         status = json_response.get("status")
@@ -1,11 +1,74 @@
 #!/usr/bin/python
 # coding: utf8
 
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote
+
+import requests
 
 from .base import MultipleResultsQuery, OneResult
+from .distance import _point
 from .keys import google_key
 from .location import Location
 
+LOGGER = logging.getLogger(__name__)
+
+
+def _encode_value(value):
+    # signed value of an encoded polyline, see
+    # https://developers.google.com/maps/documentation/utilities/polylinealgorithm
+    value = ~(value << 1) if value < 0 else value << 1
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def _encode_points(points, previous=(0, 0)):
+    """Yields the encoded polyline of each point, relative to the previous one"""
+    prev_lat, prev_lng = previous
+    for lat, lng in points:
+        lat, lng = int(round(lat * 1e5)), int(round(lng * 1e5))
+        yield _encode_value(lat - prev_lat) + _encode_value(lng - prev_lng)
+        prev_lat, prev_lng = lat, lng
+
+
+def _polyline_length(point, previous=None):
+    """Length in a url of point encoded in a polyline, after previous"""
+    if previous is not None:
+        previous = int(round(previous[0] * 1e5)), int(round(previous[1] * 1e5))
+    return len(quote(next(_encode_points([point], previous or (0, 0))), safe=""))
+
+
+def encode_polyline(points):
+    """Encoded polyline of [(lat, lng)], precise to 1e-5 degrees (about 1m)"""
+    return "".join(_encode_points(points))
+
+
+def _pipe_point(point):
+    return "{0!r},{1!r}".format(*point)
+
+
+def _format_points(points):
+    """Shortest value of the locations or path parameters: pipe separated or encoded polyline"""
+    pipe = "|".join(_pipe_point(point) for point in points)
+    polyline = "enc:" + encode_polyline(points)
+    return min(pipe, polyline, key=lambda value: len(quote(value, safe="")))
+
+
+def _latlng(location):
+    # arrays (e.g rows of NumPy arrays) are read as (lat, lng)
+    if not isinstance(location, (str, dict, list, tuple)) and hasattr(location, "__iter__"):
+        location = tuple(location)
+    point = _point(location)
+    if not point.ok:
+        raise ValueError("Invalid location: {0}".format(location))
+    return tuple(point.latlng)
+
 
 class ElevationResult(OneResult):
     @property
@@ -69,6 +132,142 @@ class ElevationQuery(MultipleResultsQuery):
         return json_response["results"]
 
 
+class ElevationBatchQuery(MultipleResultsQuery):
+    """
+    Google Elevation API, batches
+    =============================
+    Elevations of many locations, sent in as few requests as possible: up to 512 locations
+    per request, within the maximum length of the urls, as pipe separated coordinates or as
+    an encoded polyline when shorter. Requests are sent by workers threads, results being
+    given in the order of the locations (failed ones not ok, their chunks being listed in
+    failed_chunks).
+
+    With path=True, the elevations of samples points evenly spaced along the path of the
+    locations are given instead.
+
+    API Reference
+    -------------
+    https://developers.google.com/maps/documentation/elevation/
+    """
+
+    provider = "google"
+    method = "elevation_batch"
+
+    _URL = "https://maps.googleapis.com/maps/api/elevation/json"
+    _RESULT_CLASS = ElevationResult
+    _KEY = google_key
+    # limits of the API
+    _MAX_POINTS = 512
+    _MAX_URL_LENGTH = 16384
+
+    def _build_params(self, locations, provider_key, **kwargs):
+        self.points = [_latlng(location) for location in locations]
+        self.path = kwargs.get("path", False)
+        self.samples = int(kwargs.get("samples", len(self.points)))
+        self.workers = int(kwargs.get("workers", 4))
+        # (start, end) indexes of the chunks which failed
+        self.failed_chunks = []
+        if self.path and not 2 <= self.samples <= self._MAX_POINTS:
+            raise ValueError("samples should be between 2 and {0}".format(self._MAX_POINTS))
+
+        params = {}
+        if provider_key:
+            params["key"] = provider_key
+        return params
+
+    def _max_length(self):
+        # characters left for the points in the url
+        url = requests.Request("GET", self.url, params=dict(self.params, locations="", samples=self.samples)).prepare().url
+        return self._MAX_URL_LENGTH - len(url)
+
+    def chunks(self):
+        """Returns [(start, end)] of the chunks of points, each sent in a request"""
+        max_length = self._max_length()
+        chunks = []
+        start = pipe_length = polyline_length = 0
+        for index, point in enumerate(self.points):
+            pipe = len(quote(_pipe_point(point), safe=""))
+            if index > start:
+                # lengths of the chunk with this point: "|" is quoted as %7C
+                pipe_length += 3 + pipe
+                polyline_length += _polyline_length(point, self.points[index - 1])
+                if index - start < self._MAX_POINTS and min(pipe_length, polyline_length) <= max_length:
+                    continue
+                chunks.append((start, index))
+                start = index
+            pipe_length, polyline_length = pipe, len("enc:") + _polyline_length(point)
+        if self.points:
+            chunks.append((start, len(self.points)))
+        return chunks
+
+    def _get_chunk(self, start, end):
+        """Returns (response, results of the points from start to end)"""
+        params = dict(self.params)
+        if self.path:
+            params.update(path=_format_points(self.points), samples=self.samples)
+        else:
+            params["locations"] = _format_points(self.points[start:end])
+        response = self._send(functools.partial(self.rate_limited_get, self.url, params=params, headers=self.headers, timeout=self.timeout, proxies=self.proxies))
+        response.raise_for_status()
+
+        json_response = response.json()
+        if json_response.get("status") != "OK":
+            raise requests.exceptions.RequestException("{0} {1}".format(json_response.get("status"), json_response.get("error_message", "")).strip(), response=response)
+        return response, json_response["results"]
+
+    @staticmethod
+    def _chunk_status(outcome):
+        response = getattr(outcome, "response", None) if isinstance(outcome, Exception) else outcome[0]
+        return response.status_code if response is not None else "Unknown"
+
+    def _connect(self):
+        """Returns the results of every point, in order ({} when failed)"""
+        self.status_code = "Unknown"
+        if self.path:
+            if len(quote(_format_points(self.points), safe="")) > self._max_length():
+                self.error = "ERROR - Path too long for a request"
+                return False
+            chunks = [(0, len(self.points))]
+        else:
+            chunks = self.chunks()
+        if not chunks:
+            return False
+
+        # {start: (response, results) or the exception of the chunk}, set by this thread only
+        outcomes = {}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(chunks))) as executor:
+            futures = dict((executor.submit(self._get_chunk, start, end), start) for start, end in chunks)
+            for future in as_completed(futures):
+                try:
+                    outcomes[futures[future]] = future.result()
+                except (requests.exceptions.RequestException, ValueError) as err:
+                    outcomes[futures[future]] = err
+
+        aligned = []
+        for start, end in chunks:
+            outcome = outcomes[start]
+            if isinstance(outcome, Exception):
+                error = "ERROR - {}".format(str(outcome))
+                LOGGER.error("Status code %s from %s for locations %s to %s: %s", self._chunk_status(outcome), self.url, start, end - 1, error)
+                self.failed_chunks.append((start, end))
+                aligned.extend([{}] * (self.samples if self.path else end - start))
+            else:
+                aligned.extend(outcome[1])
+
+        # status of the first chunk which failed, of the first chunk otherwise
+        outcome = next((outcomes[start] for start, _ in chunks if isinstance(outcomes[start], Exception)), outcomes[chunks[0][0]])
+        self.response = getattr(outcome, "response", None) if isinstance(outcome, Exception) else outcome[0]
+        self.status_code = self._chunk_status(outcome)
+
+        if len(self.failed_chunks) == len(chunks):
+            self.error = error
+            return False
+        return {"results": aligned}
+
+    def _adapt_results(self, json_response):
+        return json_response["results"]
+
+
 if __name__ == "__main__":
     g = ElevationQuery([45.123, -76.123])
     g.debug()
@@ -1,12 +1,15 @@
 #!/usr/bin/python
 # coding: utf8
 
-
+import logging
 import time
 
 from .base import MultipleResultsQuery, OneResult
 from .keys import google_key
 from .location import Location
+from .timezone_cache import get_timezone_cache
+
+LOGGER = logging.getLogger(__name__)
 
 
 class TimezoneResult(OneResult):
@@ -45,6 +48,9 @@ class TimezoneQuery(MultipleResultsQuery):
     API Reference
     -------------
     https://developers.google.com/maps/documentation/timezone/
+
+    With timezone_cache=True (or a TimezoneCellCache), locations in the interior of
+    a timezone already seen are answered without request, see geocoder.timezone_cache
     """
 
     provider = "google"
@@ -55,14 +61,36 @@ class TimezoneQuery(MultipleResultsQuery):
     _KEY = google_key
 
     def _build_params(self, location, provider_key, **kwargs):
+        # an address is geocoded once, the point is used by the timezone cache too
+        self.point = Location(location)
         return {
-            "location": str(Location(location)),
+            "location": str(self.point),
             "timestamp": kwargs.get("timestamp", time.time()),
         }
 
+    def _before_initialize(self, location, **kwargs):
+        # no cell for the locations without coordinates, sent as they are
+        self.timezone_cache = get_timezone_cache(kwargs.get("timezone_cache")) if self.point.ok else None
+        self.from_timezone_cache = False
+
+    def _get_cached_response(self):
+        if self.timezone_cache is not None:
+            json_response = self.timezone_cache.response(self.point.lat, self.point.lng, self.params["timestamp"])
+            if json_response is not None:
+                self.from_cache = self.from_timezone_cache = True
+                self.status_code = 200
+                LOGGER.info("Timezone of %s cached", self.point)
+                return json_response
+        return super(TimezoneQuery, self)._get_cached_response()
+
     def _adapt_results(self, json_response):
         return [json_response]
 
+    def _parse_results(self, json_response):
+        super(TimezoneQuery, self)._parse_results(json_response)
+        if self.timezone_cache is not None and not self.from_timezone_cache:
+            self.timezone_cache.remember(self.point.lat, self.point.lng, json_response)
+
 
 if __name__ == "__main__":
     g = TimezoneQuery([45.5375801, -75.2465979])
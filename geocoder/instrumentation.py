@@ -0,0 +1,238 @@
+#!/usr/bin/python
+# coding: utf8
+
+import bisect
+import logging
+import socket
+import threading
+
+LOGGER = logging.getLogger(__name__)
+
+# seconds, same as the default buckets of the Prometheus clients
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+# listeners of the queries of the process, see add_listener
+listeners = []
+_LISTENERS_LOCK = threading.Lock()
+
+
+class QueryListener(object):
+    """Notified of the steps of the queries, once added with add_listener.
+
+    Each method is called with the query and an event, a dictionary with its provider,
+    method and url, and:
+
+    - on_request_start: build, the seconds spent building the query (params, headers...)
+    - on_response: status_code, bytes (size of the content), request (seconds to get the
+      response, rate limits and retries included) and server (seconds between sending the
+      request and receiving the headers of the response)
+    - on_parsed: decode and parse (seconds spent decoding the JSON and parsing the results),
+      results (number of results), from_cache, coalesced (response of an identical query in
+      flight, see geocoder.singleflight) and total (seconds since the query was created)
+    - on_error: status_code, error and total
+
+    Listeners are called by the threads of the queries, and should return quickly.
+    """
+
+    def on_request_start(self, query, event):
+        pass
+
+    def on_response(self, query, event):
+        pass
+
+    def on_parsed(self, query, event):
+        pass
+
+    def on_error(self, query, event):
+        pass
+
+
+def add_listener(listener):
+    global listeners
+    with _LISTENERS_LOCK:
+        # replaced rather than modified, emit iterates without lock
+        listeners = listeners + [listener]
+    return listener
+
+
+def remove_listener(listener):
+    global listeners
+    with _LISTENERS_LOCK:
+        listeners = [item for item in listeners if item is not listener]
+
+
+def emit(name, query, event):
+    """Calls the method name of the listeners, their errors being logged"""
+    event["provider"] = getattr(query, "provider", "")
+    event["method"] = getattr(query, "method", "")
+    event["url"] = query.url
+    for listener in listeners:
+        try:
+            getattr(listener, name)(query, event)
+        except Exception:
+            LOGGER.exception("Listener %s failed on %s", listener, name)
+
+
+class Histogram(object):
+    """Counts of observations by bucket (upper bounds), with their sum"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # last count: observations above the largest bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        """[(upper bound, count of observations lower or equal)], +Inf last"""
+        counts, total = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            counts.append((bound, total))
+        return counts
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+class MetricsCollector(QueryListener):
+    """Aggregates the events by provider and method: latency histograms of the steps
+    (request, server, decode, parse, total), counters of queries, errors, status codes
+    and bytes received. Exported in the Prometheus text format with to_prometheus.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def _observe(self, labels, step, value):
+        key = labels + (step,)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def _increment(self, labels, counter, value=1):
+        key = labels + (counter,)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def on_request_start(self, query, event):
+        with self._lock:
+            labels = (event["provider"], event["method"])
+            self._increment(labels, "requests")
+            self._observe(labels, "build", event["build"])
+
+    def on_response(self, query, event):
+        with self._lock:
+            labels = (event["provider"], event["method"])
+            self._increment(labels, "responses_{0}".format(event["status_code"]))
+            self._increment(labels, "bytes", event["bytes"])
+            self._observe(labels, "request", event["request"])
+            self._observe(labels, "server", event["server"])
+
+    def on_parsed(self, query, event):
+        with self._lock:
+            labels = (event["provider"], event["method"])
+            self._increment(labels, "cached" if event["from_cache"] else "parsed")
+            for step in ("decode", "parse", "total"):
+                if event.get(step) is not None:
+                    self._observe(labels, step, event[step])
+
+    def on_error(self, query, event):
+        with self._lock:
+            labels = (event["provider"], event["method"])
+            self._increment(labels, "errors")
+            self._observe(labels, "total", event["total"])
+
+    def counter(self, provider, method, name):
+        return self.counters.get((provider, method, name), 0)
+
+    def histogram(self, provider, method, step):
+        return self.histograms.get((provider, method, step))
+
+    def to_prometheus(self, prefix="geocoder"):
+        """Metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+            metrics = {}
+            for (provider, method, name), value in counters:
+                labels = 'provider="{0}",method="{1}"'.format(provider, method)
+                if name.startswith("responses_"):
+                    name, labels = "responses", labels + ',status_code="{0}"'.format(name[len("responses_"):])
+                metrics.setdefault("{0}_{1}_total".format(prefix, name), []).append("{{{0}}} {1}".format(labels, value))
+            for metric in sorted(metrics):
+                lines.append("# TYPE {0} counter".format(metric))
+                lines.extend(metric + sample for sample in metrics[metric])
+
+            metrics = {}
+            for (provider, method, step), histogram in histograms:
+                metric = "{0}_{1}_duration_seconds".format(prefix, step)
+                labels = 'provider="{0}",method="{1}"'.format(provider, method)
+                samples = metrics.setdefault(metric, [])
+                for bound, count in histogram.cumulative_counts():
+                    samples.append('{0}_bucket{{{1},le="{2}"}} {3}'.format(metric, labels, _format_bound(bound), count))
+                samples.append("{0}_sum{{{1}}} {2}".format(metric, labels, histogram.sum))
+                samples.append("{0}_count{{{1}}} {2}".format(metric, labels, histogram.count))
+            for metric in sorted(metrics):
+                lines.append("# TYPE {0} histogram".format(metric))
+                lines.extend(metrics[metric])
+        return "\n".join(lines) + "\n"
+
+
+class StatsdExporter(QueryListener):
+    """Sends the events to a StatsD server (UDP): timers in milliseconds named
+    <prefix>.<provider>.<method>.<step>, and counters (requests, errors, bytes, status codes)
+    """
+
+    def __init__(self, host="localhost", port=8125, prefix="geocoder"):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _send(self, event, metrics):
+        name = "{0}.{1}.{2}".format(self.prefix, event["provider"], event["method"])
+        packet = "\n".join("{0}.{1}".format(name, metric) for metric in metrics)
+        try:
+            self._socket.sendto(packet.encode("utf-8"), self.address)
+        except OSError as err:
+            LOGGER.debug("Metrics not sent to %s: %s", self.address, err)
+
+    @staticmethod
+    def _timer(step, seconds):
+        return "{0}:{1:.3f}|ms".format(step, seconds * 1000)
+
+    def on_request_start(self, query, event):
+        self._send(event, ["requests:1|c", self._timer("build", event["build"])])
+
+    def on_response(self, query, event):
+        self._send(
+            event,
+            [
+                "status_{0}:1|c".format(event["status_code"]),
+                "bytes:{0}|c".format(event["bytes"]),
+                self._timer("request", event["request"]),
+                self._timer("server", event["server"]),
+            ],
+        )
+
+    def on_parsed(self, query, event):
+        metrics = ["{0}:1|c".format("cached" if event["from_cache"] else "parsed")]
+        metrics.extend(self._timer(step, event[step]) for step in ("decode", "parse", "total") if event.get(step) is not None)
+        self._send(event, metrics)
+
+    def on_error(self, query, event):
+        self._send(event, ["errors:1|c", self._timer("total", event["total"])])
+
+    def close(self):
+        self._socket.close()
@@ -13,6 +13,10 @@ except ImportError:
         return sum(args) / len(args)
 
 
+# numbers of a "lat, lng" string
+COORDINATES_PATTERN = re.compile(r"[-]?\d+[.]?[-]?[\d]+")
+
+
 class Location(object):
     """Location container"""
 
@@ -38,9 +42,7 @@ class Location(object):
     def _check_input(self, location):
         # Checking for a LatLng String
         if isinstance(location, str):
-            expression = r"[-]?\d+[.]?[-]?[\d]+"
-            pattern = re.compile(expression)
-            match = pattern.findall(location)
+            match = COORDINATES_PATTERN.findall(location)
             if len(match) == 2:
                 lat, lng = match
                 self._check_for_list([lat, lng])
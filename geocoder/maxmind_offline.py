@@ -0,0 +1,315 @@
+#!/usr/bin/python
+# coding: utf8
+
+import ipaddress
+import logging
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+from .base import MultipleResultsQuery
+from .maxmind import MaxmindResults
+
+LOGGER = logging.getLogger(__name__)
+
+_METADATA_MARKER = b"\xab\xcd\xefMaxMind.com"
+# the metadata is in the last 128KiB of the file
+_METADATA_MAX_SIZE = 128 * 1024
+# 16 bytes of zeros between the search tree and the data section
+_DATA_SEPARATOR_SIZE = 16
+
+_DOUBLE = struct.Struct(">d")
+_FLOAT = struct.Struct(">f")
+
+# data types, see https://maxmind.github.io/MaxMind-DB/
+_POINTER, _STRING, _DOUBLE_TYPE, _BYTES, _UINT16, _UINT32, _MAP, _INT32, _UINT64, _UINT128, _ARRAY, _CONTAINER, _END, _BOOLEAN, _FLOAT_TYPE = range(1, 16)
+
+
+class InvalidDatabaseError(ValueError):
+    pass
+
+
+class _Decoder(object):
+    """Decodes the data section of a MaxMind DB, values being referenced by their offset"""
+
+    def __init__(self, buffer, pointer_base=0):
+        self.buffer = buffer
+        self.pointer_base = pointer_base
+
+    def decode(self, offset):
+        """Returns (value, offset of the next value)"""
+        buffer = self.buffer
+        ctrl = buffer[offset]
+        offset += 1
+        data_type = ctrl >> 5
+
+        if data_type == _POINTER:
+            pointer, offset = self._decode_pointer(ctrl, offset)
+            return self.decode(pointer)[0], offset
+
+        if data_type == 0:
+            # extended type
+            data_type = 7 + buffer[offset]
+            offset += 1
+
+        size = ctrl & 0x1F
+        if size >= 29:
+            extra = size - 28
+            value = int.from_bytes(buffer[offset:offset + extra], "big")
+            offset += extra
+            size = (29, 285, 65821)[extra - 1] + value
+
+        if data_type == _MAP:
+            result = {}
+            for _ in range(size):
+                key, offset = self.decode(offset)
+                result[key], offset = self.decode(offset)
+            return result, offset
+        if data_type == _ARRAY:
+            result = []
+            for _ in range(size):
+                value, offset = self.decode(offset)
+                result.append(value)
+            return result, offset
+        if data_type == _BOOLEAN:
+            return bool(size), offset
+
+        end = offset + size
+        if data_type == _STRING:
+            return bytes(buffer[offset:end]).decode("utf-8"), end
+        if data_type in (_UINT16, _UINT32, _UINT64, _UINT128):
+            return int.from_bytes(buffer[offset:end], "big"), end
+        if data_type == _INT32:
+            return int.from_bytes(buffer[offset:end], "big", signed=size == 4), end
+        if data_type == _DOUBLE_TYPE:
+            return _DOUBLE.unpack_from(buffer, offset)[0], end
+        if data_type == _FLOAT_TYPE:
+            return _FLOAT.unpack_from(buffer, offset)[0], end
+        if data_type == _BYTES:
+            return bytes(buffer[offset:end]), end
+        raise InvalidDatabaseError("Unexpected data type {0} at {1}".format(data_type, offset))
+
+    def _decode_pointer(self, ctrl, offset):
+        size = (ctrl >> 3) & 0x3
+        value = ctrl & 0x7
+        buffer = self.buffer
+        if size == 0:
+            pointer = (value << 8) | buffer[offset]
+        elif size == 1:
+            pointer = ((value << 16) | int.from_bytes(buffer[offset:offset + 2], "big")) + 2048
+        elif size == 2:
+            pointer = ((value << 24) | int.from_bytes(buffer[offset:offset + 3], "big")) + 526336
+        else:
+            pointer = int.from_bytes(buffer[offset:offset + 4], "big")
+        return self.pointer_base + pointer, offset + size + 1
+
+
+class MMDBReader(object):
+    """Pure Python reader of MaxMind DB files (GeoLite2, GeoIP2 .mmdb), memory-mapped.
+
+    Records are shared by many networks: decoded records are kept in an LRU cache of
+    cache_size entries, and must not be modified.
+    """
+
+    def __init__(self, path, cache_size=4096):
+        self.path = path
+        with open(path, "rb") as database:
+            self._mmap = mmap.mmap(database.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+
+        start = self._mmap.rfind(_METADATA_MARKER, max(0, len(self._mmap) - _METADATA_MAX_SIZE))
+        if start == -1:
+            self.close()
+            raise InvalidDatabaseError("Not a MaxMind DB: {0}".format(path))
+        start += len(_METADATA_MARKER)
+        self.metadata = _Decoder(self._buffer[start:]).decode(0)[0]
+
+        self.node_count = self.metadata["node_count"]
+        self.record_size = self.metadata["record_size"]
+        self.ip_version = self.metadata["ip_version"]
+        if self.record_size not in (24, 28, 32):
+            self.close()
+            raise InvalidDatabaseError("Unsupported record size {0}".format(self.record_size))
+        self._node_size = self.record_size // 4
+        tree_size = self.node_count * self._node_size
+        self._decoder = _Decoder(self._buffer, tree_size + _DATA_SEPARATOR_SIZE)
+
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        # IPv4 addresses are stored in ::/96 of IPv6 databases
+        self._ipv4_start = 0
+        if self.ip_version == 6:
+            node = 0
+            for _ in range(96):
+                if node >= self.node_count:
+                    break
+                node = self._read_node(node, 0)
+            self._ipv4_start = node
+
+    def close(self):
+        self._decoder = None
+        self._buffer.release()
+        self._mmap.close()
+
+    @property
+    def database_type(self):
+        return self.metadata.get("database_type")
+
+    def _read_node(self, node, bit):
+        buffer = self._buffer
+        offset = node * self._node_size
+        if self.record_size == 24:
+            offset += bit * 3
+            return (buffer[offset] << 16) | (buffer[offset + 1] << 8) | buffer[offset + 2]
+        if self.record_size == 28:
+            middle = buffer[offset + 3]
+            if bit:
+                return ((middle & 0x0F) << 24) | int.from_bytes(buffer[offset + 4:offset + 7], "big")
+            return ((middle & 0xF0) << 20) | int.from_bytes(buffer[offset:offset + 3], "big")
+        offset += bit * 4
+        return int.from_bytes(buffer[offset:offset + 4], "big")
+
+    def _find(self, address):
+        """Returns (offset of the record or None, prefix length of the network)"""
+        packed = address.packed
+        bit_count = len(packed) * 8
+        node = 0
+        if address.version == 4 and self.ip_version == 6:
+            node = self._ipv4_start
+        elif address.version == 6 and self.ip_version == 4:
+            raise ValueError("IPv6 address {0} in an IPv4 database".format(address))
+
+        node_count = self.node_count
+        depth = 0
+        while depth < bit_count and node < node_count:
+            bit = (packed[depth >> 3] >> (7 - (depth & 7))) & 1
+            node = self._read_node(node, bit)
+            depth += 1
+
+        if node == node_count:
+            return None, depth
+        if node > node_count:
+            return node - node_count - _DATA_SEPARATOR_SIZE, depth
+        raise InvalidDatabaseError("Invalid node {0} in the search tree".format(node))
+
+    def _record(self, offset):
+        with self._lock:
+            record = self._cache.get(offset)
+            if record is not None:
+                self._cache.move_to_end(offset)
+                return record
+
+        record = self._decoder.decode(self._decoder.pointer_base + offset)[0]
+        with self._lock:
+            self._cache[offset] = record
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return record
+
+    def get_with_prefix_len(self, ip):
+        """Returns (record or None, prefix length of the network of ip)"""
+        address = ipaddress.ip_address(ip)
+        offset, prefix_len = self._find(address)
+        if offset is None:
+            return None, prefix_len
+        return self._record(offset), prefix_len
+
+    def get(self, ip):
+        """Returns the record of ip, None when not in the database"""
+        return self.get_with_prefix_len(ip)[0]
+
+    def get_many(self, ips):
+        """Returns the records of ips, in order"""
+        return [self.get(ip) for ip in ips]
+
+
+_READERS = {}
+_READERS_LOCK = threading.Lock()
+
+
+def open_database(path):
+    """MMDBReader of path, shared process-wide"""
+    path = os.path.realpath(path)
+    with _READERS_LOCK:
+        reader = _READERS.get(path)
+        if reader is None:
+            reader = _READERS[path] = MMDBReader(path)
+        return reader
+
+
+class MaxmindOfflineResult(MaxmindResults):
+    @property
+    def state(self):
+        subdivisions = self.raw.get("subdivisions") or [{}]
+        return subdivisions[0].get("names", {}).get("en")
+
+    @property
+    def accuracy_radius(self):
+        return self._location.get("accuracy_radius")
+
+    @property
+    def network(self):
+        return self._traits.get("network")
+
+
+class MaxmindOfflineQuery(MultipleResultsQuery):
+    """
+    MaxMind DB
+    ==========
+    Geolocation of IP addresses with a local GeoLite2 or GeoIP2 database (.mmdb),
+    read without any request: no network, no rate limit.
+
+    The database is given with path (or GEOCODER_MAXMIND_DB), and memory-mapped once
+    per process.
+
+    Data
+    ----
+    https://dev.maxmind.com/geoip/geolite2-free-geolocation-data
+    """
+
+    provider = "maxmind_offline"
+    method = "geocode"
+
+    # where the databases come from, no request is sent
+    _URL = "https://dev.maxmind.com/geoip/geolite2-free-geolocation-data"
+    _RESULT_CLASS = MaxmindOfflineResult
+    _KEY_MANDATORY = False
+
+    def _before_initialize(self, location, **kwargs):
+        path = kwargs.get("path") or os.environ.get("GEOCODER_MAXMIND_DB")
+        if not path:
+            raise ValueError("Provide the path of a MaxMind DB")
+        self.database = open_database(path)
+
+    def _connect(self):
+        self.status_code = "Unknown"
+        ip = str(self.location).strip()
+        try:
+            record, prefix_len = self.database.get_with_prefix_len(ip)
+        except ValueError as err:
+            self.error = "ERROR - {0}".format(err)
+            LOGGER.error(self.error)
+            return False
+
+        self.status_code = 200
+        if record is None:
+            self.error = "No results found"
+            return False
+
+        network = ipaddress.ip_network("{0}/{1}".format(ip, prefix_len), strict=False)
+        # the records are shared, the traits of the query are added to a copy
+        json_response = dict(record)
+        json_response["traits"] = dict(record.get("traits", {}), ip_address=ip, network=str(network))
+        return json_response
+
+    def _adapt_results(self, json_response):
+        return [json_response]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    g = MaxmindOfflineQuery("8.8.8.8", path="GeoLite2-City.mmdb")
+    g.debug()
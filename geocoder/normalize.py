@@ -0,0 +1,143 @@
+#!/usr/bin/python
+# coding: utf8
+
+import os
+import re
+import unicodedata
+
+# punctuation, but signs and decimal points of numbers (coordinates, ranges of numbers)
+_PUNCTUATION = re.compile(r"[^\w\s.\-]+|[.\-](?!\d)|_")
+
+# common abbreviations of the street types, directions and units, by language
+ABBREVIATIONS = {
+    "en": {
+        "street": "st",
+        "avenue": "ave",
+        "av": "ave",
+        "road": "rd",
+        "boulevard": "blvd",
+        "drive": "dr",
+        "lane": "ln",
+        "court": "ct",
+        "place": "pl",
+        "crescent": "cres",
+        "terrace": "ter",
+        "highway": "hwy",
+        "parkway": "pkwy",
+        "circle": "cir",
+        "square": "sq",
+        "trail": "trl",
+        "saint": "st",
+        "mount": "mt",
+        "north": "n",
+        "south": "s",
+        "east": "e",
+        "west": "w",
+        "northeast": "ne",
+        "northwest": "nw",
+        "southeast": "se",
+        "southwest": "sw",
+        "suite": "ste",
+        "apartment": "apt",
+    },
+    "fr": {
+        "avenue": "av",
+        "ave": "av",
+        "boulevard": "bd",
+        "boul": "bd",
+        "blvd": "bd",
+        "chemin": "ch",
+        "place": "pl",
+        "route": "rte",
+        "saint": "st",
+        "sainte": "ste",
+        "nord": "n",
+        "sud": "s",
+        "est": "e",
+        "ouest": "o",
+    },
+    "de": {
+        "strasse": "str",
+        "platz": "pl",
+        "nord": "n",
+        "süd": "s",
+        "ost": "o",
+        "west": "w",
+    },
+    "es": {
+        "calle": "c",
+        "avenida": "av",
+        "avda": "av",
+        "plaza": "pl",
+        "paseo": "p",
+        "carretera": "ctra",
+        "norte": "n",
+        "sur": "s",
+        "este": "e",
+        "oeste": "o",
+    },
+}
+
+# abbreviated at the end of compound words too, e.g hauptstrasse
+COMPOUND_SUFFIXES = {
+    "de": {"strasse": "str"},
+}
+
+
+class AddressNormalizer(object):
+    """Canonical form of an address, so that the same address written differently gives
+    the same cache key: Unicode NFKC, case folding, punctuation and whitespace folding,
+    and abbreviations of the street types and directions of the locale.
+
+    >>> normalizer = AddressNormalizer()
+    >>> normalizer("453  Booth Street, Ottawa") == normalizer("453 booth st. ottawa")
+    True
+
+    :param ``locale``: (default=en) Language of the abbreviations (en, fr, de, es)
+    :param ``abbreviations``: (optional) {word: abbreviation} added to the ones of the locale
+    """
+
+    def __init__(self, locale="en", abbreviations=None):
+        self.locale = locale
+        language = locale.replace("-", "_").split("_")[0].lower()
+        self.abbreviations = dict(ABBREVIATIONS.get(language, {}))
+        self.abbreviations.update(abbreviations or {})
+        self.suffixes = COMPOUND_SUFFIXES.get(language, {})
+
+    def __repr__(self):
+        return "<AddressNormalizer [{0}]>".format(self.locale)
+
+    def _abbreviate(self, word):
+        abbreviation = self.abbreviations.get(word)
+        if abbreviation is not None:
+            return abbreviation
+        for suffix, abbreviation in self.suffixes.items():
+            if word.endswith(suffix):
+                return word[: -len(suffix)] + abbreviation
+        return word
+
+    def __call__(self, address):
+        text = unicodedata.normalize("NFKC", str(address)).casefold()
+        return " ".join(self._abbreviate(word) for word in _PUNCTUATION.sub(" ", text).split())
+
+
+# used by the queries with normalizer=True
+address_normalizer = AddressNormalizer()
+
+# used by the queries without normalizer parameter, set with GEOCODER_NORMALIZE=<locale>
+default_normalizer = AddressNormalizer(os.environ["GEOCODER_NORMALIZE"]) if os.environ.get("GEOCODER_NORMALIZE") else None
+
+
+def get_normalizer(normalizer):
+    """Normalizer from the ``normalizer`` parameter of a query: None for default_normalizer,
+    True for the english AddressNormalizer, False for none, or a function of the location
+    """
+    if normalizer is None:
+        return default_normalizer
+    if normalizer is True:
+        return address_normalizer
+    if normalizer is False:
+        return None
+    if callable(normalizer):
+        return normalizer
+    raise ValueError("normalizer should be a boolean or a function. Got %s" % normalizer)
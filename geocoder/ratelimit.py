@@ -0,0 +1,178 @@
+#!/usr/bin/python
+# coding: utf8
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+LOGGER = logging.getLogger(__name__)
+
+
+def parse_limits(limits):
+    """Parse limits given as a string "max_calls/seconds,...", e.g "10/1,2500/86400" for
+    10 calls per second and 2500 calls per day
+    """
+    parsed = []
+    for limit in limits.split(","):
+        max_calls, period = limit.strip().split("/")
+        parsed.append((int(max_calls), float(period)))
+    return parsed
+
+
+class TokenBucket(object):
+    """Allows max_calls per period seconds, shared by the threads of the process.
+
+    The bucket starts full: max_calls can be done at once, then tokens are refilled
+    continuously at the rate of max_calls / period.
+    """
+
+    def __init__(self, max_calls, period):
+        if max_calls <= 0:
+            raise ValueError("max_calls must be positive")
+        if period <= 0:
+            raise ValueError("period must be positive")
+        self.capacity = float(max_calls)
+        self.rate = max_calls / float(period)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens, available, updated, now):
+        """Refill the available tokens since updated, take tokens and returns the tokens
+        left (negative when reserved in advance) and the number of seconds to wait
+        """
+        available = min(self.capacity, available + (now - updated) * self.rate) - tokens
+        wait = 0.0 if available >= 0 else -available / self.rate
+        return available, wait
+
+    def reserve(self, tokens=1):
+        """Take tokens, returns the number of seconds to wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens, wait = self._take(tokens, self._tokens, self._updated, now)
+            self._updated = now
+        return wait
+
+
+class FileTokenBucket(TokenBucket):
+    """Same as TokenBucket, the state being stored in a file locked while updated, so that
+    the bucket is shared by every process using the same file (POSIX only).
+    """
+
+    def __init__(self, path, max_calls, period):
+        if fcntl is None:
+            raise RuntimeError("FileTokenBucket requires fcntl (POSIX)")
+        super(FileTokenBucket, self).__init__(max_calls, period)
+        self.path = path
+
+    def reserve(self, tokens=1):
+        with self._lock, open(self.path, "a+") as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                content = state_file.read()
+                # the clock has to be shared by processes
+                now = time.time()
+                if content:
+                    state = json.loads(content)
+                    available, updated = state["tokens"], state["updated"]
+                else:
+                    available, updated = self.capacity, now
+                available, wait = self._take(tokens, available, updated, now)
+
+                state_file.seek(0)
+                state_file.truncate()
+                state_file.write(json.dumps({"tokens": available, "updated": now}))
+                state_file.flush()
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+        return wait
+
+
+class RateLimiter(object):
+    """Enforces all the limits of its buckets, e.g 10 calls per second and 2500 per day"""
+
+    def __init__(self, name, buckets):
+        self.name = name
+        self.buckets = buckets
+
+    def reserve(self, tokens=1):
+        return max(bucket.reserve(tokens) for bucket in self.buckets)
+
+    def acquire(self, tokens=1):
+        """Blocks until the call is allowed"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            LOGGER.debug("Rate limit %s: waiting %.3fs", self.name, wait)
+            time.sleep(wait)
+
+    async def aacquire(self, tokens=1):
+        """Same as acquire, without blocking the event loop"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            LOGGER.debug("Rate limit %s: waiting %.3fs", self.name, wait)
+            await asyncio.sleep(wait)
+
+
+class RateLimiterRegistry(object):
+    """Named rate limiters, shared process-wide.
+
+    When a directory is given, buckets are stored in files of that directory and shared
+    by all the processes using it.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, limits):
+        """Returns the limiter named name, enforcing limits: a list of (max_calls, seconds)"""
+        limits = tuple((int(max_calls), float(period)) for max_calls, period in limits)
+        with self._lock:
+            limiter = self._limiters.get((name, limits))
+            if limiter is None:
+                buckets = [self._create_bucket(name, max_calls, period) for max_calls, period in limits]
+                limiter = self._limiters[(name, limits)] = RateLimiter(name, buckets)
+            return limiter
+
+    def _create_bucket(self, name, max_calls, period):
+        if not self.directory:
+            return TokenBucket(max_calls, period)
+        filename = "{0}-{1}-{2:g}.json".format(re.sub(r"[^\w.-]", "_", name), max_calls, period)
+        return FileTokenBucket(os.path.join(self.directory, filename), max_calls, period)
+
+    def clear(self):
+        with self._lock:
+            self._limiters.clear()
+
+
+# GEOCODER_RATE_LIMITS_DIR: directory of the buckets shared by processes
+registry = RateLimiterRegistry(os.environ.get("GEOCODER_RATE_LIMITS_DIR"))
+
+
+def get_limits(provider, default=None):
+    """Limits of a provider, GEOCODER_RATE_LIMITS_<PROVIDER> (e.g "10/1,2500/86400") overriding default"""
+    limits = os.environ.get("GEOCODER_RATE_LIMITS_{0}".format(provider.upper()))
+    if limits:
+        return parse_limits(limits)
+    return default
+
+
+def get_limiter(provider, limits, key=None):
+    """Rate limiter shared by all the queries to provider with the same key"""
+    name = provider
+    if key:
+        # keys are not kept in memory nor written in file names
+        name += "-" + hashlib.sha1(str(key).encode("utf-8")).hexdigest()[:12]
+    return registry.get(name, limits)
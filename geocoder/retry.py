@@ -0,0 +1,197 @@
+#!/usr/bin/python
+# coding: utf8
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+LOGGER = logging.getLogger(__name__)
+
+# rate limited, and server errors which are usually transient
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# statuses of requests which were not processed, the only ones retried when not idempotent
+UNPROCESSED_STATUSES = frozenset([429, 503])
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header, given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+def _not_sent(err):
+    """True when the request of err was never sent: connection timeouts and failures"""
+    if isinstance(err, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(err, requests.exceptions.ConnectionError):
+        return False
+    reason = getattr(err.args[0], "reason", None) if err.args else None
+    if isinstance(reason, NewConnectionError):
+        return True
+    # aiohttp errors, raised as requests errors by geocoder.aio
+    aiohttp = sys.modules.get("aiohttp")
+    return aiohttp is not None and isinstance(err.__cause__, aiohttp.ClientConnectorError)
+
+
+class RetryPolicy(object):
+    """Sends requests again when they fail transiently: responses with a status of statuses
+    (429 and 5xx by default), connection errors and timeouts.
+
+    Up to max_attempts requests are sent, waiting between two of them for an exponential
+    backoff (backoff, 2 * backoff, 4 * backoff... up to backoff_max seconds) with full
+    jitter, or for the Retry-After of the response when longer. Responses asking to wait
+    more than retry_after_max seconds are not retried, and no request is sent again once
+    deadline seconds have elapsed since the first one.
+
+    Requests which are not idempotent (e.g creating a job) are only sent again when they
+    were not processed: connection failures before sending them, 429 and 503 responses.
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.5, backoff_max=30.0, jitter=True, deadline=None, retry_after_max=60.0, statuses=RETRY_STATUSES):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.deadline = deadline
+        self.retry_after_max = retry_after_max
+        self.statuses = frozenset(statuses)
+
+    def __repr__(self):
+        return "<RetryPolicy {0} attempts>".format(self.max_attempts)
+
+    def replace(self, **changes):
+        """Copy of the policy with changes"""
+        options = dict(vars(self), **changes)
+        return RetryPolicy(**options)
+
+    def _is_retriable_status(self, status_code, idempotent=True):
+        return status_code in self.statuses and (idempotent or status_code in UNPROCESSED_STATUSES)
+
+    def _is_retriable_error(self, err, idempotent=True):
+        response = getattr(err, "response", None)
+        if response is not None:
+            return self._is_retriable_status(response.status_code, idempotent)
+        if not idempotent:
+            return _not_sent(err)
+        return isinstance(err, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+    def _delay(self, attempt, response, deadline):
+        """Seconds to wait before the attempt following attempt, None when not sent again"""
+        if attempt >= self.max_attempts:
+            return None
+        delay = min(self.backoff_max, self.backoff * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+        if retry_after is not None:
+            if retry_after > self.retry_after_max:
+                return None
+            delay = max(delay, retry_after)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+    def _next(self, attempt, deadline, response=None, err=None, idempotent=True):
+        """Seconds to wait before sending the request again after a response or an error,
+        None when the response (or error) is final
+        """
+        if err is not None:
+            if not self._is_retriable_error(err, idempotent):
+                return None
+            delay = self._delay(attempt, getattr(err, "response", None), deadline)
+            reason = err
+        else:
+            if not self._is_retriable_status(response.status_code, idempotent):
+                return None
+            delay = self._delay(attempt, response, deadline)
+            reason = "status code {0}".format(response.status_code)
+            if delay is not None:
+                response.close()
+        if delay is not None:
+            LOGGER.warning("Attempt %s of %s failed (%s), sent again in %.1fs", attempt, self.max_attempts, reason, delay)
+        return delay
+
+    def call(self, send, idempotent=True):
+        """Returns the response of send(), called again while failing transiently.
+
+        The last response is returned (whatever its status), or its error raised.
+        """
+        deadline = None if self.deadline is None else time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = send()
+            except requests.exceptions.RequestException as err:
+                delay = self._next(attempt, deadline, err=err, idempotent=idempotent)
+                if delay is None:
+                    raise
+            else:
+                delay = self._next(attempt, deadline, response=response, idempotent=idempotent)
+                if delay is None:
+                    return response
+            time.sleep(delay)
+
+    async def acall(self, send, idempotent=True):
+        """Same as call, send being a coroutine function"""
+        deadline = None if self.deadline is None else time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = await send()
+            except requests.exceptions.RequestException as err:
+                delay = self._next(attempt, deadline, err=err, idempotent=idempotent)
+                if delay is None:
+                    raise
+            else:
+                delay = self._next(attempt, deadline, response=response, idempotent=idempotent)
+                if delay is None:
+                    return response
+            await asyncio.sleep(delay)
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+# GEOCODER_RETRY_ATTEMPTS, GEOCODER_RETRY_BACKOFF, GEOCODER_RETRY_DEADLINE: default policy
+default_policy = RetryPolicy(
+    max_attempts=int(_env_float("GEOCODER_RETRY_ATTEMPTS", 3)),
+    backoff=_env_float("GEOCODER_RETRY_BACKOFF", 0.5),
+    deadline=_env_float("GEOCODER_RETRY_DEADLINE", None),
+)
+
+
+def get_policy(retry):
+    """RetryPolicy from the ``retry`` parameter of a query: either a policy, a number of
+    attempts, False to send a single request, or None for the default policy
+    """
+    if retry is None or retry is True:
+        return default_policy
+    if retry is False:
+        return default_policy.replace(max_attempts=1)
+    if isinstance(retry, RetryPolicy):
+        return retry
+    if isinstance(retry, int):
+        return default_policy.replace(max_attempts=retry)
+    raise ValueError("retry should be a RetryPolicy or a number of attempts. Got %s" % retry)
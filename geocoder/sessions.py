@@ -0,0 +1,181 @@
+#!/usr/bin/python
+# coding: utf8
+
+import logging
+import os
+import threading
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import select_proxy
+
+LOGGER = logging.getLogger(__name__)
+
+# httpx is only imported when an HTTP/2 session is created, see _httpx
+httpx = False
+
+
+def _httpx():
+    """httpx module, None when not installed"""
+    global httpx
+    if httpx is False:
+        try:
+            import httpx
+        except ImportError:  # pragma: no cover
+            httpx = None
+    return httpx
+
+
+class HTTP2Adapter(BaseAdapter):
+    """Transport adapter sending the requests of a requests session with httpx, HTTP/2 being
+    negotiated with the servers supporting it (requires httpx[http2]).
+
+    Responses are read entirely, stream=True is not streamed.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10):
+        super(HTTP2Adapter, self).__init__()
+        if _httpx() is None:
+            raise ImportError("HTTP/2 sessions require httpx, pip install geocoder[http2]")
+        self._limits = httpx.Limits(max_connections=pool_connections * pool_maxsize, max_keepalive_connections=pool_maxsize)
+        # one client per proxy and TLS settings
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _client(self, proxy, verify, cert):
+        key = (proxy, verify, cert)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = httpx.Client(http2=True, limits=self._limits, proxy=proxy, verify=verify, cert=cert)
+            return client
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        client = self._client(select_proxy(request.url, proxies or {}), verify, cert)
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+        try:
+            http_response = client.request(request.method, request.url, headers=dict(request.headers), content=request.body, timeout=timeout)
+        except httpx.TimeoutException as err:
+            raise requests.exceptions.Timeout(str(err), request=request) from err
+        except httpx.TransportError as err:
+            raise requests.exceptions.ConnectionError(str(err), request=request) from err
+
+        response = requests.Response()
+        response._content = http_response.content
+        response._content_consumed = True
+        response.status_code = http_response.status_code
+        response.reason = http_response.reason_phrase
+        response.headers = CaseInsensitiveDict(http_response.headers)
+        response.encoding = http_response.charset_encoding
+        response.url = str(http_response.url)
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+class SessionRegistry(object):
+    """requests sessions of the providers, one per provider (or a single one shared by all
+    of them when per_provider is False).
+
+    Their connection pools keep up to pool_maxsize connections alive per host, for
+    pool_connections hosts: queries sent by more threads than pool_maxsize open extra
+    connections, closed after use, unless pool_block is True (threads then wait for a
+    connection of the pool). With http2, requests are sent with HTTP2Adapter when httpx is
+    installed, with HTTP/1.1 otherwise.
+
+    Sessions are never shared with child processes: after os.fork, the child creates its own.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False, http2=False, per_provider=True):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.http2 = http2
+        self.per_provider = per_provider
+        self._reset()
+
+    def _reset(self):
+        # connections of a parent process are dropped, not closed: the parent still uses them
+        self._pid = os.getpid()
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create_session(self):
+        session = requests.Session()
+        http2 = self.http2 and _httpx() is not None
+        if self.http2 and not http2:
+            LOGGER.warning("HTTP/2 sessions require httpx, pip install geocoder[http2]: requests sent with HTTP/1.1")
+        if http2:
+            adapter = HTTP2Adapter(self.pool_connections, self.pool_maxsize)
+        else:
+            adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize, pool_block=self.pool_block)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def get(self, provider=None):
+        """Session of provider, created on first use"""
+        if self._pid != os.getpid():
+            self._reset()
+        name = provider if self.per_provider else None
+        with self._lock:
+            session = self._sessions.get(name)
+            if session is None:
+                LOGGER.debug("Creating the session of %s", name or "every provider")
+                session = self._sessions[name] = self.create_session()
+            return session
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.close()
+
+
+# GEOCODER_POOL_CONNECTIONS, GEOCODER_POOL_MAXSIZE: size of the connection pools
+# GEOCODER_HTTP2: send requests with HTTP2Adapter when set to 1
+registry = SessionRegistry(
+    pool_connections=_env_int("GEOCODER_POOL_CONNECTIONS", 10),
+    pool_maxsize=_env_int("GEOCODER_POOL_MAXSIZE", 10),
+    http2=os.environ.get("GEOCODER_HTTP2") == "1",
+)
+
+
+def configure(**options):
+    """Replaces the sessions of the providers by new ones created with options (the
+    options not given are kept), see SessionRegistry
+    """
+    global registry
+    previous = registry
+    options = dict(
+        dict(
+            pool_connections=previous.pool_connections,
+            pool_maxsize=previous.pool_maxsize,
+            pool_block=previous.pool_block,
+            http2=previous.http2,
+            per_provider=previous.per_provider,
+        ),
+        **options
+    )
+    registry = SessionRegistry(**options)
+    previous.close()
+    return registry
+
+
+def get_session(provider=None):
+    """Session shared by all the queries to provider"""
+    return registry.get(provider)
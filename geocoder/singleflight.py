@@ -0,0 +1,126 @@
+#!/usr/bin/python
+# coding: utf8
+
+import asyncio
+import logging
+import threading
+
+LOGGER = logging.getLogger(__name__)
+
+
+class _Flight(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.followers = 0
+        self.value = None
+        self.error = None
+        # future of the event loop of the flight, see ado
+        self.waiter = None
+
+
+class SingleFlight(object):
+    """Runs a single call at a time for each key: the calls made with the key of a call
+    in flight wait for it and share its value (or its exception).
+
+    The caller running the call gets its value. The followers get share(value) when given,
+    computed once when the call is done and before the caller gets its value, e.g a copy
+    of a value modified by the caller afterwards.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        # (flight, True when the flight was started by the caller)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def _land(self, key, flight, value=None, error=None, share=None):
+        with self._lock:
+            del self._flights[key]
+        # no follower can join anymore
+        if error is not None:
+            flight.error = error
+        elif flight.followers:
+            flight.value = share(value) if share is not None else value
+
+    def do(self, key, call, share=None):
+        """Returns (value of call() or of the call in flight for key, True when shared)"""
+        flight, leader = self._join(key)
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, True
+
+        try:
+            value = call()
+        except BaseException as err:
+            self._land(key, flight, error=err)
+            raise
+        else:
+            self._land(key, flight, value, share=share)
+        finally:
+            flight.done.set()
+        if flight.followers:
+            LOGGER.debug("%s calls shared by %s", flight.followers, key)
+        return value, False
+
+    async def ado(self, key, call, share=None):
+        """Same as do, call being a coroutine function: the coroutines of the same event loop
+        calling ado with the key of a call in flight wait for it. When the call is cancelled,
+        one of them runs it again.
+        """
+        loop = asyncio.get_running_loop()
+        key = (id(loop), key)
+        while True:
+            flight, leader = self._join(key)
+            if leader:
+                break
+            # shielded: a cancelled follower does not cancel the others
+            await asyncio.shield(flight.waiter)
+            if isinstance(flight.error, asyncio.CancelledError):
+                # the task of the call was cancelled, not the followers
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, True
+
+        flight.waiter = loop.create_future()
+        try:
+            value = await call()
+        except BaseException as err:
+            self._land(key, flight, error=err)
+            raise
+        else:
+            self._land(key, flight, value, share=share)
+        finally:
+            flight.done.set()
+            flight.waiter.set_result(None)
+        return value, False
+
+    def __len__(self):
+        return len(self._flights)
+
+
+# shared by the queries of the process, see MultipleResultsQuery._coalesce
+group = SingleFlight()
+
+
+def get_group(single_flight):
+    """Group from the ``single_flight`` parameter of a query: None or True for the group of
+    the process, False to send every query, or a SingleFlight instance
+    """
+    if single_flight is None or single_flight is True:
+        return group
+    if single_flight is False:
+        return None
+    if isinstance(single_flight, SingleFlight):
+        return single_flight
+    raise ValueError("single_flight should be a boolean or a SingleFlight. Got %s" % single_flight)
@@ -0,0 +1,216 @@
+#!/usr/bin/python
+# coding: utf8
+
+import copy
+import datetime
+import logging
+import threading
+from collections import OrderedDict
+
+LOGGER = logging.getLogger(__name__)
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = dict((char, index) for index, char in enumerate(_BASE32))
+
+# cells of several timezones, never cached
+BORDER = ""
+
+zoneinfo = False
+
+
+def _zoneinfo():
+    """zoneinfo module (python >= 3.9), None when not available"""
+    global zoneinfo
+    if zoneinfo is False:
+        try:
+            import zoneinfo
+        except ImportError:
+            zoneinfo = None
+    return zoneinfo
+
+
+def geohash_encode(lat, lng, precision=5):
+    """Geohash of the cell of precision characters containing lat, lng"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash, bits, char, even = [], 0, 0, True
+    while len(geohash) < precision:
+        value, interval = (lng, lng_range) if even else (lat, lat_range)
+        middle = (interval[0] + interval[1]) / 2
+        char <<= 1
+        if value >= middle:
+            char |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            geohash.append(_BASE32[char])
+            bits, char = 0, 0
+    return "".join(geohash)
+
+
+def geohash_bounds(geohash):
+    """(south, west, north, east) of the cell of geohash"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        index = _BASE32_INDEX[char]
+        for shift in range(4, -1, -1):
+            interval = lng_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if index >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def geohash_neighbours(geohash):
+    """The (up to) 8 cells around geohash, wrapping around the antimeridian"""
+    south, west, north, east = geohash_bounds(geohash)
+    height, width = north - south, east - west
+    lat, lng = (south + north) / 2, (west + east) / 2
+    neighbours = []
+    for d_lat in (-1, 0, 1):
+        for d_lng in (-1, 0, 1):
+            if not d_lat and not d_lng:
+                continue
+            neighbour_lat = lat + d_lat * height
+            if not -90 < neighbour_lat < 90:
+                continue
+            neighbour_lng = (lng + d_lng * width + 180) % 360 - 180
+            neighbours.append(geohash_encode(neighbour_lat, neighbour_lng, len(geohash)))
+    return neighbours
+
+
+def offsets(timezone_id, timestamp):
+    """(rawOffset, dstOffset) in seconds of timezone_id at timestamp, None when unknown"""
+    module = _zoneinfo()
+    if module is None:
+        return None
+    try:
+        timezone = module.ZoneInfo(timezone_id)
+    except (ValueError, module.ZoneInfoNotFoundError):
+        return None
+    moment = datetime.datetime.fromtimestamp(float(timestamp), timezone)
+    dst = int(moment.dst().total_seconds())
+    return int(moment.utcoffset().total_seconds()) - dst, dst
+
+
+class TimezoneCellCache(object):
+    """Timezones of the geohash cells of precision characters (5: cells of about 5km)
+
+    Each cell records the timezone observed in the answers of the providers. A timezone is
+    only trusted for a cell in the interior of its timezone: observed in the cell and in its
+    8 neighbours, without any other timezone. Queries in other cells, e.g near borders,
+    are sent to the provider.
+
+    Answers being valid at a timestamp, the responses are kept by timezone and offsets: a
+    response is reused when the timezone has the same offsets at the timestamp of the
+    query (computed with zoneinfo, queries being always sent without it).
+
+    :param ``precision``: (default=5) Length of the geohashes of the cells
+    :param ``maxsize``: (default=100000) Max number of cells, least recently used ones are evicted first
+    """
+
+    def __init__(self, precision=5, maxsize=100000):
+        self.precision = precision
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cells = OrderedDict()
+        self._responses = {}
+        self._lock = threading.Lock()
+
+    def cell(self, lat, lng):
+        return geohash_encode(float(lat), float(lng), self.precision)
+
+    def observe(self, lat, lng, timezone_id):
+        """Records that lat, lng is in timezone_id"""
+        cell = self.cell(lat, lng)
+        with self._lock:
+            known = self._cells.get(cell)
+            if known is None:
+                self._cells[cell] = timezone_id
+            elif known != timezone_id:
+                if known != BORDER:
+                    LOGGER.debug("Cell %s between %s and %s", cell, known, timezone_id)
+                self._cells[cell] = BORDER
+            self._cells.move_to_end(cell)
+            while self.maxsize is not None and len(self._cells) > self.maxsize:
+                self._cells.popitem(last=False)
+
+    def remember(self, lat, lng, json_response):
+        """Records a response of the Google Time Zone API for lat, lng"""
+        timezone_id = json_response.get("timeZoneId")
+        if not timezone_id:
+            return
+        self.observe(lat, lng, timezone_id)
+        key = (timezone_id, json_response.get("rawOffset"), json_response.get("dstOffset"))
+        with self._lock:
+            self._responses[key] = copy.deepcopy(json_response)
+
+    def lookup(self, lat, lng):
+        """Timezone of lat, lng when its cell is in the interior of a timezone, else None"""
+        cell = self.cell(lat, lng)
+        with self._lock:
+            timezone_id = self._cells.get(cell)
+            if not timezone_id:
+                return None
+            for neighbour in geohash_neighbours(cell):
+                if self._cells.get(neighbour) != timezone_id:
+                    return None
+            self._cells.move_to_end(cell)
+            return timezone_id
+
+    def response(self, lat, lng, timestamp):
+        """Response of the Google Time Zone API for lat, lng at timestamp, None when the
+        query should be sent
+        """
+        timezone_id = self.lookup(lat, lng)
+        found = None
+        if timezone_id is not None:
+            timezone_offsets = offsets(timezone_id, timestamp)
+            if timezone_offsets is not None:
+                with self._lock:
+                    found = self._responses.get((timezone_id,) + timezone_offsets)
+        with self._lock:
+            if found is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return copy.deepcopy(found)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cells": len(self._cells),
+                "borders": sum(1 for timezone_id in self._cells.values() if timezone_id == BORDER),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._responses.clear()
+            self.hits = self.misses = 0
+
+
+# shared by the queries with timezone_cache=True
+default_cache = TimezoneCellCache()
+
+
+def get_timezone_cache(timezone_cache):
+    """Cell cache from the ``timezone_cache`` parameter of a query: True for the cache of
+    the process, or a TimezoneCellCache instance
+    """
+    if timezone_cache is None or timezone_cache is False:
+        return None
+    if timezone_cache is True:
+        return default_cache
+    if isinstance(timezone_cache, TimezoneCellCache):
+        return timezone_cache
+    raise ValueError("timezone_cache should be True or a TimezoneCellCache. Got %s" % timezone_cache)
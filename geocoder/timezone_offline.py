@@ -0,0 +1,333 @@
+#!/usr/bin/python
+# coding: utf8
+
+import array
+import datetime
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+from .base import MultipleResultsQuery
+from .distance import _coordinates, _numpy
+from .google_timezone import TimezoneResult
+from .timezone_cache import _zoneinfo
+
+LOGGER = logging.getLogger(__name__)
+
+# magic, zones, polygons, rings, points, grid columns, grid rows, cell size in degrees
+_HEADER = struct.Struct("<8sQQQQQQd")
+_MAGIC = b"TZPOLYG1"
+
+# rings tested with NumPy above this number of points, smaller ones are faster in Python
+_NUMPY_MIN_POINTS = 64
+
+
+def read_geojson(path):
+    """Yields the (timezone id, polygons) of a timezone boundaries GeoJSON file, e.g the
+    combined.json of https://github.com/evansiroky/timezone-boundary-builder/releases
+
+    Polygons are lists of rings (outer ring first, then holes) of (lng, lat) points.
+    """
+    with open(path, "r", encoding="utf-8") as input:
+        collection = json.load(input)
+    for feature in collection.get("features", []):
+        properties = feature.get("properties") or {}
+        timezone_id = properties.get("tzid") or properties.get("TZID")
+        geometry = feature.get("geometry") or {}
+        if not timezone_id:
+            continue
+        if geometry.get("type") == "Polygon":
+            yield timezone_id, [geometry["coordinates"]]
+        elif geometry.get("type") == "MultiPolygon":
+            yield timezone_id, geometry["coordinates"]
+
+
+def _bbox(points):
+    lngs, lats = [point[0] for point in points], [point[1] for point in points]
+    return min(lngs), min(lats), max(lngs), max(lats)
+
+
+def build_index(zones, path, cell_size=1.0):
+    """Writes zones ((timezone id, polygons), see read_geojson) in the binary index file
+    read by TimezoneIndex.
+
+    The file contains the points of the rings, the bboxes of the rings and polygons, and a
+    grid of cells of cell_size degrees listing the polygons whose bbox intersects them.
+    Floats are stored in the native byte order.
+    """
+    names, zone_ids = [], {}
+    points, ring_bboxes, ring_starts = array.array("d"), array.array("d"), array.array("Q", [0])
+    polygon_bboxes, polygon_rings, polygon_zones = array.array("d"), array.array("Q", [0]), array.array("I")
+    columns, rows = int(round(360 / cell_size)), int(round(180 / cell_size))
+    cells = {}
+
+    for timezone_id, polygons in zones:
+        zone = zone_ids.get(timezone_id)
+        if zone is None:
+            zone = zone_ids[timezone_id] = len(names)
+            names.append(timezone_id)
+        for polygon in polygons:
+            rings = [[(float(lng), float(lat)) for lng, lat in (point[:2] for point in ring)] for ring in polygon if len(ring) >= 3]
+            if not rings:
+                continue
+            for ring in rings:
+                # closed rings, every edge joins two consecutive points
+                if ring[0] != ring[-1]:
+                    ring.append(ring[0])
+                ring_bboxes.extend(_bbox(ring))
+                for point in ring:
+                    points.extend(point)
+                ring_starts.append(len(points) // 2)
+            west, south, east, north = _bbox(rings[0])
+            polygon_bboxes.extend((west, south, east, north))
+            polygon_rings.append(len(ring_starts) - 1)
+            polygon_zones.append(zone)
+
+            polygon = len(polygon_zones) - 1
+            first_column, last_column = _cell(west, -180, cell_size, columns), _cell(east, -180, cell_size, columns)
+            first_row, last_row = _cell(south, -90, cell_size, rows), _cell(north, -90, cell_size, rows)
+            for row in range(first_row, last_row + 1):
+                for column in range(first_column, last_column + 1):
+                    cells.setdefault(row * columns + column, []).append(polygon)
+
+    cell_starts, cell_polygons = array.array("Q", [0]), array.array("I")
+    for cell in range(columns * rows):
+        cell_polygons.extend(cells.get(cell, ()))
+        cell_starts.append(len(cell_polygons))
+
+    data = [name.encode("utf-8") for name in names]
+    name_offsets = array.array("Q", [0])
+    for name in data:
+        name_offsets.append(name_offsets[-1] + len(name))
+
+    # write then rename, readers never see a partial index
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as output:
+        output.write(_HEADER.pack(_MAGIC, len(names), len(polygon_zones), len(ring_starts) - 1, len(points) // 2, columns, rows, cell_size))
+        # 8 bytes items first, the sections stay aligned
+        for section in (points, ring_bboxes, polygon_bboxes, ring_starts, polygon_rings, cell_starts, name_offsets, polygon_zones, cell_polygons):
+            section.tofile(output)
+        output.writelines(data)
+    os.replace(tmp_path, path)
+    LOGGER.info("Indexed %s timezones (%s polygons) in %s", len(names), len(polygon_zones), path)
+
+
+def _cell(value, origin, cell_size, count):
+    return min(max(int((value - origin) // cell_size), 0), count - 1)
+
+
+class TimezoneIndex(object):
+    """Timezone lookups in a binary index file (see build_index), memory-mapped: opening it
+    is immediate, and only the pages visited by the lookups are read.
+
+    The polygons listed in the grid cell of a point are filtered by bbox, then by a
+    point-in-polygon test of their rings (with NumPy when installed).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as index_file:
+            self._mmap = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, zones, polygons, rings, points, self.columns, self.rows, self.cell_size = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC:
+            self._mmap.close()
+            raise ValueError("Not a timezone index: {0}".format(path))
+
+        self._view = memoryview(self._mmap)
+        start = _HEADER.size
+        sections = []
+        for size, fmt in (
+            (2 * points, "d"),
+            (4 * rings, "d"),
+            (4 * polygons, "d"),
+            (rings + 1, "Q"),
+            (polygons + 1, "Q"),
+            (self.columns * self.rows + 1, "Q"),
+            (zones + 1, "Q"),
+            (polygons, "I"),
+        ):
+            end = start + size * struct.calcsize(fmt)
+            sections.append(self._view[start:end].cast(fmt))
+            start = end
+        (
+            self._points,
+            self._ring_bboxes,
+            self._polygon_bboxes,
+            self._ring_starts,
+            self._polygon_rings,
+            self._cell_starts,
+            self._name_offsets,
+            self._polygon_zones,
+        ) = sections
+        self._sections = sections
+        self._cell_polygons = self._view[start:start + 4 * self._cell_starts[-1]].cast("I")
+        self._sections.append(self._cell_polygons)
+        self._names_start = start + 4 * self._cell_starts[-1]
+        self.zones = [self._name(zone) for zone in range(zones)]
+
+    def __len__(self):
+        return len(self.zones)
+
+    def close(self):
+        for view in self._sections + [self._view]:
+            view.release()
+        self._mmap.close()
+
+    def _name(self, zone):
+        start, end = self._names_start + self._name_offsets[zone], self._names_start + self._name_offsets[zone + 1]
+        return self._mmap[start:end].decode("utf-8")
+
+    def _in_ring(self, ring, lng, lat):
+        # even-odd rule: holes are rings of the polygon too
+        bbox = self._ring_bboxes
+        if not (bbox[4 * ring] <= lng <= bbox[4 * ring + 2] and bbox[4 * ring + 1] <= lat <= bbox[4 * ring + 3]):
+            return False
+        start, end = self._ring_starts[ring], self._ring_starts[ring + 1]
+        numpy = _numpy()
+        if numpy is not None and end - start > _NUMPY_MIN_POINTS:
+            ring_points = numpy.asarray(self._points[2 * start:2 * end])
+            x, y = ring_points[0::2], ring_points[1::2]
+            x1, y1, x2, y2 = x[:-1], y[:-1], x[1:], y[1:]
+            crossing = (y1 > lat) != (y2 > lat)
+            x1, y1, x2, y2 = x1[crossing], y1[crossing], x2[crossing], y2[crossing]
+            return bool(numpy.count_nonzero(lng < x1 + (lat - y1) * (x2 - x1) / (y2 - y1)) % 2)
+
+        points = self._points
+        inside = False
+        x2, y2 = points[2 * start], points[2 * start + 1]
+        for i in range(2 * start + 2, 2 * end, 2):
+            x1, y1, x2, y2 = x2, y2, points[i], points[i + 1]
+            if (y1 > lat) != (y2 > lat) and lng < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+        return inside
+
+    def _in_polygon(self, polygon, lng, lat):
+        bbox = self._polygon_bboxes
+        if not (bbox[4 * polygon] <= lng <= bbox[4 * polygon + 2] and bbox[4 * polygon + 1] <= lat <= bbox[4 * polygon + 3]):
+            return False
+        inside = False
+        for ring in range(self._polygon_rings[polygon], self._polygon_rings[polygon + 1]):
+            if self._in_ring(ring, lng, lat):
+                inside = not inside
+        return inside
+
+    def timezone(self, lat, lng):
+        """Timezone id of lat, lng, None when outside of every timezone"""
+        column = _cell(lng, -180, self.cell_size, self.columns)
+        row = _cell(lat, -90, self.cell_size, self.rows)
+        cell = row * self.columns + column
+        for i in range(self._cell_starts[cell], self._cell_starts[cell + 1]):
+            polygon = self._cell_polygons[i]
+            if self._in_polygon(polygon, lng, lat):
+                return self.zones[self._polygon_zones[polygon]]
+        return None
+
+    def timezones_many(self, latlngs):
+        """Timezone ids of each (lat, lng) of latlngs"""
+        return [self.timezone(lat, lng) for lat, lng in latlngs]
+
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def load_index(path, cell_size=1.0):
+    """TimezoneIndex of a binary index file or of a GeoJSON file, shared process-wide.
+
+    The index of a GeoJSON file is built in the file path + ".index" when missing or older
+    than the GeoJSON file.
+    """
+    path = os.path.realpath(path)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(path)
+        if index is None:
+            with open(path, "rb") as index_file:
+                is_index = index_file.read(len(_MAGIC)) == _MAGIC
+            index_path = path
+            if not is_index:
+                index_path = path + ".index"
+                if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(path):
+                    build_index(read_geojson(path), index_path, cell_size)
+            index = _INDEXES[path] = TimezoneIndex(index_path)
+        return index
+
+
+def timezone_response(timezone_id, timestamp):
+    """Result of timezone_id at timestamp, same keys as the Google Time Zone API.
+
+    Offsets and abbreviated names (e.g EDT) are given by zoneinfo when available.
+    """
+    response = {"status": "OK", "timeZoneId": timezone_id, "timeZoneName": timezone_id}
+    zoneinfo = _zoneinfo()
+    if zoneinfo is None:
+        return response
+    try:
+        timezone = zoneinfo.ZoneInfo(timezone_id)
+    except (ValueError, zoneinfo.ZoneInfoNotFoundError):
+        return response
+    moment = datetime.datetime.fromtimestamp(float(timestamp), timezone)
+    response["dstOffset"] = int(moment.dst().total_seconds())
+    response["rawOffset"] = int(moment.utcoffset().total_seconds()) - response["dstOffset"]
+    response["timeZoneName"] = moment.tzname() or timezone_id
+    return response
+
+
+class TimezoneOfflineQuery(MultipleResultsQuery):
+    """
+    Offline timezones
+    =================
+    Timezone of a location looked up in local timezone boundaries instead of a web
+    service: no network, no quota. Results are the ones of the Google Time Zone API.
+
+    The boundaries are a GeoJSON file (e.g combined.json of timezone-boundary-builder,
+    with tzid properties) given with path (or GEOCODER_TIMEZONE_BOUNDARIES), its index
+    being built once next to it.
+
+    Data
+    ----
+    https://github.com/evansiroky/timezone-boundary-builder/releases
+    """
+
+    provider = "timezone_offline"
+    method = "timezone"
+
+    # where the boundaries come from, no request is sent
+    _URL = "https://github.com/evansiroky/timezone-boundary-builder/releases"
+    _RESULT_CLASS = TimezoneResult
+    _KEY_MANDATORY = False
+
+    def _before_initialize(self, location, **kwargs):
+        path = kwargs.get("path") or os.environ.get("GEOCODER_TIMEZONE_BOUNDARIES")
+        if not path:
+            raise ValueError("Provide the path of timezone boundaries")
+        self.index = load_index(path, kwargs.get("cell_size", 1.0))
+        self.timestamp = kwargs.get("timestamp", time.time())
+
+    def _connect(self):
+        self.status_code = "Unknown"
+        # addresses are not geocoded: no request is sent
+        point = _coordinates(self.location)
+        if point is None:
+            self.error = "Invalid coordinates: {0}".format(self.location)
+            LOGGER.error(self.error)
+            return False
+
+        lat, lng = point.latlng
+        self.status_code = 200
+        timezone_id = self.index.timezone(lat, lng)
+        if timezone_id is None:
+            return {"status": "ZERO_RESULTS"}
+        return timezone_response(timezone_id, self.timestamp)
+
+    def _adapt_results(self, json_response):
+        return [json_response] if json_response.get("timeZoneId") else []
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    g = TimezoneOfflineQuery([45.4215, -75.6972], path="combined.json")
+    g.debug()
@@ -2,12 +2,15 @@
 # coding: utf8
 
 import csv
+import functools
 import io
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
 
+from . import batch
 from .base import MultipleResultsQuery, OneResult
 
 PY2 = sys.version_info < (3, 0)
@@ -50,6 +53,13 @@ class USCensusBatch(MultipleResultsQuery):
     =======================
     The Census Geocoder is an address look-up tool that converts your address to an approximate coordinate (latitude/longitude) and returns information about the address range that includes the address and the census geography the address is within. The geocoder is available as a web interface and as an API (Representational State Transfer - REST - web-based service).
 
+    Batches are limited to 10,000 addresses: larger ones are split in chunks of batch_size
+    addresses, sent by workers concurrent requests. Chunks failing after their retries (see
+    geocoder.retry) are listed in failed_chunks, their addresses having no result.
+
+    Results are stored in columns, batch_results (see geocoder.batch.BatchResults),
+    exported with to_numpy, to_csv and geojson.
+
     API Reference
     -------------
     https://geocoding.geo.census.gov/geocoder/Geocoding_Services_API.html
@@ -62,64 +72,133 @@ class USCensusBatch(MultipleResultsQuery):
     _URL = "https://geocoding.geo.census.gov/geocoder/locations/addressbatch"
     _RESULT_CLASS = USCensusBatchResult
     _KEY_MANDATORY = False
+    # max number of addresses of a request, larger batches are split in several requests
+    _BATCH_SIZE = 10000
 
-    def generate_batch(self, locations):
+    # BatchResults of the batch, once parsed
+    batch_results = None
+
+    def generate_batch(self, locations, start=0):
         out = csv_io()
         writer = csv.writer(out)
 
-        for idx, address in enumerate(locations):
+        for idx, address in enumerate(locations, start):
             writer.writerow([idx, address, None, None, None])
 
         return csv_encode(out.getvalue())
 
     def _build_params(self, locations, provider_key, **kwargs):
-        self.batch = self.generate_batch(locations)
+        self.locations = locations
         self.locations_length = len(locations)
         self.timeout = int(kwargs.get("timeout", "1800"))  # 30mn timeout, us census can be really slow with big batches
         self.benchmark = str(kwargs.get("benchmark", 4))
-
-        return {"benchmark": (None, self.benchmark), "addressFile": ("addresses.csv", self.batch)}
+        # chunks of batch_size addresses are sent by workers requests at a time, and sent
+        # again by self.retry when failing (retries times at most if given)
+        self.batch_size = int(kwargs.get("batch_size", self._BATCH_SIZE))
+        self.workers = int(kwargs.get("workers", 4))
+        if "retries" in kwargs:
+            self.retry = self.retry.replace(max_attempts=int(kwargs["retries"]) + 1)
+        # (start, end) indexes of the chunks which failed after their retries
+        self.failed_chunks = []
+
+        return {"benchmark": (None, self.benchmark)}
+
+    def _post_chunk(self, start, locations):
+        """Sends a chunk of addresses, and returns (response, file of its results)"""
+        files = dict(self.params, addressFile=("addresses.csv", self.generate_batch(locations, start)))
+        response = self._send(
+            functools.partial(self.session.post, self.url, files=files, headers=self.headers, timeout=self.timeout, proxies=self.proxies, stream=True)
+        )
+
+        # check that response is ok
+        response.raise_for_status()
+
+        # results are streamed to a temporary file, parsed once every chunk is done
+        return response, batch.spool(response)
+
+    @staticmethod
+    def _chunk_status(outcome):
+        response = outcome.response if isinstance(outcome, Exception) else outcome[0]
+        return response.status_code if response is not None else "Unknown"
 
     def _connect(self):
+        """Returns [(start, end, file of the results or None when failed)] of the chunks"""
         self.status_code = "Unknown"
-
-        try:
-            self.response = response = self.session.post(
-                self.url, files=self.params, headers=self.headers, timeout=self.timeout, proxies=self.proxies
-            )
-
-            # check that response is ok
-            self.status_code = response.status_code
-            response.raise_for_status()
-
-            return response.content
-
-        except (requests.exceptions.RequestException, LookupError) as err:
-            # store real status code and error
-            self.error = "ERROR - {}".format(str(err))
-            LOGGER.error("Status code %s from %s: %s", self.status_code, self.url, self.error)
-
-        return False
+        chunks = [(start, self.locations[start:start + self.batch_size]) for start in range(0, self.locations_length, self.batch_size)]
+        if not chunks:
+            return False
+
+        # (response, file of the results) or the exception of each chunk, set by this thread only
+        outcomes = [None] * len(chunks)
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(chunks))) as executor:
+            futures = dict((executor.submit(self._post_chunk, start, locations), index) for index, (start, locations) in enumerate(chunks))
+            for future in as_completed(futures):
+                try:
+                    outcomes[futures[future]] = future.result()
+                except requests.exceptions.RequestException as err:
+                    outcomes[futures[future]] = err
+
+        contents = []
+        for (start, locations), outcome in zip(chunks, outcomes):
+            if isinstance(outcome, Exception):
+                error = "ERROR - {}".format(str(outcome))
+                LOGGER.error("Status code %s from %s for addresses %s to %s: %s", self._chunk_status(outcome), self.url, start, start + len(locations) - 1, error)
+                self.failed_chunks.append((start, start + len(locations)))
+                contents.append(None)
+            else:
+                contents.append(outcome[1])
+
+        # status of the first chunk which failed, of the first chunk otherwise
+        outcome = next((outcome for outcome in outcomes if isinstance(outcome, Exception)), outcomes[0])
+        self.response = outcome.response if isinstance(outcome, Exception) else outcome[0]
+        self.status_code = self._chunk_status(outcome)
+
+        # results of the chunks which succeeded are kept
+        if not any(content is not None for content in contents):
+            self.error = error
+            return False
+        return [(start, start + len(locations), content) for (start, locations), content in zip(chunks, contents)]
 
     def _adapt_results(self, response):
-        result = csv_io(csv_decode(response))
-
-        rows = {}
-        for row in csv.reader(result):
+        """Yields (index, [address, coordinates]) of the matched addresses, as read from
+        the results of a chunk (file or bytes)
+        """
+        for row in csv.reader(batch.text_lines(response)):
             if row[2] == "Match":
-                rows[row[0]] = [row[4], row[5]]
+                yield int(row[0]), [row[4], row[5]]
 
-        return rows
+    def _iter_rows(self, chunks):
+        """Yields the rows of the chunks in the order of the locations, None when not matched"""
+        for start, end, content in chunks:
+            rows = self._adapt_results(content) if content is not None else ()
+            for row in batch.ordered(rows, start, end):
+                yield row
+            if content is not None:
+                content.close()
 
     def _parse_results(self, response):
-        rows = self._adapt_results(response)
-
-        # re looping through the results to give them back in their original order
-        for idx in range(0, self.locations_length):
-            self.add(self.one_result(rows.get(str(idx), None)))
+        # results are stored in columns rather than one USCensusBatchResult per address
+        self.batch_results = self._list = batch.BatchResults()
+        for row in self._iter_rows(response):
+            if row is None:
+                self.batch_results.append(False)
+            else:
+                lng, lat = row[1].split(",")
+                self.batch_results.append(lat=float(lat), lng=float(lng), address=row[0])
 
         self.current_result = len(self) > 0 and self[0]
 
+    def iter_results(self):
+        """Sends the batch and yields its results in the order of the locations, without
+        keeping them: for batches too large to fit in memory, e.g written to a file as read.
+
+        To be used with a query created with initialize=False.
+        """
+        chunks = self._connect()
+        if chunks:
+            for row in self._iter_rows(chunks):
+                yield self.one_result(row)
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
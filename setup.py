@@ -18,7 +18,8 @@ if not version:
 with open("README.md", "r", "utf-8") as f:
     readme = f.read()
 
-requires = ["requests", "ratelim"]
+requires = ["requests"]
+extras_require = {"async": ["aiohttp"], "http2": ["httpx[http2]"]}
 
 setup(
     name="geocoder",
@@ -39,6 +40,7 @@ setup(
     package_dir={"geocoder": "geocoder"},
     include_package_data=True,
     install_requires=requires,
+    extras_require=extras_require,
     zip_safe=False,
     keywords="geocoder arcgis tomtom opencage google bing here",
     classifiers=[
@@ -0,0 +1,14 @@
+#!/usr/bin/python
+# coding: utf8
+
+# queries of the tests across several providers, answered with the files of tests/results
+
+location = "Ottawa, Ontario"
+osm_url = "https://nominatim.openstreetmap.org/search"
+geonames_url = "http://api.geonames.org/searchJSON"
+providers = ["osm", ("geonames", {"key": "mock"})]
+
+
+def read(data_file):
+    with open(data_file, "r") as input:
+        return input.read()
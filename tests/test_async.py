@@ -0,0 +1,106 @@
+#!/usr/bin/python
+# coding: utf8
+
+import asyncio
+import gc
+import warnings
+
+import pytest
+import requests_mock
+
+import geocoder
+from geocoder import aio
+
+web = pytest.importorskip("aiohttp.web")
+TestServer = pytest.importorskip("aiohttp.test_utils").TestServer
+
+location = "Ottawa, Ontario"
+url = "http://api.geonames.org/searchJSON"
+data_file = "tests/results/geonames.json"
+
+
+def run_with_server(coroutine_function):
+    """Serve the geonames response on a local aiohttp server, and run the coroutine with its url"""
+    requests = []
+
+    async def search(request):
+        requests.append(request.raw_path.split("?", 1)[1])
+        with open(data_file, "r") as input:
+            return web.Response(text=input.read(), content_type="application/json")
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/searchJSON", search)
+        async with TestServer(app) as server:
+            try:
+                return await coroutine_function(str(server.make_url("/searchJSON")))
+            finally:
+                await aio.close_async_session()
+
+    return asyncio.run(main()), requests
+
+
+def test_aget():
+    async def query(server_url):
+        return await geocoder.aget(location, provider="geonames", key="mock", url=server_url)
+
+    g, requests = run_with_server(query)
+    assert g.ok
+    assert g.status_code == 200
+    assert g.address == "Ottawa"
+    assert requests == ["q=Ottawa%2C+Ontario&fuzzy=1.0&username=mock&maxRows=1"]
+
+
+def test_agather():
+    async def query(server_url):
+        return await geocoder.agather([location] * 5, limit=2, provider="geonames", key="mock", url=server_url, single_flight=False)
+
+    results, requests = run_with_server(query)
+    assert len(results) == 5
+    assert all(g.ok for g in results)
+    assert len(requests) == 5
+
+
+def test_agather_single_flight():
+    async def query(server_url):
+        return await geocoder.agather([location] * 5, limit=5, provider="geonames", key="mock", url=server_url)
+
+    results, requests = run_with_server(query)
+    assert all(g.ok for g in results)
+    # identical queries in flight share a single request
+    assert len(requests) == 1
+    assert sum(g.coalesced for g in results) == 4
+    assert len(set(id(g.raw) for g in results)) == 5
+
+
+def test_aget_error():
+    async def query(server_url):
+        return await geocoder.aget(location, provider="geonames", key="mock", url=server_url.replace("searchJSON", "missing"))
+
+    g, _ = run_with_server(query)
+    assert not g.ok
+    assert g.status_code == 404
+
+
+def test_aget_without_aiohttp(monkeypatch):
+    monkeypatch.setattr(aio, "aiohttp", None)
+    with requests_mock.Mocker() as mocker, open(data_file, "r") as input:
+        mocker.get(url, text=input.read())
+        g = asyncio.run(geocoder.aget(location, provider="geonames", key="mock"))
+        assert g.ok
+        assert mocker.call_count == 1
+
+
+def test_async_session_closed_with_loop():
+    async def main():
+        session = aio.get_async_session()
+        assert aio.get_async_session() is session
+        return session
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        sessions = [asyncio.run(main()) for _ in range(3)]
+        gc.collect()
+    assert all(session.closed for session in sessions)
+    assert len(aio._SESSIONS) == 0
+    assert not [warning for warning in caught if "Unclosed" in str(warning.message)]
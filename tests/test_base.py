@@ -0,0 +1,64 @@
+#!/usr/bin/python
+# coding: utf8
+
+import json
+
+import requests_mock
+
+import geocoder
+from geocoder.base import OneResult
+from geocoder.google import GoogleResult
+
+data_file = "tests/results/google.json"
+
+
+def google_result():
+    with open(data_file, "r") as input:
+        return GoogleResult(json.load(input)["results"][0])
+
+
+def test_fieldnames_per_class():
+    assert "city" in GoogleResult._FIELDNAMES
+    assert "json" not in GoogleResult._FIELDNAMES
+    assert "_location" not in GoogleResult._FIELDNAMES
+
+
+def test_lazy_json():
+    result = google_result()
+    assert result.latlng
+    assert "_json" not in result.__dict__
+    assert result.json["city"] == "Ottawa"
+    assert "raw" in result.fieldnames
+    assert result.json["ok"]
+
+
+def test_lazy_bbox_attributes():
+    result = google_result()
+    # set as a side effect of the bbox property
+    assert result.south == result.json["bbox"]["southwest"][0]
+
+
+def geonames_query(**kwargs):
+    url = "http://api.geonames.org/searchJSON"
+    with open("tests/results/geonames.json", "r") as input:
+        content = json.load(input)
+    content["geonames"] = content["geonames"] * 3
+    with requests_mock.Mocker() as mocker:
+        mocker.get(url, text=json.dumps(content))
+        return geocoder.geonames("Ottawa, Ontario", key="mock", maxRows=3, **kwargs)
+
+
+def test_lazy_results():
+    g = geonames_query()
+    assert len(g) == 3
+    assert g.address == "Ottawa"
+    # only the default result has been built
+    assert [isinstance(result, OneResult) for result in g._list] == [True, False, False]
+    assert [result.address for result in g[1:]] == ["Ottawa", "Ottawa"]
+    assert all(isinstance(result, OneResult) for result in g._list)
+
+
+def test_eager_results():
+    g = geonames_query(eager=True)
+    assert all("_json" in result.__dict__ for result in g._list)
+    assert g.geojson == geonames_query().geojson
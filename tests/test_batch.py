@@ -0,0 +1,77 @@
+#!/usr/bin/python
+# coding: utf8
+
+import csv
+import io
+
+from geocoder import batch
+
+
+def test_ordered():
+    rows = [(2, "c"), (0, "a"), (1, "b"), (5, "f"), (4, "e")]
+    assert list(batch.ordered(rows, 0, 6)) == ["a", "b", "c", None, "e", "f"]
+
+
+def test_ordered_streams():
+    # rows are yielded as soon as the previous ones are
+    yielded = []
+
+    def rows():
+        for index in range(3):
+            yield index, index
+            assert yielded == list(range(index + 1))
+
+    for row in batch.ordered(rows(), 0, 3):
+        yielded.append(row)
+    assert yielded == [0, 1, 2]
+
+
+def test_ordered_ignores_other_indexes():
+    assert list(batch.ordered([(9, "x"), (10, "a"), (12, "y")], 10, 12)) == ["a", None]
+
+
+def test_text_lines():
+    content = 'id,name\r\n0,"Montr\xe9al\r\nQC"\r\n'.encode("utf-8")
+    for source in (content, io.BytesIO(content)):
+        assert list(csv.DictReader(batch.text_lines(source))) == [{"id": "0", "name": "Montr\xe9al\r\nQC"}]
+
+
+def batch_results():
+    results = batch.BatchResults()
+    results.append(lat=45.5, lng=-73.5, address="Montreal, QC")
+    results.append(False)
+    results.append(lat=48.85, lng=2.35, address="Paris", country="France")
+    return results
+
+
+def test_batch_results():
+    results = batch_results()
+    assert len(results) == 3
+    assert results.texts == {"address": ["Montreal, QC", None, "Paris"], "country": [None, None, "France"]}
+    assert [result.ok for result in results] == [True, False, True]
+    assert results[0].latlng == [45.5, -73.5]
+    assert results[0].address == "Montreal, QC"
+    assert results[-1].country == "France"
+    assert results[1].latlng == [] and results[1].address is None
+    assert [result.address for result in results[::2]] == ["Montreal, QC", "Paris"]
+    assert results[2].json["address"] == "Paris"
+
+
+def test_batch_results_exports():
+    results = batch_results()
+    latlngs = results.to_numpy()
+    assert latlngs.shape == (3, 2)
+    assert latlngs[0].tolist() == [45.5, -73.5]
+
+    output = io.StringIO()
+    results.to_csv(output)
+    assert output.getvalue().splitlines() == [
+        "index,ok,lat,lng,address,country",
+        "0,True,45.5,-73.5,\"Montreal, QC\",",
+        "1,False,,,,",
+        "2,True,48.85,2.35,Paris,France",
+    ]
+
+    features = results.geojson["features"]
+    assert [feature["properties"]["index"] for feature in features] == [0, 2]
+    assert features[1]["geometry"] == {"type": "Point", "coordinates": [2.35, 48.85]}
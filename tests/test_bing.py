@@ -1,9 +1,13 @@
 # coding: utf8
+import asyncio
+import json
 from builtins import str
 
 import requests_mock
 
 import geocoder
+from geocoder import aio
+from geocoder.bing_batch import BingBatch
 
 location = "Ottawa, Ontario"
 city = "Ottawa"
@@ -72,6 +76,71 @@ def test_bing_batch_forward():
         assert [result.latlng for result in g] == expected_results
 
 
+def mock_bing_batch_job(mocker, statuses):
+    url_submission = "http://spatial.virtualearth.net/REST/v1/Dataflows/Geocode?input=csv&key=test"
+    url_check = "http://spatial.virtualearth.net/REST/v1/Dataflows/Geocode/3bf1b729dddd498e9df45515cdb36130"
+    url_result = url_check + "/output/succeeded"
+    with open("tests/results/bing_batch_confirmation.json", "rb") as confirmation_result:
+        confirmation = json.loads(str(confirmation_result.read(), "utf8"))
+    check_responses = []
+    for status in statuses:
+        confirmation["resourceSets"][0]["resources"][0]["status"] = status
+        check_responses.append({"text": json.dumps(confirmation)})
+    with open("tests/results/bing_batch_submission.json", "rb") as submission_result:
+        mocker.post(url_submission, text=str(submission_result.read(), "utf8"))
+    with open("tests/results/bing_batch.csv", "rb") as batch_result:
+        mocker.get(url_result, text=str(batch_result.read(), "utf8"))
+    return mocker.get(url_check, check_responses)
+
+
+def test_bing_batch_job(monkeypatch):
+    monkeypatch.setattr(BingBatch, "_BATCH_WAIT", 0.001)
+    with requests_mock.Mocker() as mocker:
+        check = mock_bing_batch_job(mocker, ["Pending", "Pending", "Completed"])
+        query = geocoder.bing(locations_forward, key="test", method="batch", initialize=False)
+        job = query.submit()
+        assert not len(query)
+        g = job.result()
+        assert g is query
+        assert check.call_count == 3
+        assert [result.latlng for result in g] == [[39.7400093078613, -104.99201965332], [40.015739440918, -105.279243469238]]
+
+
+def test_bing_batch_iter_results(monkeypatch):
+    monkeypatch.setattr(BingBatch, "_BATCH_WAIT", 0.001)
+    with requests_mock.Mocker() as mocker:
+        mock_bing_batch_job(mocker, ["Completed"])
+        query = geocoder.bing(locations_forward, key="test", method="batch", initialize=False)
+        latlngs = [result.latlng for result in query.iter_results()]
+        assert latlngs == [[39.7400093078613, -104.99201965332], [40.015739440918, -105.279243469238]]
+        assert len(query) == 0
+
+
+def test_bing_batch_job_timeout(monkeypatch):
+    monkeypatch.setattr(BingBatch, "_BATCH_WAIT", 0.001)
+    with requests_mock.Mocker() as mocker:
+        mock_bing_batch_job(mocker, ["Pending"])
+        g = geocoder.bing(locations_forward, key="test", method="batch", initialize=False).submit().result(timeout=0.01)
+        assert not g.ok
+        assert "not finished in time" in g.error
+
+
+def test_bing_batch_jobs_async(monkeypatch):
+    monkeypatch.setattr(BingBatch, "_BATCH_WAIT", 0.001)
+    # polled in the default executor, as requests_mock does not patch aiohttp
+    monkeypatch.setattr(aio, "aiohttp", None)
+
+    async def gather(jobs):
+        return await asyncio.gather(*jobs)
+
+    with requests_mock.Mocker() as mocker:
+        mock_bing_batch_job(mocker, ["Pending", "Completed"])
+        jobs = [geocoder.bing(locations_forward, key="test", method="batch", initialize=False).submit() for _ in range(3)]
+        results = asyncio.run(gather(jobs))
+        assert [len(g) for g in results] == [2, 2, 2]
+        assert all(job.done for job in jobs)
+
+
 def test_bing_batch_reverse():
     g = geocoder.bing(locations_reverse, method="batch_reverse")
     assert g.ok
@@ -0,0 +1,120 @@
+#!/usr/bin/python
+# coding: utf8
+
+import time
+
+import pytest
+import requests_mock
+
+import geocoder
+from geocoder.cache import LRUCache, ShelveCache, SQLiteCache, make_key
+
+location = "Ottawa, Ontario"
+url = "http://api.geonames.org/searchJSON"
+data_file = "tests/results/geonames.json"
+
+
+@pytest.fixture(params=["lru", "sqlite", "shelve"])
+def cache_factory(request, tmp_path):
+    def factory(**kwargs):
+        if request.param == "lru":
+            return LRUCache(**kwargs)
+        elif request.param == "sqlite":
+            return SQLiteCache(str(tmp_path / "cache.sqlite"), **kwargs)
+        return ShelveCache(str(tmp_path / "cache.shelve"), **kwargs)
+
+    return factory
+
+
+def test_make_key_excludes_secrets():
+    params = {"q": location, "username": "mock", "maxRows": 1}
+    assert make_key("geonames", "geocode", url, params) == make_key("geonames", "geocode", url, {"maxRows": 1, "q": location})
+    assert make_key("geonames", "geocode", url, params) != make_key("geonames", "geocode", url, {"q": "Paris"})
+
+
+def test_cache_backend(cache_factory):
+    cache = cache_factory()
+    assert cache.get("a") is None
+    cache.set("a", {"value": [1, 2]})
+    assert cache.get("a") == {"value": [1, 2]}
+    assert len(cache) == 1
+    cache.delete("a")
+    assert "a" not in cache
+
+
+def test_cache_ttl(cache_factory):
+    cache = cache_factory(ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_cache_maxsize(cache_factory):
+    cache = cache_factory(maxsize=2)
+    cache.set("a", 1)
+    time.sleep(0.001)
+    cache.set("b", 2)
+    time.sleep(0.001)
+    cache.get("a")
+    time.sleep(0.001)
+    cache.set("c", 3)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+
+def test_cache_eviction_batch(tmp_path):
+    # on-disk caches evict down to 90% of maxsize once it is passed
+    for cache in (SQLiteCache(str(tmp_path / "cache.sqlite"), maxsize=20), ShelveCache(str(tmp_path / "cache.shelve"), maxsize=20)):
+        for index in range(20):
+            cache.set(str(index), index)
+            time.sleep(0.001)
+        cache.get("0")
+        assert len(cache) == 20
+        cache.set("20", 20)
+        assert len(cache) == 18
+        assert cache.get("0") == 0
+        assert cache.get("1") is None and cache.get("2") is None and cache.get("3") is None
+        assert cache.get("20") == 20
+        cache.close()
+
+
+def test_shelve_cache_reopened(tmp_path):
+    path = str(tmp_path / "cache.shelve")
+    cache = ShelveCache(path, maxsize=2)
+    cache.set("a", 1)
+    time.sleep(0.001)
+    cache.set("b", 2)
+    time.sleep(0.001)
+    cache.get("a")
+    cache.close()
+
+    cache = ShelveCache(path, maxsize=2)
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    cache.close()
+
+
+def test_geonames_cached(cache_factory):
+    cache = cache_factory()
+    with requests_mock.Mocker() as mocker, open(data_file, "r") as input:
+        mocker.get(url, text=input.read())
+        g = geocoder.geonames(location, key="mock", cache=cache)
+        assert g.ok
+        assert not g.from_cache
+        g = geocoder.geonames(location, key="other", cache=cache)
+        assert g.ok
+        assert g.from_cache
+        assert g.address == "Ottawa"
+        assert mocker.call_count == 1
+
+
+def test_cache_path(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with requests_mock.Mocker() as mocker, open(data_file, "r") as input:
+        mocker.get(url, text=input.read())
+        geocoder.geonames(location, key="mock", cache=path)
+        g = geocoder.geonames(location, key="mock", cache=path)
+        assert g.from_cache
+        assert mocker.call_count == 1
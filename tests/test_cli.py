@@ -1,8 +1,14 @@
 #!/usr/bin/env python
 # coding: utf8
 
+import csv
+import json
 import subprocess
 
+import requests_mock
+
+from geocoder.cli import Checkpoint, cli
+
 location = "Ottawa, Ontario"
 
 if False:
@@ -12,3 +18,69 @@ if False:
 
     def test_cli_osm():
         assert not subprocess.call(["geocode", location, "--provider", "osm"])
+
+
+url = "http://api.geonames.org/searchJSON"
+data_file = "tests/results/geonames.json"
+
+
+def geonames_callback(request, context):
+    # answer with the queried location as the name of the result
+    with open(data_file, "r") as input:
+        content = json.load(input)
+    content["geonames"][0]["name"] = request.qs["q"][0]
+    return json.dumps(content)
+
+
+def run_cli(capsys, *args):
+    with requests_mock.Mocker() as mocker:
+        mocker.get(url, text=geonames_callback)
+        cli(["--provider", "geonames", "--key", "mock"] + list(args))
+        out, err = capsys.readouterr()
+        return out, err, mocker.call_count
+
+
+def test_cli_ndjson(tmpdir, capsys):
+    locations = tmpdir.join("locations.txt")
+    locations.write("a\nb\n\nc\n")
+    out, _, call_count = run_cli(capsys, str(locations), "d", "--workers", "3")
+    assert [json.loads(line)["address"] for line in out.splitlines()] == ["a", "b", "c", "d"]
+    assert call_count == 4
+
+
+def test_cli_unordered_csv(tmpdir, capsys):
+    locations = tmpdir.join("locations.csv")
+    locations.write("id,address\n1,a\n2,b\n3,c\n")
+    out, _, _ = run_cli(capsys, str(locations), "--input-format", "csv", "--column", "address", "--format", "csv", "--unordered", "--workers", "2")
+    rows = list(csv.DictReader(out.splitlines()))
+    assert sorted((row["index"], row["location"], row["address"]) for row in rows) == [("0", "a", "a"), ("1", "b", "b"), ("2", "c", "c")]
+
+
+def test_cli_checkpoint(tmpdir, capsys):
+    locations = tmpdir.join("locations.txt")
+    locations.write("a\nb\nc\nd\n")
+    checkpoint = tmpdir.join("checkpoint.json")
+    # the first run stopped after writing the results of a and c
+    checkpoint.write(json.dumps({"done": 1, "completed": [2]}))
+    out, err, call_count = run_cli(capsys, str(locations), "--checkpoint", str(checkpoint), "--progress")
+    assert [json.loads(line)["address"] for line in out.splitlines()] == ["b", "d"]
+    assert call_count == 2
+    assert json.loads(checkpoint.read()) == {"done": 4, "completed": []}
+    assert err.startswith("2 locations geocoded")
+
+
+def test_checkpoint_add():
+    checkpoint = Checkpoint()
+    for index in [1, 0, 3]:
+        checkpoint.add(index)
+    assert (checkpoint.done, checkpoint.completed) == (2, {3})
+    assert 3 in checkpoint and 2 not in checkpoint
+
+
+def test_cli_utf8(tmpdir, capsys):
+    locations = tmpdir.join("locations.txt")
+    locations.write_binary(u"montréal\nzürich\nmontréal\n".encode("utf-8"))
+    out, _, call_count = run_cli(capsys, str(locations), "--workers", "2")
+    assert [json.loads(line)["address"] for line in out.splitlines()] == [u"montréal", u"zürich", u"montréal"]
+    # identical locations pending at the same time are queried once, as with get_many
+    assert call_count == 2
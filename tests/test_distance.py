@@ -0,0 +1,70 @@
+#!/usr/bin/python
+# coding: utf8
+
+import importlib
+
+import pytest
+
+import geocoder
+from geocoder.distance import haversine_many, haversine_matrix, path_length
+
+ottawa = (45.4215296, -75.6971930)
+toronto = (43.653226, -79.3831843)
+montreal = (45.5016889, -73.567256)
+
+# geocoder.distance is the function of geocoder.api
+distance = importlib.import_module("geocoder.distance")
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(distance, "numpy", None)
+    return request.param
+
+
+def test_distance():
+    d = geocoder.distance(ottawa, toronto)
+    assert d == pytest.approx(352.10, abs=0.01)
+    assert geocoder.distance(ottawa, "43.653226, -79.3831843") == d
+    assert geocoder.distance([ottawa, toronto], units="miles") == pytest.approx(d * 0.621371)
+
+
+def test_haversine_many(backend):
+    distances = haversine_many([ottawa[0], ottawa[0]], [ottawa[1], ottawa[1]], [toronto[0], montreal[0]], [toronto[1], montreal[1]])
+    assert list(distances) == [pytest.approx(geocoder.distance(ottawa, toronto)), pytest.approx(geocoder.distance(ottawa, montreal))]
+    assert list(haversine_many([ottawa[0]], [ottawa[1]], [toronto[0]], [toronto[1]], units="m")) == [pytest.approx(352096, abs=1)]
+
+
+def test_haversine_matrix(backend):
+    lats, lngs = [ottawa[0], toronto[0], montreal[0]], [ottawa[1], toronto[1], montreal[1]]
+    matrix = haversine_matrix(lats, lngs, lats, lngs)
+    assert [matrix[index][index] for index in range(3)] == [0, 0, 0]
+    assert matrix[0][1] == pytest.approx(geocoder.distance(ottawa, toronto))
+    assert matrix[2][1] == pytest.approx(geocoder.distance(montreal, toronto))
+    # rectangular
+    matrix = haversine_matrix(lats, lngs, lats[:1], lngs[:1])
+    assert [list(row) for row in matrix] == [[0], [pytest.approx(geocoder.distance(toronto, ottawa))], [pytest.approx(geocoder.distance(montreal, ottawa))]]
+
+
+def test_path_length(backend):
+    lats, lngs = [toronto[0], ottawa[0], montreal[0]], [toronto[1], ottawa[1], montreal[1]]
+    assert path_length(lats, lngs) == pytest.approx(geocoder.distance(toronto, ottawa, montreal))
+    assert path_length(lats[:1], lngs[:1]) == 0
+
+
+def test_coordinates_length(backend):
+    # not broadcast by NumPy either
+    with pytest.raises(ValueError):
+        haversine_many([0, 1], [0, 1], [1], [1])
+    with pytest.raises(ValueError):
+        haversine_many([0, 1], [0], [1, 2], [1, 2])
+    with pytest.raises(ValueError):
+        haversine_matrix([0, 1], [0], [1], [1])
+
+
+def test_unknown_units():
+    with pytest.raises(ValueError):
+        haversine_many([0], [0], [1], [1], units="parsecs")
@@ -0,0 +1,131 @@
+#!/usr/bin/python
+# coding: utf8
+
+import time
+from unittest import mock
+
+import pytest
+import requests_mock
+
+import geocoder
+from geocoder import circuitbreaker
+from tests.mocks import geonames_url, location, osm_url, providers, read
+
+
+@pytest.fixture(autouse=True)
+def clear_breakers():
+    circuitbreaker.registry.clear()
+    yield
+    circuitbreaker.registry.clear()
+
+
+def hostnames(mocker):
+    return [request.hostname for request in mocker.request_history]
+
+
+def test_fallback():
+    with requests_mock.Mocker() as mocker:
+        mocker.get(osm_url, text=read("tests/results/osm.json"))
+        mocker.get(geonames_url, text=read("tests/results/geonames.json"))
+        g = geocoder.fallback(location, providers)
+        assert g.ok
+        assert g.provider == "osm"
+        assert hostnames(mocker) == ["nominatim.openstreetmap.org"]
+
+        # no result is not a failure of the provider
+        mocker.get(osm_url, text="[]")
+        g = geocoder.fallback(location, providers)
+        assert g.provider == "geonames"
+        assert circuitbreaker.breaker_stats()["osm"]["failures"] == 0
+
+
+def test_fallback_circuit_breaker():
+    with requests_mock.Mocker() as mocker:
+        mocker.get(osm_url, status_code=503)
+        mocker.get(geonames_url, text=read("tests/results/geonames.json"))
+        for _ in range(3):
+            g = geocoder.fallback(location, providers, failure_threshold=2, reset_timeout=0.2, retry=False)
+            assert g.ok
+            assert g.provider == "geonames"
+        # open after 2 failures, the third query skips osm
+        assert hostnames(mocker).count("nominatim.openstreetmap.org") == 2
+        stats = circuitbreaker.breaker_stats()["osm"]
+        assert stats["state"] == circuitbreaker.OPEN
+        assert stats["rejected"] == 1
+
+        # half open after reset_timeout: a single query closes the circuit
+        time.sleep(0.2)
+        mocker.get(osm_url, text=read("tests/results/osm.json"))
+        g = geocoder.fallback(location, providers, failure_threshold=2, reset_timeout=0.2)
+        assert g.provider == "osm"
+        assert circuitbreaker.breaker_stats()["osm"]["state"] == circuitbreaker.CLOSED
+
+
+def test_circuit_breaker_half_open():
+    breaker = circuitbreaker.CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == circuitbreaker.HALF_OPEN
+    # a single trial at a time, opening the circuit again when failing
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.failure()
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == circuitbreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_fallback_all_open():
+    with requests_mock.Mocker() as mocker:
+        mocker.get(osm_url, status_code=503)
+        g = geocoder.fallback(location, ["osm"], failure_threshold=1, retry=False)
+        assert not g.ok
+        with pytest.raises(circuitbreaker.CircuitOpenError):
+            geocoder.fallback(location, ["osm"], failure_threshold=1, retry=False)
+
+
+def test_fallback_exception():
+    get = geocoder.api.get
+
+    def failing_get(location, provider, **kwargs):
+        if provider in failing:
+            raise RuntimeError("unexpected response of " + provider)
+        return get(location, provider=provider, **kwargs)
+
+    failing = ["osm"]
+    with requests_mock.Mocker() as mocker, mock.patch.object(geocoder.api, "get", side_effect=failing_get):
+        mocker.get(geonames_url, text=read("tests/results/geonames.json"))
+        # the next provider is queried when one raises
+        g = geocoder.fallback(location, providers)
+        assert g.ok
+        assert g.provider == "geonames"
+        assert circuitbreaker.breaker_stats()["osm"]["failures"] == 1
+
+        # raised when every provider failed
+        failing.append("geonames")
+        with pytest.raises(RuntimeError, match="osm"):
+            geocoder.fallback(location, providers)
+        assert circuitbreaker.breaker_stats()["osm"]["failures"] == 2
+        assert circuitbreaker.breaker_stats()["geonames"]["failures"] == 1
+
+
+def test_circuit_breaker_settings():
+    breaker = circuitbreaker.get_breaker("test", failure_threshold=5, reset_timeout=30)
+    # the settings of the last call apply
+    assert circuitbreaker.get_breaker("test", failure_threshold=1, reset_timeout=0) is breaker
+    assert (breaker.failure_threshold, breaker.reset_timeout) == (1, 0)
+    with pytest.raises(ValueError):
+        circuitbreaker.get_breaker("test", failure_threshold=0)
+
+
+def test_fallback_interrupted():
+    breaker = circuitbreaker.get_breaker("osm", failure_threshold=1, reset_timeout=0)
+    assert breaker.allow()
+    breaker.failure()
+    # the half open trial is interrupted: the next query is the trial
+    with mock.patch.object(geocoder.api, "get", side_effect=KeyboardInterrupt):
+        with pytest.raises(KeyboardInterrupt):
+            geocoder.fallback(location, ["osm"], failure_threshold=1, reset_timeout=0)
+    assert breaker.state == circuitbreaker.HALF_OPEN
+    assert breaker.allow()
@@ -1,6 +1,8 @@
 #!/usr/bin/python
 # coding: utf8
 
+import importlib
+
 import geocoder
 
 
@@ -44,3 +46,17 @@ def test_location():
     assert g.ok
     g = geocoder.location([45.4215296, -75.6971931])
     assert g.ok
+
+
+def test_lazy_options():
+    from geocoder.api import options
+    from geocoder.yandex import YandexQuery
+
+    assert "reverse" in options["yandex"]
+    assert options["yandex"]["geocode"] is YandexQuery
+    # importing a provider module keeps the function of the same name
+    assert callable(geocoder.yandex)
+    # the CLI too, imported on first access
+    assert callable(geocoder.cli)
+    assert callable(geocoder.cli)
+    assert geocoder.cli is importlib.import_module("geocoder.cli").cli
@@ -0,0 +1,73 @@
+#!/usr/bin/python
+# coding: utf8
+
+import random
+
+import pytest
+import requests_mock
+
+import geocoder
+from geocoder.distance import _haversine
+from geocoder.geonames_offline import PlaceIndex, build_index, load_index, read_dump
+
+dump = "tests/results/geonames_cities.txt"
+admin1_codes = "tests/results/geonames_admin1.txt"
+
+
+@pytest.fixture
+def index(tmpdir):
+    path = str(tmpdir.join("cities.index"))
+    build_index(read_dump(dump, admin1_codes), path)
+    index = PlaceIndex(path)
+    yield index
+    index.close()
+
+
+def test_read_dump():
+    places = list(read_dump(dump, admin1_codes))
+    assert len(places) == 12
+    assert places[0]["name"] == "Ottawa"
+    assert places[0]["adminName1"] == "Ontario"
+    assert len(list(read_dump(dump, feature_classes=None))) == 13
+
+
+def test_nearest(index):
+    # same places as a brute force search
+    places = list(read_dump(dump))
+    random.seed(0)
+    for _ in range(200):
+        lat, lng = random.uniform(-90, 90), random.uniform(-180, 180)
+        expected = sorted(places, key=lambda place: _haversine(lat, lng, float(place["lat"]), float(place["lng"])))
+        nearest = index.nearest(lat, lng, k=3)
+        assert [place["geonameId"] for place in nearest] == [place["geonameId"] for place in expected[:3]]
+
+
+def test_nearest_across_antimeridian(index):
+    place = index.nearest(-20.0, 179.9)[0]
+    assert place["name"] == "Avarua"
+
+
+def test_geonames_offline(tmpdir):
+    path = str(tmpdir.join("cities.txt"))
+    with open(dump, "r", encoding="utf-8") as input, open(path, "w", encoding="utf-8") as output:
+        output.write(input.read())
+
+    g = geocoder.geonames_offline([45.42, -75.69], path=path, admin1_codes=admin1_codes, maxRows=2)
+    assert g.ok
+    assert len(g) == 2
+    assert g.address == "Ottawa"
+    assert g.state == "Ontario"
+    assert g.country_code == "CA"
+    assert g.distance < 2
+    assert g[1].address == "Montréal"
+    # the index is built once next to the dump
+    assert load_index(path) is g.index
+    assert tmpdir.join("cities.txt.index").check()
+
+    assert geocoder.geonames_offline("45.42, -75.69", path=path).address == "Ottawa"
+    # addresses are not geocoded
+    with requests_mock.Mocker() as mocker:
+        g = geocoder.geonames_offline("Ottawa, Ontario", path=path)
+        assert not g.ok
+        assert g.error
+        assert not mocker.called
@@ -0,0 +1,69 @@
+#!/usr/bin/python
+# coding: utf8
+
+import json
+from unittest import mock
+
+import pytest
+import requests_mock
+
+import geocoder
+from geocoder import api
+
+url = "http://api.geonames.org/searchJSON"
+data_file = "tests/results/geonames.json"
+
+
+def geonames_callback(request, context):
+    # answer with the queried location as the name of the result
+    with open(data_file, "r") as input:
+        content = json.load(input)
+    content["geonames"][0]["name"] = request.qs["q"][0]
+    return json.dumps(content)
+
+
+def test_get_many():
+    locations = ["a", "b", "a", "c"] * 10
+    with requests_mock.Mocker() as mocker:
+        mocker.get(url, text=geonames_callback)
+        results = list(geocoder.get_many(locations, workers=3, provider="geonames", key="mock"))
+        assert [g.address for g in results] == locations
+        # identical locations are only queried once
+        assert mocker.call_count == 3
+
+
+def test_get_many_invalid_provider():
+    with pytest.raises(ValueError):
+        next(geocoder.get_many(["a"], provider="invalid"))
+
+
+def test_get_many_unhashable():
+    # coordinates as lists, and locations without any hashable key
+    locations = [[45.0, -75.0], "a", [45.0, -75.0], {"q": ["a"]}, {"q": ["a"]}]
+    assert api._location_key(locations[0]) == (45.0, -75.0)
+    assert api._location_key({"q": ["a"]}) == (("q", ("a",)),)
+    assert api._location_key({"q": set()}) is None
+
+    def call(location, **kwargs):
+        return location
+
+    with mock.patch.object(api, "get", side_effect=call) as get:
+        results = list(geocoder.get_many(locations + [{"q": set()}], workers=2, provider="geonames"))
+    assert results == locations + [{"q": set()}]
+    assert get.call_count == 4
+
+
+def test_get_many_released():
+    # the locations are only deduplicated while they are pending
+    locations = ["a", "b", "c", "d", "e"] * 3
+    with mock.patch.object(api, "get", side_effect=lambda location, **kwargs: location) as get:
+        results = list(geocoder.get_many(locations, workers=1, provider="geonames"))
+    assert results == locations
+    # at most 4 locations pending with 1 worker
+    assert get.call_count == 15
+
+
+def test_location_key_numpy():
+    numpy = pytest.importorskip("numpy")
+    rows = numpy.array([[45.0, -75.0], [45.0, -75.0]])
+    assert api._location_key(rows[0]) == api._location_key(rows[1]) == (45.0, -75.0)
@@ -1,6 +1,9 @@
 #!/usr/bin/python
 # coding: utf8
 
+import json
+from urllib.parse import parse_qs, urlparse
+
 import requests_mock
 
 import geocoder
@@ -64,3 +67,72 @@ def test_google_elevation():
         mocker.get(url, text=input.read())
         g = geocoder.google(ottawa, method="elevation")
         assert g.ok
+
+
+def decode_points(value):
+    """Points of the locations parameter of an elevation request"""
+    if not value.startswith("enc:"):
+        return [tuple(float(coordinate) for coordinate in point.split(",")) for point in value.split("|")]
+    values, current, shift = [], 0, 0
+    for char in value[4:]:
+        byte = ord(char) - 63
+        current |= (byte & 0x1F) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(current >> 1) if current & 1 else current >> 1)
+            current, shift = 0, 0
+    points, lat, lng = [], 0, 0
+    for index in range(0, len(values), 2):
+        lat, lng = lat + values[index], lng + values[index + 1]
+        points.append((lat / 1e5, lng / 1e5))
+    return points
+
+
+def elevation_callback(request, context):
+    # elevation of each point: its latitude
+    query = parse_qs(urlparse(request.url).query)
+    points = decode_points(query["locations"][0])
+    results = [{"elevation": lat, "location": {"lat": lat, "lng": lng}, "resolution": 1.0} for lat, lng in points]
+    return json.dumps({"results": results, "status": "OK"})
+
+
+def test_google_elevation_batch():
+    url = "https://maps.googleapis.com/maps/api/elevation/json"
+    points = [(45 + index / 1000.0, -75 - index / 1000.0) for index in range(1200)]
+    with requests_mock.Mocker() as mocker:
+        mocker.get(url, text=elevation_callback)
+        g = geocoder.google(points, method="elevation_batch", key="mock")
+        assert g.ok
+        # at most 512 points per request
+        assert g.chunks() == [(0, 512), (512, 1024), (1024, 1200)]
+        assert mocker.call_count == 3
+        assert all(len(request.url) <= 16384 for request in mocker.request_history)
+        assert [result.meters for result in g] == [round(lat, 1) for lat, _ in points]
+
+        # chunks limited by the length of the urls
+        mocker.reset_mock()
+        query = geocoder.google(points, method="elevation_batch", key="mock", initialize=False)
+        query._MAX_URL_LENGTH = 1000
+        query._initialize()
+        assert mocker.call_count == len(query.chunks()) > 3
+        assert all(len(request.url) <= 1000 for request in mocker.request_history)
+        assert [result.meters for result in query] == [round(lat, 1) for lat, _ in points]
+
+
+def test_google_elevation_batch_failed_chunk():
+    url = "https://maps.googleapis.com/maps/api/elevation/json"
+    points = [(45 + index / 1000.0, -75) for index in range(600)]
+    with requests_mock.Mocker() as mocker:
+        mocker.get(url, [{"text": elevation_callback}, {"status_code": 500}])
+        g = geocoder.google(points, method="elevation_batch", key="mock", workers=1, retry=False)
+        assert g.failed_chunks == [(512, 600)]
+        assert len(g) == 600
+        assert [index for index, result in enumerate(g) if not result.ok] == list(range(512, 600))
+        assert g.status_code == 500
+
+        # status of the failed chunk, even when another chunk completes after it
+        mocker.get(url, [{"status_code": 500}, {"text": elevation_callback}])
+        g = geocoder.google(points, method="elevation_batch", key="mock", workers=1, retry=False)
+        assert g.failed_chunks == [(0, 512)]
+        assert g.status_code == 500
+        assert [index for index, result in enumerate(g) if result.ok] == list(range(512, 600))
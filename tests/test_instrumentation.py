@@ -0,0 +1,123 @@
+#!/usr/bin/python
+# coding: utf8
+
+import socket
+
+import pytest
+import requests_mock
+
+import geocoder
+from geocoder import instrumentation
+
+location = "Ottawa, Ontario"
+url = "http://api.geonames.org/searchJSON"
+data_file = "tests/results/geonames.json"
+
+
+@pytest.fixture
+def listen():
+    added = []
+
+    def add(listener):
+        added.append(instrumentation.add_listener(listener))
+        return listener
+
+    yield add
+    for listener in added:
+        instrumentation.remove_listener(listener)
+
+
+class Recorder(instrumentation.QueryListener):
+    def __init__(self):
+        self.events = []
+
+    def on_request_start(self, query, event):
+        self.events.append(("on_request_start", event))
+
+    def on_response(self, query, event):
+        self.events.append(("on_response", event))
+
+    def on_parsed(self, query, event):
+        self.events.append(("on_parsed", event))
+
+    def on_error(self, query, event):
+        self.events.append(("on_error", event))
+
+
+def test_listener(listen):
+    recorder = listen(Recorder())
+    with requests_mock.Mocker() as mocker, open(data_file, "r") as input:
+        content = input.read()
+        mocker.get(url, text=content)
+        g = geocoder.geonames(location, key="mock")
+        assert g.ok
+
+    assert [name for name, _ in recorder.events] == ["on_request_start", "on_response", "on_parsed"]
+    response = recorder.events[1][1]
+    assert response["provider"] == "geonames"
+    assert response["status_code"] == 200
+    assert response["bytes"] == len(content.encode("utf-8"))
+    parsed = recorder.events[2][1]
+    assert parsed["results"] == 1
+    assert not parsed["from_cache"]
+    assert parsed["total"] >= parsed["parse"] >= 0
+    assert set(g.timings) == set(["build", "request", "server", "decode", "parse", "total"])
+
+
+def test_listener_error(listen):
+    recorder = listen(Recorder())
+    with requests_mock.Mocker() as mocker:
+        mocker.get(url, status_code=404)
+        geocoder.geonames(location, key="mock")
+
+    assert [name for name, _ in recorder.events] == ["on_request_start", "on_response", "on_error"]
+    assert recorder.events[2][1]["status_code"] == 404
+
+
+def test_metrics_collector(listen):
+    collector = listen(instrumentation.MetricsCollector(buckets=(0.1, 1.0)))
+    with requests_mock.Mocker() as mocker, open(data_file, "r") as input:
+        mocker.get(url, [{"text": input.read()}, {"status_code": 404}])
+        geocoder.geonames(location, key="mock")
+        geocoder.geonames(location, key="mock")
+
+    assert collector.counter("geonames", "geocode", "requests") == 2
+    assert collector.counter("geonames", "geocode", "parsed") == 1
+    assert collector.counter("geonames", "geocode", "errors") == 1
+    assert collector.histogram("geonames", "geocode", "total").count == 2
+
+    metrics = collector.to_prometheus().splitlines()
+    assert "# TYPE geocoder_requests_total counter" in metrics
+    assert 'geocoder_requests_total{provider="geonames",method="geocode"} 2' in metrics
+    assert 'geocoder_responses_total{provider="geonames",method="geocode",status_code="404"} 1' in metrics
+    assert "# TYPE geocoder_total_duration_seconds histogram" in metrics
+    assert 'geocoder_total_duration_seconds_bucket{provider="geonames",method="geocode",le="+Inf"} 2' in metrics
+    assert 'geocoder_total_duration_seconds_count{provider="geonames",method="geocode"} 2' in metrics
+
+
+def test_histogram():
+    histogram = instrumentation.Histogram((1, 2))
+    for value in (0.5, 1, 1.5, 3):
+        histogram.observe(value)
+    assert histogram.cumulative_counts() == [(1, 2), (2, 3), (float("inf"), 4)]
+    assert histogram.sum == 6
+
+
+def test_statsd_exporter(listen):
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(("127.0.0.1", 0))
+    server.settimeout(1)
+    exporter = listen(instrumentation.StatsdExporter("127.0.0.1", server.getsockname()[1]))
+    try:
+        with requests_mock.Mocker() as mocker, open(data_file, "r") as input:
+            mocker.get(url, text=input.read())
+            geocoder.geonames(location, key="mock")
+        packets = [server.recv(4096).decode("utf-8") for _ in range(3)]
+    finally:
+        exporter.close()
+        server.close()
+
+    metrics = "\n".join(packets).splitlines()
+    assert "geocoder.geonames.geocode.requests:1|c" in metrics
+    assert "geocoder.geonames.geocode.status_200:1|c" in metrics
+    assert any(metric.startswith("geocoder.geonames.geocode.total:") and metric.endswith("|ms") for metric in metrics)
@@ -0,0 +1,150 @@
+#!/usr/bin/python
+# coding: utf8
+
+import ipaddress
+import struct
+
+import pytest
+
+import geocoder
+from geocoder.maxmind_offline import MMDBReader
+
+ottawa = {
+    "city": {"geoname_id": 6094817, "names": {"en": "Ottawa", "fr": "Ottawa"}},
+    "continent": {"code": "NA", "names": {"en": "North America"}},
+    "country": {"iso_code": "CA", "names": {"en": "Canada"}},
+    "location": {"accuracy_radius": 5, "latitude": 45.4112, "longitude": -75.6981, "time_zone": "America/Toronto"},
+    "postal": {"code": "K1P"},
+    "subdivisions": [{"iso_code": "ON", "names": {"en": "Ontario"}}],
+    "is_anycast": False,
+}
+paris = {
+    "city": {"names": {"en": "Paris"}},
+    "country": {"iso_code": "FR", "names": {"en": "France"}},
+    "location": {"latitude": 48.8534, "longitude": 2.3488, "time_zone": "Europe/Paris"},
+}
+networks = [("199.7.157.0/24", ottawa), ("81.0.0.0/12", paris), ("2001:db8::/32", paris)]
+
+
+def _control(data_type, size):
+    if size < 29:
+        head, extra = size, b""
+    elif size < 285:
+        head, extra = 29, bytes([size - 29])
+    else:
+        head, extra = 30, (size - 285).to_bytes(2, "big")
+    if data_type < 8:
+        return bytes([(data_type << 5) | head]) + extra
+    return bytes([head, data_type - 7]) + extra
+
+
+def encode(value):
+    if isinstance(value, bool):
+        return _control(14, int(value))
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        return _control(2, len(data)) + data
+    if isinstance(value, float):
+        return _control(3, 8) + struct.pack(">d", value)
+    if isinstance(value, int):
+        data = value.to_bytes((value.bit_length() + 7) // 8, "big")
+        return _control(6, len(data)) + data
+    if isinstance(value, list):
+        return _control(11, len(value)) + b"".join(encode(item) for item in value)
+    return _control(7, len(value)) + b"".join(encode(key) + encode(item) for key, item in value.items())
+
+
+def write_mmdb(path, networks, record_size=24, ip_version=6):
+    """Minimal MaxMind DB writer: one record per network"""
+    data = b""
+    tree = [[None, None]]
+    for network, record in networks:
+        network = ipaddress.ip_network(network)
+        bits, prefix_len = int(network.network_address), network.prefixlen
+        bit_count = network.max_prefixlen
+        if network.version == 4 and ip_version == 6:
+            bit_count, prefix_len = 128, prefix_len + 96
+        node = 0
+        for depth in range(prefix_len):
+            bit = (bits >> (bit_count - 1 - depth)) & 1 if depth >= bit_count - network.max_prefixlen else 0
+            if depth == prefix_len - 1:
+                tree[node][bit] = ("data", len(data))
+            else:
+                if tree[node][bit] is None:
+                    tree.append([None, None])
+                    tree[node][bit] = len(tree) - 1
+                node = tree[node][bit]
+        data += encode(record)
+
+    node_count = len(tree)
+
+    def value(record):
+        if record is None:
+            return node_count
+        if isinstance(record, tuple):
+            return node_count + 16 + record[1]
+        return record
+
+    search_tree = b""
+    for left, right in tree:
+        left, right = value(left), value(right)
+        if record_size == 24:
+            search_tree += left.to_bytes(3, "big") + right.to_bytes(3, "big")
+        elif record_size == 28:
+            middle = ((left >> 24) << 4) | (right >> 24)
+            search_tree += (left & 0xFFFFFF).to_bytes(3, "big") + bytes([middle]) + (right & 0xFFFFFF).to_bytes(3, "big")
+        else:
+            search_tree += left.to_bytes(4, "big") + right.to_bytes(4, "big")
+
+    metadata = {
+        "node_count": node_count,
+        "record_size": record_size,
+        "ip_version": ip_version,
+        "database_type": "GeoLite2-City",
+        "binary_format_major_version": 2,
+    }
+    with open(path, "wb") as output:
+        output.write(search_tree + b"\x00" * 16 + data + b"\xab\xcd\xefMaxMind.com" + encode(metadata))
+
+
+@pytest.mark.parametrize("record_size", [24, 28, 32])
+def test_reader(tmpdir, record_size):
+    path = str(tmpdir.join("test.mmdb"))
+    write_mmdb(path, networks, record_size=record_size)
+    reader = MMDBReader(path)
+    assert reader.database_type == "GeoLite2-City"
+    assert reader.get("199.7.157.42") == ottawa
+    assert reader.get_with_prefix_len("81.15.1.1") == (paris, 12)
+    assert reader.get("2001:db8::1") == paris
+    assert reader.get("8.8.8.8") is None
+    assert reader.get_many(["81.0.0.1", "1.1.1.1", "199.7.157.1"]) == [paris, None, ottawa]
+    # records are decoded once
+    assert reader.get("199.7.157.1") is reader.get("199.7.157.2")
+    reader.close()
+
+
+def test_reader_ipv4_database(tmpdir):
+    path = str(tmpdir.join("test.mmdb"))
+    write_mmdb(path, networks[:2], ip_version=4)
+    reader = MMDBReader(path)
+    assert reader.get("199.7.157.42") == ottawa
+    with pytest.raises(ValueError):
+        reader.get("2001:db8::1")
+    reader.close()
+
+
+def test_maxmind_offline(tmpdir):
+    path = str(tmpdir.join("test.mmdb"))
+    write_mmdb(path, networks)
+    g = geocoder.maxmind_offline("199.7.157.42", path=path)
+    assert g.ok
+    assert g.city == "Ottawa"
+    assert g.state == "Ontario"
+    assert g.country_code == "CA"
+    assert g.latlng == [45.4112, -75.6981]
+    assert g.ip == "199.7.157.42"
+    assert g.network == "199.7.157.0/24"
+    assert g.address == "Ottawa, Ontario, Canada"
+
+    g = geocoder.maxmind_offline("8.8.8.8", path=path)
+    assert not g.ok
@@ -0,0 +1,48 @@
+#!/usr/bin/python
+# coding: utf8
+
+import requests_mock
+
+import geocoder
+from geocoder.cache import LRUCache
+from geocoder.normalize import AddressNormalizer
+
+url = "https://nominatim.openstreetmap.org/search"
+data_file = "tests/results/osm.json"
+
+
+def test_address_normalizer():
+    normalizer = AddressNormalizer()
+    assert normalizer("453 Booth St, Ottawa") == "453 booth st ottawa"
+    assert normalizer("453  booth STREET ottawa") == "453 booth st ottawa"
+    assert normalizer("453 Booth St., Ottawa ON") == "453 booth st ottawa on"
+    # NFKC: full width characters
+    assert normalizer("Ottawa ＯＮ") == "ottawa on"
+    # signs and decimal points of coordinates are kept
+    assert normalizer("45.42, -75.69") != normalizer("45.42, 75.69")
+
+
+def test_address_normalizer_locales():
+    assert AddressNormalizer("fr_CA")("12 Boul. Saint-Laurent") == "12 bd st laurent"
+    assert AddressNormalizer("de")("Hauptstraße 5, Berlin") == "hauptstr 5 berlin"
+    assert AddressNormalizer("es")("Avenida de Mayo 500") == "av de mayo 500"
+    assert AddressNormalizer(abbreviations={"ottawa": "ott"})("Ottawa") == "ott"
+
+
+def test_normalized_cache_key():
+    cache = LRUCache()
+    with requests_mock.Mocker() as mocker, open(data_file, "r") as input:
+        mocker.get(url, text=input.read())
+        g = geocoder.osm("453 Booth St, Ottawa", cache=cache, normalizer=True)
+        assert g.ok
+        g = geocoder.osm("453  booth street ottawa", cache=cache, normalizer=True)
+        assert g.ok
+        assert g.from_cache
+        assert mocker.call_count == 1
+        # sent as given
+        assert "q=453+Booth+St%2C+Ottawa" in mocker.last_request.url
+
+        # without normalizer, keys of the locations as given
+        g = geocoder.osm("453 booth street ottawa", cache=cache)
+        assert not g.from_cache
+        assert mocker.call_count == 2
@@ -0,0 +1,75 @@
+#!/usr/bin/python
+# coding: utf8
+
+import asyncio
+import time
+
+import requests_mock
+
+import geocoder
+from geocoder import aio
+from tests.mocks import geonames_url, location, osm_url, providers, read
+
+
+def slow(text):
+    # answered after a retry: requests_mock handles a single request at a time, the
+    # slow query must wait outside of it
+    return [{"status_code": 503, "headers": {"Retry-After": "1"}}, {"text": text}]
+
+
+def test_race_primary():
+    with requests_mock.Mocker() as mocker:
+        mocker.get(osm_url, text=read("tests/results/osm.json"))
+        mocker.get(geonames_url, text=read("tests/results/geonames.json"))
+        g = geocoder.race(location, providers, hedge_after_ms=1000)
+        assert g.ok
+        assert g.provider == "osm"
+        assert [request.hostname for request in mocker.request_history] == ["nominatim.openstreetmap.org"]
+
+
+def test_race_hedge():
+    with requests_mock.Mocker() as mocker:
+        mocker.get(osm_url, slow(read("tests/results/osm.json")))
+        mocker.get(geonames_url, text=read("tests/results/geonames.json"))
+        started = time.monotonic()
+        g = geocoder.race(location, providers, hedge_after_ms=50)
+        assert time.monotonic() - started < 0.8
+        assert g.ok
+        assert g.provider == "geonames"
+        # let the slow query finish before removing the mock
+        time.sleep(1)
+
+
+def test_race_failures():
+    with requests_mock.Mocker() as mocker:
+        # the next provider is queried as soon as a query fails
+        mocker.get(osm_url, status_code=500)
+        mocker.get(geonames_url, text=read("tests/results/geonames.json"))
+        started = time.monotonic()
+        g = geocoder.race(location, providers, hedge_after_ms=5000, retry=False)
+        assert time.monotonic() - started < 1
+        assert g.provider == "geonames"
+
+        # the result of the first provider when none is ok
+        mocker.get(geonames_url, status_code=500)
+        g = geocoder.race(location, providers, retry=False)
+        assert not g.ok
+        assert g.provider == "osm"
+
+
+def test_arace(monkeypatch):
+    # queries sent in the default executor, as requests_mock does not patch aiohttp
+    monkeypatch.setattr(aio, "aiohttp", None)
+    with requests_mock.Mocker() as mocker:
+        mocker.get(osm_url, slow(read("tests/results/osm.json")))
+        mocker.get(geonames_url, text=read("tests/results/geonames.json"))
+
+        async def main():
+            g = await geocoder.arace(location, providers, hedge_after_ms=50)
+            # let the slow query finish before removing the mock
+            await asyncio.sleep(1)
+            return g
+
+        g = asyncio.run(main())
+        assert g.ok
+        assert g.provider == "geonames"
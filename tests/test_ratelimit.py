@@ -0,0 +1,74 @@
+#!/usr/bin/python
+# coding: utf8
+
+import asyncio
+
+import pytest
+import requests_mock
+
+import geocoder
+from geocoder import ratelimit
+from geocoder.ratelimit import FileTokenBucket, RateLimiterRegistry, TokenBucket, parse_limits
+
+url = "http://api.geonames.org/searchJSON"
+data_file = "tests/results/geonames.json"
+
+
+def test_parse_limits():
+    assert parse_limits("10/1, 2500/86400") == [(10, 1.0), (2500, 86400.0)]
+
+
+def test_token_bucket():
+    bucket = TokenBucket(2, 1)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # third call has to wait for a token to be refilled
+    assert 0.4 < bucket.reserve() <= 0.5
+    assert 0.9 < bucket.reserve() <= 1.0
+
+
+def test_file_token_bucket(tmp_path):
+    path = str(tmp_path / "bucket.json")
+    first, second = FileTokenBucket(path, 2, 1), FileTokenBucket(path, 2, 1)
+    assert first.reserve() == 0
+    assert second.reserve() == 0
+    assert first.reserve() > 0
+
+
+def test_registry(tmp_path):
+    registry = RateLimiterRegistry()
+    limiter = registry.get("google", [(10, 1), (2500, 86400)])
+    assert registry.get("google", [(10, 1.0), (2500, 86400)]) is limiter
+    assert registry.get("google", [(50, 1)]) is not limiter
+    assert len(limiter.buckets) == 2
+
+    registry = RateLimiterRegistry(str(tmp_path))
+    assert isinstance(registry.get("google-key", [(10, 1)]).buckets[0], FileTokenBucket)
+
+
+def test_aacquire():
+    limiter = RateLimiterRegistry().get("test", [(1, 0.05)])
+    asyncio.run(limiter.aacquire())
+    asyncio.run(limiter.aacquire())
+    assert limiter.reserve() > 0
+
+
+def test_query_rate_limiter(monkeypatch):
+    monkeypatch.setattr(ratelimit, "registry", RateLimiterRegistry())
+    monkeypatch.setenv("GEOCODER_RATE_LIMITS_GEONAMES", "1/60")
+    with requests_mock.Mocker() as mocker, open(data_file, "r") as input:
+        mocker.get(url, text=input.read())
+        g = geocoder.geonames("Ottawa, Ontario", key="mock")
+        assert g.ok
+        assert g.rate_limiter.reserve() > 59
+        # shared by queries with the same key
+        assert geocoder.geonames("Ottawa, Ontario", key="mock", initialize=False).rate_limiter is g.rate_limiter
+        assert geocoder.geonames("Ottawa, Ontario", key="other", initialize=False).rate_limiter is not g.rate_limiter
+        assert geocoder.geonames("Ottawa, Ontario", key="mock", rate_limit=False).rate_limiter is None
+
+
+@pytest.mark.parametrize("client_secret, limits", [(None, (10, 1)), ("c2VjcmV0", (50, 1))])
+def test_google_rate_limits(client_secret, limits):
+    g = geocoder.google("Ottawa", key="mock", client="client", client_secret=client_secret, initialize=False)
+    bucket = g.rate_limiter.buckets[0]
+    assert (bucket.capacity, bucket.capacity / bucket.rate) == limits
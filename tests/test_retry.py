@@ -0,0 +1,142 @@
+#!/usr/bin/python
+# coding: utf8
+
+import asyncio
+import email.utils
+import time
+
+import requests
+import requests_mock
+
+import geocoder
+from geocoder import retry
+
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
+location = "Ottawa, Ontario"
+url = "http://api.geonames.org/searchJSON"
+data_file = "tests/results/geonames.json"
+
+
+def geonames_responses(*failures):
+    with open(data_file, "r") as input:
+        return list(failures) + [{"text": input.read()}]
+
+
+def test_retry():
+    with requests_mock.Mocker() as mocker, mock.patch("time.sleep") as sleep:
+        mocker.get(url, geonames_responses({"status_code": 503}, {"exc": requests.exceptions.ConnectTimeout}))
+        g = geocoder.geonames(location, key="mock")
+        assert g.ok
+        assert mocker.call_count == 3
+        assert sleep.call_count == 2
+
+
+def test_retry_final_response():
+    with requests_mock.Mocker() as mocker, mock.patch("time.sleep"):
+        # client errors are not sent again, server errors max_attempts times
+        mocker.get(url, geonames_responses({"status_code": 400}))
+        g = geocoder.geonames(location, key="mock")
+        assert not g.ok
+        assert g.status_code == 400
+        assert mocker.call_count == 1
+
+        mocker.get(url, geonames_responses(*[{"status_code": 500}] * 3))
+        g = geocoder.geonames(location, key="mock", retry=2)
+        assert not g.ok
+        assert g.status_code == 500
+        assert mocker.call_count == 3
+
+        g = geocoder.geonames(location, key="mock", retry=False)
+        assert g.status_code == 500
+        assert mocker.call_count == 4
+
+
+def test_retry_not_idempotent():
+    def sender(*outcomes):
+        outcomes = list(outcomes)
+        calls = []
+
+        def send():
+            calls.append(outcomes[0])
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            response = requests.Response()
+            response.status_code = outcome
+            response._content, response._content_consumed = b"", True
+            return response
+
+        return send, calls
+
+    policy = retry.RetryPolicy(backoff=0)
+    with mock.patch("time.sleep"):
+        # the request may have been processed: never sent again
+        send, calls = sender(requests.exceptions.ReadTimeout(), 200)
+        try:
+            policy.call(send, idempotent=False)
+        except requests.exceptions.ReadTimeout:
+            pass
+        assert len(calls) == 1
+        send, calls = sender(500, 200)
+        assert policy.call(send, idempotent=False).status_code == 500
+
+        # not processed
+        send, calls = sender(requests.exceptions.ConnectTimeout(), 503, 200)
+        assert policy.call(send, idempotent=False).status_code == 200
+        assert len(calls) == 3
+
+        send, calls = sender(requests.exceptions.ReadTimeout(), 200)
+        assert policy.call(send).status_code == 200
+
+
+def test_retry_after():
+    policy = retry.RetryPolicy(backoff=0.1, retry_after_max=10)
+    with requests_mock.Mocker() as mocker, mock.patch("time.sleep") as sleep:
+        mocker.get(url, geonames_responses({"status_code": 429, "headers": {"Retry-After": "3"}}))
+        g = geocoder.geonames(location, key="mock", retry=policy)
+        assert g.ok
+        sleep.assert_called_once_with(3.0)
+
+        # longer than retry_after_max
+        mocker.get(url, geonames_responses({"status_code": 429, "headers": {"Retry-After": "30"}}))
+        g = geocoder.geonames(location, key="mock", retry=policy)
+        assert g.status_code == 429
+        assert sleep.call_count == 1
+
+
+def test_retry_deadline():
+    policy = retry.RetryPolicy(max_attempts=10, backoff=1, jitter=False, deadline=3.5)
+    with requests_mock.Mocker() as mocker, mock.patch("time.sleep") as sleep, mock.patch("time.monotonic") as monotonic:
+        # each attempt lasts as long as its delay
+        monotonic.side_effect = lambda: sum(call[0][0] for call in sleep.call_args_list)
+        mocker.get(url, status_code=503)
+        g = geocoder.geonames(location, key="mock", retry=policy)
+        assert g.status_code == 503
+        assert [call[0][0] for call in sleep.call_args_list] == [1, 2]
+
+
+def test_parse_retry_after():
+    assert retry.parse_retry_after("120") == 120.0
+    assert retry.parse_retry_after(None) is None
+    assert retry.parse_retry_after("soon") is None
+    date = email.utils.formatdate(time.time() + 60, usegmt=True)
+    assert 55 < retry.parse_retry_after(date) <= 60
+
+
+def test_retry_async():
+    policy = retry.RetryPolicy(backoff=0)
+    responses = []
+    for status_code in (502, 200):
+        response = requests.Response()
+        response.status_code, response._content, response._content_consumed = status_code, b"", True
+        responses.append(response)
+
+    async def send():
+        return responses.pop(0)
+
+    assert asyncio.run(policy.acall(send)).status_code == 200
+    assert not responses
@@ -1,9 +1,13 @@
 #!/usr/bin/python
 # coding: utf8
 
+import os
+
+import pytest
 import requests
 
 import geocoder
+from geocoder import sessions
 
 try:
     import mock
@@ -27,3 +31,75 @@ def test_session_called():
         with requests.Session() as session:
             geocoder.google(address, session=session)
         session.get.assert_called_once()
+
+
+def test_provider_sessions():
+    registry = sessions.SessionRegistry(pool_connections=4, pool_maxsize=32, pool_block=True)
+    session = registry.get("osm")
+    assert registry.get("osm") is session
+    assert registry.get("google") is not session
+    adapter = session.get_adapter("https://nominatim.openstreetmap.org")
+    assert adapter._pool_connections == 4
+    assert adapter._pool_maxsize == 32
+    assert adapter._pool_block
+
+    shared = sessions.SessionRegistry(per_provider=False)
+    assert shared.get("osm") is shared.get("google")
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_provider_sessions_after_fork():
+    registry = sessions.SessionRegistry()
+    session = registry.get("osm")
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # child process: a new session, not the one of the parent
+        os.write(write_fd, b"1" if registry.get("osm") is not session else b"0")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 1) == b"1"
+    assert registry.get("osm") is session
+
+
+def test_configure_sessions():
+    previous = sessions.registry
+    try:
+        registry = sessions.configure(pool_maxsize=64)
+        assert registry.pool_maxsize == 64
+        assert registry.pool_connections == previous.pool_connections
+        with mock.patch("requests.Session.get"):
+            g = geocoder.osm(address)
+        assert g.session is sessions.get_session("osm")
+    finally:
+        sessions.registry = previous
+
+
+def test_http2_sessions(monkeypatch):
+    httpx = mock.MagicMock()
+    httpx.TimeoutException = httpx.TransportError = type("HTTPError", (Exception,), {})
+    httpx.Client.return_value.request.return_value = mock.Mock(
+        content=b"[]", status_code=200, reason_phrase="OK", headers={"Content-Type": "application/json"}, charset_encoding="utf-8", url="https://nominatim.openstreetmap.org/search"
+    )
+    monkeypatch.setattr(sessions, "httpx", httpx)
+    registry = sessions.SessionRegistry(http2=True)
+    session = registry.get("osm")
+    adapter = session.get_adapter("https://nominatim.openstreetmap.org")
+    assert isinstance(adapter, sessions.HTTP2Adapter)
+    assert session.get_adapter("http://api.geonames.org") is adapter
+
+    response = session.get("https://nominatim.openstreetmap.org/search", timeout=(1, 5))
+    assert response.json() == []
+    assert httpx.Client.call_args[1]["http2"]
+    assert httpx.Timeout.call_args == mock.call(5, connect=1)
+    registry.close()
+    httpx.Client.return_value.close.assert_called_once()
+
+
+def test_http2_sessions_without_httpx(monkeypatch):
+    monkeypatch.setattr(sessions, "httpx", None)
+    # HTTP/1.1 without httpx
+    session = sessions.SessionRegistry(http2=True).get("osm")
+    assert isinstance(session.get_adapter("https://nominatim.openstreetmap.org"), requests.adapters.HTTPAdapter)
+    with pytest.raises(ImportError):
+        sessions.HTTP2Adapter()
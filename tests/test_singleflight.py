@@ -0,0 +1,126 @@
+#!/usr/bin/python
+# coding: utf8
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests_mock
+
+import geocoder
+from geocoder.singleflight import SingleFlight
+
+location = "Ottawa, Ontario"
+url = "http://api.geonames.org/searchJSON"
+data_file = "tests/results/geonames.json"
+
+
+def wait_followers(group, followers):
+    # the first request is answered once the other queries wait for it
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        flights = list(group._flights.values())
+        if flights and flights[0].followers >= followers:
+            return
+        time.sleep(0.01)
+
+
+def geocode_concurrently(group, count, **kwargs):
+    with ThreadPoolExecutor(count) as executor:
+        return list(executor.map(lambda _: geocoder.geonames(location, key="mock", single_flight=group, **kwargs), range(count)))
+
+
+def test_single_flight():
+    group = SingleFlight()
+    with open(data_file, "r") as input:
+        content = input.read()
+
+    def respond(request, context):
+        wait_followers(group, 4)
+        return content
+
+    with requests_mock.Mocker() as mocker:
+        mocker.get(url, text=respond)
+        results = geocode_concurrently(group, 5)
+        assert mocker.call_count == 1
+
+    assert all(g.ok and g.address == "Ottawa" and g.status_code == 200 for g in results)
+    assert sum(g.coalesced for g in results) == 4
+    # every query parses its own copy of the response
+    assert len(set(id(g.raw) for g in results)) == 5
+    assert len(group) == 0
+
+
+def test_single_flight_error():
+    group = SingleFlight()
+
+    def respond(request, context):
+        wait_followers(group, 2)
+        context.status_code = 500
+        return ""
+
+    with requests_mock.Mocker() as mocker:
+        mocker.get(url, text=respond)
+        results = geocode_concurrently(group, 3, retry=False)
+        assert mocker.call_count == 1
+
+    assert all(not g.ok and g.status_code == 500 and g.error for g in results)
+
+
+def test_single_flight_sequential():
+    # only requests in flight are shared
+    with requests_mock.Mocker() as mocker, open(data_file, "r") as input:
+        mocker.get(url, text=input.read())
+        assert geocoder.geonames(location, key="mock").ok
+        g = geocoder.geonames(location, key="mock")
+        assert mocker.call_count == 2
+        assert not g.coalesced
+
+
+def test_single_flight_exception():
+    group = SingleFlight()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise KeyError("failed")
+
+    with ThreadPoolExecutor(2) as executor:
+        leader = executor.submit(group.do, "key", fail)
+        started.wait()
+        follower = executor.submit(group.do, "key", lambda: "not called")
+        for future in (leader, follower):
+            with pytest.raises(KeyError):
+                future.result()
+
+
+def test_single_flight_credentials():
+    # queries with other credentials never share a response
+    group = SingleFlight()
+    with open(data_file, "r") as input:
+        content = input.read()
+
+    def respond(request, context):
+        if "username=bad" in request.url:
+            return '{"status": {"message": "invalid credentials", "value": 10}}'
+        return content
+
+    with requests_mock.Mocker() as mocker:
+        mocker.get(url, text=respond)
+        with ThreadPoolExecutor(2) as executor:
+            results = list(executor.map(lambda key: geocoder.geonames(location, key=key, single_flight=group), ["bad", "good"]))
+        assert mocker.call_count == 2
+
+    bad, good = results
+    assert not bad.ok
+    assert good.ok and not good.coalesced
+    assert group._flights == {}
+
+
+def test_flight_key():
+    bad, good = (geocoder.geonames(location, key=key, initialize=False) for key in ("bad", "good"))
+    assert bad._cache_key() == good._cache_key()
+    assert bad._flight_key() != good._flight_key()
+    assert good._flight_key() == geocoder.geonames(location, key="good", initialize=False)._flight_key()
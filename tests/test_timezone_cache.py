@@ -0,0 +1,103 @@
+#!/usr/bin/python
+# coding: utf8
+
+import json
+
+import requests_mock
+
+import geocoder
+from geocoder import timezone_cache
+
+url = "https://maps.googleapis.com/maps/api/timezone/json"
+data_file = "tests/results/google_timezone.json"
+summer = 1500000000
+winter = 1480000000
+
+
+def read(data_file):
+    with open(data_file, "r") as input:
+        return input.read()
+
+
+def centre(cell):
+    south, west, north, east = timezone_cache.geohash_bounds(cell)
+    return (south + north) / 2, (west + east) / 2
+
+
+def test_geohash():
+    assert timezone_cache.geohash_encode(42.605, -5.603, 5) == "ezs42"
+    south, west, north, east = timezone_cache.geohash_bounds("ezs42")
+    assert south <= 42.605 <= north and west <= -5.603 <= east
+    assert len(set(timezone_cache.geohash_neighbours("ezs42"))) == 8
+    # around the antimeridian
+    assert timezone_cache.geohash_encode(0.1, -179.9, 3) in timezone_cache.geohash_neighbours(timezone_cache.geohash_encode(0.1, 179.9, 3))
+
+
+def test_timezone_cache():
+    cache = timezone_cache.TimezoneCellCache(precision=3)
+    cell = cache.cell(45.4215296, -75.6971930)
+    with requests_mock.Mocker() as mocker:
+        mocker.get(url, text=read(data_file))
+        # interior once the cell and its neighbours agree
+        for lat, lng in [centre(cell)] + [centre(neighbour) for neighbour in timezone_cache.geohash_neighbours(cell)]:
+            g = geocoder.google([lat, lng], method="timezone", timestamp=summer, key="mock", timezone_cache=cache)
+            assert g.ok
+        assert mocker.call_count == 9
+
+        g = geocoder.google([45.4215296, -75.6971930], method="timezone", timestamp=summer, key="mock", timezone_cache=cache)
+        assert mocker.call_count == 9
+        assert g.ok
+        assert g.from_cache
+        assert g.timeZoneId == "America/Toronto"
+        assert g.timeZoneName == "Eastern Daylight Time"
+
+        # other offsets in winter: no response to reuse
+        g = geocoder.google([45.4215296, -75.6971930], method="timezone", timestamp=winter, key="mock", timezone_cache=cache)
+        assert mocker.call_count == 10
+        assert cache.stats()["hits"] == 1
+
+
+def test_timezone_cache_border():
+    cache = timezone_cache.TimezoneCellCache(precision=3)
+    cell = cache.cell(45.4215296, -75.6971930)
+    response = json.loads(read(data_file))
+    for lat, lng in [centre(cell)] + [centre(neighbour) for neighbour in timezone_cache.geohash_neighbours(cell)]:
+        cache.remember(lat, lng, response)
+    assert cache.lookup(45.4215296, -75.6971930) == "America/Toronto"
+
+    # another timezone in a neighbour: sent to the provider near the border
+    neighbour = timezone_cache.geohash_neighbours(cell)[0]
+    cache.observe(*centre(neighbour), timezone_id="America/Montreal")
+    assert cache.lookup(45.4215296, -75.6971930) is None
+    assert cache.stats()["borders"] == 1
+    assert cache.response(45.4215296, -75.6971930, summer) is None
+
+
+def test_geonames_details_timezone_cache():
+    cache = timezone_cache.TimezoneCellCache()
+    with requests_mock.Mocker() as mocker:
+        mocker.get("http://api.geonames.org/getJSON", text=read("tests/results/geonames_details.json"))
+        g = geocoder.geonames(6094817, method="details", key="mock", timezone_cache=cache)
+        assert g.ok
+    assert cache.stats()["cells"] == 1
+    assert cache._cells[cache.cell(45.41117, -75.69812)] == "America/Toronto"
+
+
+def test_timezone_cache_address():
+    cache = timezone_cache.TimezoneCellCache(precision=3)
+    osm_url = "https://nominatim.openstreetmap.org/search"
+    with requests_mock.Mocker() as mocker:
+        mocker.get(osm_url, text=read("tests/results/osm.json"))
+        mocker.get(url, text=read(data_file))
+        # the address is geocoded once
+        g = geocoder.google("Ottawa, Ontario", method="timezone", timestamp=summer, key="mock", timezone_cache=cache)
+        assert g.ok
+        assert [request.hostname for request in mocker.request_history] == ["nominatim.openstreetmap.org", "maps.googleapis.com"]
+        assert cache.stats()["cells"] == 1
+
+        # an address without coordinates is sent without the cache
+        mocker.get(osm_url, text="[]")
+        mocker.get(url, text='{"status": "INVALID_REQUEST"}')
+        g = geocoder.google("Nowhere at all", method="timezone", timestamp=summer, key="mock", timezone_cache=cache)
+        assert g.timeZoneId is None
+        assert g.timezone_cache is None
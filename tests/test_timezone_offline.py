@@ -0,0 +1,79 @@
+#!/usr/bin/python
+# coding: utf8
+
+import importlib
+import random
+
+import pytest
+import requests_mock
+
+import geocoder
+from geocoder.timezone_offline import TimezoneIndex, build_index, load_index, read_geojson
+
+boundaries = "tests/results/timezones.geojson"
+# geocoder.timezone_offline is the function of the provider
+timezone_offline = importlib.import_module("geocoder.timezone_offline")
+
+
+@pytest.fixture
+def index(tmpdir):
+    path = str(tmpdir.join("timezones.index"))
+    build_index(read_geojson(boundaries), path)
+    index = TimezoneIndex(path)
+    yield index
+    index.close()
+
+
+def test_read_geojson():
+    zones = list(read_geojson(boundaries))
+    assert [timezone_id for timezone_id, _ in zones] == ["America/Toronto", "America/Winnipeg", "Europe/Paris"]
+    # outer ring and hole
+    assert len(zones[0][1][0]) == 2
+    assert len(zones[1][1]) == 2
+
+
+def test_timezone(index):
+    assert len(index) == 3
+    assert index.timezone(45.42, -75.69) == "America/Toronto"
+    # in the hole of Toronto, an enclave of Winnipeg
+    assert index.timezone(45.5, -76.5) == "America/Winnipeg"
+    assert index.timezone(45.0, -85.0) == "America/Winnipeg"
+    assert index.timezone(48.85, 2.35) == "Europe/Paris"
+    assert index.timezone(0.0, 0.0) is None
+    assert index.timezones_many([(45.42, -75.69), (0.0, 0.0)]) == ["America/Toronto", None]
+
+
+def test_timezone_without_numpy(index, monkeypatch):
+    random.seed(0)
+    latlngs = [(random.uniform(47, 51), random.uniform(0, 5)) for _ in range(200)]
+    expected = index.timezones_many(latlngs)
+    assert "Europe/Paris" in expected and None in expected
+    monkeypatch.setattr(timezone_offline, "_NUMPY_MIN_POINTS", 10000)
+    assert index.timezones_many(latlngs) == expected
+
+
+def test_timezone_offline(tmpdir):
+    path = str(tmpdir.join("timezones.geojson"))
+    with open(boundaries, "r", encoding="utf-8") as input, open(path, "w", encoding="utf-8") as output:
+        output.write(input.read())
+
+    g = geocoder.timezone_offline([45.42, -75.69], path=path, timestamp=1500000000)
+    assert g.ok
+    assert g.timeZoneId == "America/Toronto"
+    assert g.timeZoneName == "EDT"
+    assert g.rawOffset == -18000
+    assert g.dstOffset == 3600
+    # the index is built once next to the boundaries
+    assert load_index(path) is g.index
+    assert tmpdir.join("timezones.geojson.index").check()
+
+    g = geocoder.timezone_offline([0.0, 0.0], path=path)
+    assert not g.ok
+
+    assert geocoder.timezone_offline("45.42, -75.69", path=path).timeZoneId == "America/Toronto"
+    # addresses are not geocoded
+    with requests_mock.Mocker() as mocker:
+        g = geocoder.timezone_offline("Ottawa, Ontario", path=path)
+        assert not g.ok
+        assert g.error
+        assert not mocker.called
@@ -1,6 +1,9 @@
 #!/usr/bin/python
 # coding: utf8
 
+import re
+import threading
+
 import requests_mock
 
 import geocoder
@@ -40,3 +43,67 @@ def test_uscensus_reverse():
         expected_results = [[38.846638, -76.92681], [41.30435, -72.89422]]
 
         assert [result.latlng for result in g] == expected_results
+
+
+def uscensus_batch_callback(failures):
+    """Answers a match for each address of the batch, at ((index + 1) / 1000, -index - 1).
+
+    failures maps the first index of a chunk to the status codes of its first responses.
+    """
+    lock = threading.Lock()
+
+    def callback(request, context):
+        indexes = [int(index) for index in re.findall(rb"^(\d+),", request.body, re.M)]
+        with lock:
+            statuses = failures.get(indexes[0])
+            if statuses:
+                context.status_code = statuses.pop(0)
+                return ""
+        rows = ['"{0}","a","Match","Exact","a","{1},{2}","1","L"'.format(index, -index - 1, (index + 1) / 1000.0) for index in indexes]
+        return "\n".join(rows)
+
+    return callback
+
+
+def test_uscensus_batch_chunks():
+    url = "https://geocoding.geo.census.gov/geocoder/locations/addressbatch"
+    locations = ["address {0}".format(index) for index in range(25)]
+    with requests_mock.Mocker() as mocker:
+        # the second chunk fails once, and is sent again
+        mocker.post(url, text=uscensus_batch_callback({10: [503]}))
+        g = geocoder.uscensus(locations, method="batch", batch_size=10, workers=2)
+        assert mocker.call_count == 4
+        assert g.ok
+        assert g.failed_chunks == []
+        assert [result.latlng for result in g] == [[(index + 1) / 1000.0, -index - 1] for index in range(25)]
+        assert g.batch_results.to_numpy().tolist() == [[(index + 1) / 1000.0, -index - 1] for index in range(25)]
+
+
+def test_uscensus_batch_failed_chunk():
+    url = "https://geocoding.geo.census.gov/geocoder/locations/addressbatch"
+    locations = ["address {0}".format(index) for index in range(25)]
+    with requests_mock.Mocker() as mocker:
+        # client errors are not sent again
+        mocker.post(url, text=uscensus_batch_callback({10: [400]}))
+        g = geocoder.uscensus(locations, method="batch", batch_size=10, workers=2)
+        assert mocker.call_count == 3
+        assert g.failed_chunks == [(10, 20)]
+        assert [index for index, result in enumerate(g) if not result.latlng] == list(range(10, 20))
+        # status of the failed chunk, whatever chunk completes last
+        assert g.status_code == 400
+
+        mocker.post(url, text=uscensus_batch_callback({}))
+        g = geocoder.uscensus(locations, method="batch", batch_size=10, workers=2)
+        assert g.status_code == 200
+
+
+def test_uscensus_batch_iter_results():
+    url = "https://geocoding.geo.census.gov/geocoder/locations/addressbatch"
+    locations = ["address {0}".format(index) for index in range(25)]
+    with requests_mock.Mocker() as mocker:
+        mocker.post(url, text=uscensus_batch_callback({}))
+        query = geocoder.uscensus(locations, method="batch", batch_size=10, initialize=False)
+        latlngs = [result.latlng for result in query.iter_results()]
+        assert latlngs == [[(index + 1) / 1000.0, -index - 1] for index in range(25)]
+        # results are not kept
+        assert len(query) == 0